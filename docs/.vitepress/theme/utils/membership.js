@@ -0,0 +1,62 @@
+/**
+ * 成员任期数据加载工具
+ * 读取跨运行累积的 membership.json（各仓库首次出现、离开时间），任期按当前时间计算
+ */
+
+const DAY_MS = 24 * 60 * 60 * 1000
+
+let membershipPromise = null
+
+/**
+ * 计算成员的任期信息
+ * @param {Object} entry - membership.json 中的成员记录
+ * @param {string} baseline - 开始记录的时间
+ * @param {Date} now - 当前时间
+ * @returns {Object} { firstSeen, joined, left, active, tenureDays, sinceBaseline, repos }
+ */
+export function describeTenure(entry, baseline, now = new Date()) {
+  const active = !entry.left
+  const currentDays = active && entry.joined ? (now - new Date(entry.joined)) / DAY_MS : 0
+  const repos = {}
+  Object.entries(entry.repos || {}).forEach(([repoId, span]) => {
+    repos[repoId] = { firstSeen: span.first_seen, left: span.left }
+  })
+
+  return {
+    firstSeen: entry.first_seen,
+    joined: entry.joined,
+    left: entry.left,
+    active,
+    stints: entry.stints || 0,
+    tenureDays: Math.floor((entry.past_days || 0) + currentDays),
+    // 记录开始时就已出现的成员，实际加入时间不晚于 baseline
+    sinceBaseline: entry.first_seen === baseline,
+    repos
+  }
+}
+
+/**
+ * 异步加载成员任期数据（只请求一次，失败时返回空 Map，不影响成员卡片显示）
+ * @param {string} basePath - 站点 base 路径
+ * @returns {Promise<Map>} 成员 ID -> describeTenure 的结果
+ */
+export function loadMembership(basePath = '/') {
+  if (!membershipPromise) {
+    membershipPromise = fetch(`${basePath}data/membership.json`.replace(/\/+/g, '/'))
+      .then(response => (response.ok ? response.json() : null))
+      .then(raw => {
+        const result = new Map()
+        if (!raw || !raw.members) return result
+        const now = new Date()
+        Object.entries(raw.members).forEach(([memberId, entry]) => {
+          result.set(memberId, describeTenure(entry, raw.baseline, now))
+        })
+        return result
+      })
+      .catch(error => {
+        console.warn('成员任期数据加载失败:', error)
+        return new Map()
+      })
+  }
+  return membershipPromise
+}
@@ -0,0 +1,48 @@
+/**
+ * 相似成员数据加载工具
+ * 读取离线计算的 similar-members.json（MinHash + LSH），所有成员卡片共用一次请求
+ */
+
+let similarMembersPromise = null
+
+/**
+ * 解析相似成员文件
+ * @param {Object} raw - similar-members.json 内容
+ * @returns {Map} 成员 ID -> [{ id, score }]，score 为 0-1 的相似度
+ */
+export function parseSimilarMembers(raw) {
+  const result = new Map()
+  if (!raw || !Array.isArray(raw.ids) || !Array.isArray(raw.neighbors)) return result
+
+  raw.ids.forEach((memberId, index) => {
+    const flat = raw.neighbors[index] || []
+    const neighbors = []
+    for (let i = 0; i + 1 < flat.length; i += 2) {
+      const neighborId = raw.ids[flat[i]]
+      if (neighborId) {
+        neighbors.push({ id: neighborId, score: flat[i + 1] / 1000 })
+      }
+    }
+    result.set(memberId, neighbors)
+  })
+
+  return result
+}
+
+/**
+ * 异步加载相似成员数据（只请求一次，失败时返回空 Map，不影响成员卡片显示）
+ * @param {string} basePath - 站点 base 路径
+ * @returns {Promise<Map>} 成员 ID -> [{ id, score }]
+ */
+export function loadSimilarMembers(basePath = '/') {
+  if (!similarMembersPromise) {
+    similarMembersPromise = fetch(`${basePath}data/similar-members.json`.replace(/\/+/g, '/'))
+      .then(response => (response.ok ? response.json() : null))
+      .then(parseSimilarMembers)
+      .catch(error => {
+        console.warn('相似成员数据加载失败:', error)
+        return new Map()
+      })
+  }
+  return similarMembersPromise
+}
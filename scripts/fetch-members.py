@@ -7,14 +7,41 @@
 import os
 import sys
 import csv
+import gzip
 import json
+import math
+import random
+import re
+import shutil
+import subprocess
 import time
-from datetime import datetime, timedelta
-from collections import defaultdict
+import hashlib
+import inspect
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from array import array
+from collections import defaultdict, deque, Counter
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse, parse_qs
 try:
     import requests
 except ImportError:
     requests = None
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    ZoneInfo = None
 from pathlib import Path
 
 # 加载环境变量
@@ -25,20 +52,85 @@ except ImportError:
     # python-dotenv 不是必需的，如果没有安装就忽略
     pass
 
+def parse_name_list(value, default=None):
+    """解析逗号或空白分隔的列表（组织名、Token 等），保持顺序并去重"""
+    names = []
+    for name in (value or '').replace(',', ' ').split():
+        if name not in names:
+            names.append(name)
+    return names or list(default or [])
+
 # 配置
 CONFIG = {
     'ORG_NAME': os.getenv('GITHUB_ORG', 'datawhalechina'),
+    # 多组织模式：GITHUB_ORGS=org1,org2 （未设置时只抓取 GITHUB_ORG）
+    'ORG_NAMES': parse_name_list(os.getenv('GITHUB_ORGS'), [os.getenv('GITHUB_ORG', 'datawhalechina')]),
+    'MAX_ORG_WORKERS': int(os.getenv('MAX_ORG_WORKERS', '4')),  # 并发抓取的组织数
+    'ENRICH_WORKERS': int(os.getenv('ENRICH_WORKERS', '8')),  # 并发补全成员信息的线程数
     'GITHUB_TOKEN': os.getenv('GITHUB_TOKEN'),
+    # Token 池：GITHUB_TOKENS=token1,token2 （多个 PAT 或 GitHub App 安装 Token），与 GITHUB_TOKEN 合并使用
+    'GITHUB_TOKENS': parse_name_list(' '.join(filter(None, [os.getenv('GITHUB_TOKEN'), os.getenv('GITHUB_TOKENS')]))),
+    'RATE_LIMIT_MAX_WAIT': int(os.getenv('RATE_LIMIT_MAX_WAIT', '3600')),  # 所有 Token 耗尽时最多等待的秒数，超过则放弃请求
+    'NEGATIVE_CACHE_TTL_HOURS': float(os.getenv('NEGATIVE_CACHE_TTL_HOURS', '72')),  # 404/410/451 结果的缓存时长（如已删除或改名的用户）
+    'CIRCUIT_BREAKER_THRESHOLD': int(os.getenv('CIRCUIT_BREAKER_THRESHOLD', '10')),  # 连续多少次暂时性失败（5xx、网络错误）后熔断
+    'CIRCUIT_BREAKER_COOLDOWN': int(os.getenv('CIRCUIT_BREAKER_COOLDOWN', '60')),  # 熔断后暂停请求的秒数，之后放行一个试探请求
     'OUTPUT_FILE': Path(__file__).parent.parent / 'docs' / 'public' / 'data' / 'members.csv',
     'COMMITS_FILE': Path(__file__).parent.parent / 'docs' / 'public' / 'data' / 'commits_weekly.json',  # 周commit数据文件
     'AVATARS_DIR': Path(__file__).parent.parent / 'docs' / 'public' / 'avatars',  # 头像缓存目录
-    'API_BASE': 'https://api.github.com',
-    'MIN_CONTRIBUTIONS': int(os.getenv('MIN_CONTRIBUTIONS', '10')),  # 最小贡献行数阈值（降低以包含更多贡献者）
+    'ORGS_DATA_DIR': Path(__file__).parent.parent / 'docs' / 'public' / 'data' / 'orgs',  # 多组织模式下各组织的数据目录
+    'MANIFEST_FILE': Path(__file__).parent.parent / 'docs' / 'public' / 'data' / 'manifest.json',  # 数据内容哈希清单
+    'CHANGES_FILE': Path(__file__).parent.parent / 'docs' / 'public' / 'data' / 'changes.json',  # 与上次发布相比的变更报告
+    'GRAPH_FILE': Path(__file__).parent.parent / 'docs' / 'public' / 'data' / 'graph.json',  # 预计算的成员-仓库-方向关系图
+    'SEARCH_INDEX_FILE': Path(__file__).parent.parent / 'docs' / 'public' / 'data' / 'search-index.json',  # 成员搜索索引
+    'ACTIVITY_FILE': Path(__file__).parent.parent / 'docs' / 'public' / 'data' / 'activity_punchcard.json',  # 7×24 提交打卡矩阵
+    'REPOS_FILE': Path(__file__).parent.parent / 'docs' / 'public' / 'data' / 'repos.json',  # 仓库元数据与贡献者、commit 统计
+    'SIMILAR_MEMBERS_FILE': Path(__file__).parent.parent / 'docs' / 'public' / 'data' / 'similar-members.json',  # 兴趣相近的成员
+    'SIMILAR_MEMBERS_K': int(os.getenv('SIMILAR_MEMBERS_K', '6')),  # 每个成员最多推荐的相似成员数
+    'MEMBERSHIP_FILE': Path(__file__).parent.parent / 'docs' / 'public' / 'data' / 'membership.json',  # 成员加入、离开记录（跨运行累积）
+    # 截止时间模式（--deadline）：临近截止时不再发起新请求，未抓取到的仓库和成员资料使用上次的结果
+    'DEADLINE_SECONDS': float(os.getenv('FETCH_DEADLINE_SECONDS', '0')),  # 从启动起可用的秒数（0 表示不限，--deadline 优先）
+    'DEADLINE_RESERVE_SECONDS': float(os.getenv('DEADLINE_RESERVE_SECONDS', '180')),  # 留给生成和写入数据文件的秒数
+    'DEADLINE_CRAWL_SHARE': float(os.getenv('DEADLINE_CRAWL_SHARE', '0.6')),  # 抓取仓库最多使用的时间比例，其余留给补全成员资料
+    # 预生成的批量导出数据包（NDJSON + 列式格式，预压缩并附带校验和清单）
+    'EXPORT_BUNDLES': os.getenv('EXPORT_BUNDLES', '1') != '0',
+    'EXPORT_DIR': Path(__file__).parent.parent / 'docs' / 'public' / 'data' / 'export',
+    'ACTIVITY_TIMEZONE': os.getenv('ACTIVITY_TIMEZONE', 'Asia/Shanghai'),  # 打卡矩阵使用的时区（IANA 名称或 +08:00 形式的偏移）
+    'GRAPH_LAYOUT_ITERATIONS': int(os.getenv('GRAPH_LAYOUT_ITERATIONS', '80')),  # 关系图布局迭代次数
+    'API_BASE': os.getenv('GITHUB_API_BASE', 'https://api.github.com').rstrip('/'),  # 可指向 GitHub Enterprise 或本地测试服务
+    # 监听模式（--watch）：轮询组织事件流，只重新抓取事件涉及的仓库和用户
+    'WATCH_INTERVAL': int(os.getenv('WATCH_INTERVAL', '60')),  # 轮询间隔秒数（不小于 GitHub 返回的 X-Poll-Interval）
+    'WATCH_RESYNC_HOURS': float(os.getenv('WATCH_RESYNC_HOURS', '24')),  # 全量重新抓取的间隔（事件流无法反映的变化，如删除仓库）
+    'WATCH_MAX_POLLS': int(os.getenv('WATCH_MAX_POLLS', '0')),  # 轮询次数上限（0 表示一直运行）
+    'CACHE_DIR': Path(os.getenv('FETCH_CACHE_DIR') or Path(__file__).parent.parent / '.cache'),  # 跨运行的本地缓存目录
+    'PIPELINE_REMOTE_TTL_HOURS': float(os.getenv('PIPELINE_REMOTE_TTL_HOURS', '6')),  # 流水线中读取 GitHub 数据的阶段产物的有效期
+    'SHARD_DIR': Path(os.getenv('SHARD_DIR') or Path(os.getenv('FETCH_CACHE_DIR') or Path(__file__).parent.parent / '.cache') / 'shards'),  # 分片抓取结果目录
+    # 用户资料分级刷新：近期有commit的活跃成员按较短 TTL 刷新，其余成员按较长 TTL 刷新
+    'PROFILE_TTL_ACTIVE_HOURS': float(os.getenv('PROFILE_TTL_ACTIVE_HOURS', '24')),
+    'PROFILE_TTL_INACTIVE_HOURS': float(os.getenv('PROFILE_TTL_INACTIVE_HOURS', '168')),
+    'PROFILE_REFRESH_LIMIT': int(os.getenv('PROFILE_REFRESH_LIMIT', '0')),  # 每次运行最多刷新的已缓存资料数（0 表示不限）
+    'MIN_CONTRIBUTIONS': int(os.getenv('MIN_CONTRIBUTIONS', '10')),  # 最小贡献阈值：/contributors 返回的提交数（降低以包含更多贡献者）
+    # 仓库贡献者增删行数（/stats/contributors）：运行开始时预热，后台轮询，按仓库 pushed_at 缓存
+    'CONTRIBUTOR_STATS': os.getenv('CONTRIBUTOR_STATS', '1') != '0',
+    'MIN_CONTRIBUTION_LINES': int(os.getenv('MIN_CONTRIBUTION_LINES', '0')),  # 按增删行数筛选贡献者（0 表示只按提交数；行数未就绪的仓库仍按提交数）
+    'CONTRIBUTOR_STATS_WORKERS': int(os.getenv('CONTRIBUTOR_STATS_WORKERS', '4')),  # 并发请求统计的线程数
+    'CONTRIBUTOR_STATS_MAX_WAIT': float(os.getenv('CONTRIBUTOR_STATS_MAX_WAIT', '30')),  # 仓库抓取完后最多再等待统计的秒数
     'MAX_REPOS_PER_PAGE': 100,  # 每页最大仓库数
-    'MAX_CONTRIBUTORS_PER_REPO': 100,  # 每个仓库最大贡献者数
+    'PAGE_WORKERS': int(os.getenv('PAGE_WORKERS', '8')),  # 得知总页数后并发请求分页列表的线程数
+    'MAX_CONTRIBUTORS_PER_REPO': int(os.getenv('MAX_CONTRIBUTORS_PER_REPO', '100')),  # 每个仓库最大贡献者数（超过 100 时分页获取）
     'MAX_USER_REPOS': 100,  # 获取用户仓库的最大数量
     'COMMIT_DAYS_RANGE': 7,  # 获取最近N天的commit数据
     'MAX_COMMITS_PER_REPO': 200,  # 每个仓库最大commit数
+    # commit 来源：api（commits API）或 git（本地 git 镜像，不消耗 API 额度，并统计增删行数）
+    'COMMIT_SOURCE': os.getenv('COMMIT_SOURCE', 'api'),
+    'GIT_MIRROR_DIR': Path(os.getenv('GIT_MIRROR_DIR') or Path(os.getenv('FETCH_CACHE_DIR') or Path(__file__).parent.parent / '.cache') / 'git-mirrors'),  # git 镜像目录
+    'GIT_REMOTE_BASE': os.getenv('GIT_REMOTE_BASE', 'https://github.com').rstrip('/'),  # 克隆地址前缀（可指向本地 file:// 目录）
+    'GIT_WORKERS': int(os.getenv('GIT_WORKERS') or os.cpu_count() or 4),  # 并发同步镜像和解析 git log 的进程数
+    'GIT_RESOLVE_AUTHORS': os.getenv('GIT_RESOLVE_AUTHORS', '1') != '0',  # 是否通过 API 把非 noreply 邮箱解析为 GitHub 用户名（结果永久缓存）
+    # PR、issue 和 review 活动：按日期切片的组织级 GraphQL 搜索（需要 Token），已结束的切片缓存后不再查询
+    'SEARCH_ACTIVITY': os.getenv('SEARCH_ACTIVITY', '1') != '0',
+    'GRAPHQL_URL': os.getenv('GITHUB_GRAPHQL_URL') or os.getenv('GITHUB_API_BASE', 'https://api.github.com').rstrip('/') + '/graphql',
+    'SEARCH_WORKERS': int(os.getenv('SEARCH_WORKERS', '3')),  # 并发查询的切片数（搜索有较严格的次级速率限制）
+    'SEARCH_SLICE_SETTLE_HOURS': float(os.getenv('SEARCH_SLICE_SETTLE_HOURS', '24')),  # 搜索切片结束多久后视为不再变化，不再重新查询（PR/issue 按创建时间、review 按 PR 更新时间切片）
     # 添加机器人账户过滤规则
     # 严格的机器人账户列表 - 只包含确认的官方机器人
     'BOT_USERNAMES': {
@@ -109,200 +201,798 @@ CONFIG = {
     }
 }
 
-def get_headers():
-    """获取请求头"""
+def get_headers(token=None):
+    """获取请求头（未指定 token 时使用 GITHUB_TOKEN）"""
     headers = {
         'User-Agent': 'members-visualization-bot',
         'Accept': 'application/vnd.github.v3+json'
     }
-    
-    if CONFIG['GITHUB_TOKEN']:
-        headers['Authorization'] = f"Bearer {CONFIG['GITHUB_TOKEN']}"
+
+    if token is None:
+        token = CONFIG['GITHUB_TOKEN']
+    if token:
+        headers['Authorization'] = f"Bearer {token}"
 
     return headers
 
-def fetch_api(url, retries=3):
-    """发送 API 请求（带重试逻辑）"""
-    if not CONFIG['GITHUB_TOKEN']:
-        print("⚠️  未设置 GITHUB_TOKEN，可能会遇到 API 速率限制")
+class TokenPool:
+    """
+    GitHub Token 池
+    根据响应头按 Token 和额度类别（X-RateLimit-Resource：core、search、graphql 等）分别记录剩余额度，
+    每次请求路由到该类别余量最多的 Token
+    未配置 Token 时池中只有一个匿名条目（空字符串）
+    """
 
-    for attempt in range(retries):
-        try:
-            print(f"🔄 请求 {url} (尝试 {attempt + 1}/{retries})")
+    DEFAULT_LIMIT = 5000
+
+    def __init__(self, tokens):
+        self.lock = threading.Lock()
+        self.requests = {token: 0 for token in (tokens or [''])}
+        self.budgets = {}  # {(token, 额度类别): {'remaining', 'limit', 'reset'}}
+
+    def acquire(self, resource='core'):
+        """选择该额度类别余量最多的 Token，返回 (token, None)；全部耗尽时返回 (None, 最早重置时间戳)"""
+        with self.lock:
+            now = time.time()
+            best_token, best_remaining, earliest_reset = None, -1, None
+
+            for token in self.requests:
+                budget = self.budgets.get((token, resource))
+                if budget is None or budget['reset'] <= now:
+                    # 未知余量或已过重置时间，视为满额
+                    remaining = (budget and budget['limit']) or self.DEFAULT_LIMIT
+                else:
+                    remaining = budget['remaining']
+
+                if remaining <= 0:
+                    if earliest_reset is None or budget['reset'] < earliest_reset:
+                        earliest_reset = budget['reset']
+                    continue
+
+                if remaining > best_remaining:
+                    best_token, best_remaining = token, remaining
+
+            if best_token is None:
+                return None, earliest_reset
+
+            # 预扣一次额度，避免并发请求都挤到同一个 Token
+            budget = self.budgets.get((best_token, resource))
+            if budget and budget['reset'] > now:
+                budget['remaining'] -= 1
+            self.requests[best_token] += 1
+            return best_token, None
+
+    def update(self, token, headers, resource='core'):
+        """根据响应头更新 Token 在对应额度类别（以响应头为准）的剩余额度"""
+        remaining = headers.get('X-RateLimit-Remaining')
+        if token not in self.requests or remaining is None:
+            return
+        resource = headers.get('X-RateLimit-Resource') or resource
+        with self.lock:
+            budget = self.budgets.setdefault((token, resource), {'remaining': None, 'limit': None, 'reset': 0})
+            try:
+                budget['remaining'] = int(remaining)
+                budget['limit'] = int(headers.get('X-RateLimit-Limit') or budget['limit'] or self.DEFAULT_LIMIT)
+                budget['reset'] = int(headers.get('X-RateLimit-Reset') or time.time() + 3600)
+            except ValueError:
+                pass
+
+    def total_remaining(self, resource='core'):
+        """所有 Token 在该额度类别的已知剩余额度之和"""
+        with self.lock:
+            return sum(budget['remaining'] or 0 for (_, budget_resource), budget in self.budgets.items()
+                       if budget_resource == resource)
+
+    def summary(self):
+        """各 Token 的使用统计（Token 只保留末4位），剩余额度按额度类别列出"""
+        with self.lock:
+            return {
+                (f"…{token[-4:]}" if token else 'anonymous'): {
+                    'requests': requests_count,
+                    'remaining': {resource: budget['remaining'] for (budget_token, resource), budget in sorted(self.budgets.items())
+                                  if budget_token == token}
+                }
+                for token, requests_count in self.requests.items()
+            }
 
-            response = requests.get(url, headers=get_headers(), timeout=30)
+def rate_limit_resource(url, payload=None):
+    """请求消耗的额度类别：GraphQL 和搜索接口使用独立于 core 的额度"""
+    if payload is not None:
+        return 'graphql'
+    if '/search/' in urlparse(url).path:
+        return 'search'
+    return 'core'
 
-            # 检查速率限制
-            remaining = response.headers.get('X-RateLimit-Remaining')
-            reset_time = response.headers.get('X-RateLimit-Reset')
+TOKEN_POOL = TokenPool(CONFIG['GITHUB_TOKENS'])
 
-            if remaining:
-                print(f"📊 API 剩余请求次数: {remaining}")
+# 永久性失败：重试不会成功，直接放弃；其中“资源不存在”类的结果跨运行缓存
+NEGATIVE_CACHE_STATUSES = (404, 410, 451)
+# 暂时性失败：可以退避后重试（其余 4xx 视为永久性失败）
+TRANSIENT_CLIENT_STATUSES = (408, 429)
 
-            if response.status_code == 403 and remaining == '0':
-                if reset_time and attempt < retries - 1:
-                    reset_timestamp = int(reset_time)
-                    wait_time = reset_timestamp - int(time.time()) + 1
-                    if wait_time > 0:
-                        print(f"⏳ API 速率限制，等待 {wait_time} 秒后重试...")
-                        time.sleep(wait_time)
-                        continue
-                raise requests.exceptions.HTTPError(f"API 速率限制已达上限")
+class NegativeCache:
+    """
+    永久性失败请求的缓存（404/410/451）
+    跨运行持久化到 CACHE_DIR，NEGATIVE_CACHE_TTL_HOURS 内不再请求同一 URL
+    """
 
-            response.raise_for_status()
-            return response.json()
+    VERSION = 1
 
-        except requests.RequestException as e:
-            print(f"❌ 请求失败 (尝试 {attempt + 1}/{retries}): {url}")
-            print(f"错误: {e}")
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.dirty = False
+        self.stats = {'hits': 0, 'added': 0}
+        self.load()
 
-            if attempt == retries - 1:
+    def load(self):
+        """读取缓存文件并丢弃过期条目（格式不兼容或损坏时忽略）"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                cutoff = time.time() - CONFIG['NEGATIVE_CACHE_TTL_HOURS'] * 3600
+                self.entries = {url: entry for url, entry in data.get('entries', {}).items() if entry.get('at', 0) > cutoff}
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        """原子写入缓存文件（没有变化时跳过）"""
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {'version': self.VERSION, 'entries': self.entries}
+            with OutputGeneration() as generation:
+                json.dump(data, generation.open(self.path), ensure_ascii=False)
+            self.dirty = False
+
+    def get(self, url):
+        """返回缓存的失败状态码，未缓存或已过期时返回 None"""
+        with self.lock:
+            entry = self.entries.get(url)
+            if not entry or time.time() - entry['at'] >= CONFIG['NEGATIVE_CACHE_TTL_HOURS'] * 3600:
                 return None
+            self.stats['hits'] += 1
+            return entry['status']
 
-            # 指数退避延迟
-            wait_time = (2 ** attempt)
-            print(f"⏳ 等待 {wait_time} 秒后重试...")
-            time.sleep(wait_time)
+    def put(self, url, status):
+        """记录永久性失败"""
+        with self.lock:
+            self.entries[url] = {'status': status, 'at': time.time()}
+            self.stats['added'] += 1
+            self.dirty = True
 
-    return None
+NEGATIVE_CACHE = NegativeCache(CONFIG['CACHE_DIR'] / 'negative_cache.json')
 
-def get_org_repos(org_name):
-    """获取组织仓库列表（支持分页）"""
-    print(f"正在获取组织 {org_name} 的仓库列表...")
+class CircuitBreaker:
+    """
+    熔断器
+    连续 CIRCUIT_BREAKER_THRESHOLD 次暂时性失败后熔断，CIRCUIT_BREAKER_COOLDOWN 秒内所有请求直接失败；
+    冷却结束后放行一个试探请求，成功则恢复，失败则重新计时；
+    试探请求没有得到结论（遇到速率限制、Token 耗尽等）时由 release 交还，下一个请求继续试探
+    """
 
-    all_repos = []
-    page = 1
-    per_page = CONFIG['MAX_REPOS_PER_PAGE']
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.prober = None  # 发出试探请求的线程（同一次调用内的重试仍可继续试探）
+        self.stats = {'opened': 0, 'rejected': 0}
+
+    def allow(self):
+        """是否允许发送请求"""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.probing and self.prober == threading.get_ident():
+                return True
+            if self.probing or time.time() - self.opened_at < self.cooldown:
+                self.stats['rejected'] += 1
+                return False
+            self.probing = True  # 半开状态：只放行一个试探请求
+            self.prober = threading.get_ident()
+            return True
 
-    while True:
-        url = f"{CONFIG['API_BASE']}/orgs/{org_name}/repos?per_page={per_page}&page={page}&type=public&sort=updated"
-        repos = fetch_api(url)
+    def release(self):
+        """本线程的试探请求结束但没有结论（未调用 record_success/record_failure）：回到半开状态，由下一个请求继续试探"""
+        with self.lock:
+            if self.probing and self.prober == threading.get_ident():
+                self.probing = False
+                self.prober = None
+
+    def record_success(self):
+        """服务端正常响应（包括 404 等永久性失败），清零失败计数并关闭熔断"""
+        with self.lock:
+            if self.opened_at is not None:
+                print("✅ 请求恢复正常，关闭熔断")
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+            self.prober = None
+
+    def record_failure(self):
+        """记录一次暂时性失败，达到阈值（或试探请求失败）时熔断"""
+        with self.lock:
+            self.failures += 1
+            if self.probing or (self.opened_at is None and self.threshold > 0 and self.failures >= self.threshold):
+                if not self.probing:
+                    self.stats['opened'] += 1
+                print(f"⛔ 连续 {self.failures} 次请求失败，熔断 {self.cooldown} 秒")
+                self.opened_at = time.time()
+                self.probing = False
+                self.prober = None
+
+CIRCUIT_BREAKER = CircuitBreaker(CONFIG['CIRCUIT_BREAKER_THRESHOLD'], CONFIG['CIRCUIT_BREAKER_COOLDOWN'])
+
+class Deadline:
+    """
+    墙钟截止时间（--deadline），从脚本启动时开始计时
+    可用时间为截止时间减去 DEADLINE_RESERVE_SECONDS（留给生成和写入数据文件），
+    抓取仓库最多使用其中的 DEADLINE_CRAWL_SHARE，之后只补全成员资料；超过可用时间后不再发起新请求
+    """
 
-        if not repos or len(repos) == 0:
-            break
+    def __init__(self, seconds=0):
+        self.start = time.time()
+        self.seconds = 0.0
+        self.lock = threading.Lock()
+        self.stats = {'stale_repos': 0, 'missing_repos': 0, 'stale_members': 0, 'missing_members': 0}
+        self.set(seconds)
+
+    def set(self, seconds):
+        self.seconds = max(0.0, float(seconds or 0))
+
+    @property
+    def enabled(self):
+        return self.seconds > 0
+
+    def cutoff(self, share=1.0):
+        """按可用时间的比例 share 计算的最晚开始时间戳，未设置截止时间时返回 None"""
+        if not self.enabled:
+            return None
+        usable = max(0.0, self.seconds - CONFIG['DEADLINE_RESERVE_SECONDS'])
+        return self.start + usable * share
+
+    def allows(self, share=1.0):
+        """是否还可以开始新的工作"""
+        cutoff = self.cutoff(share)
+        return cutoff is None or time.time() < cutoff
+
+    def remaining(self, share=1.0):
+        """距离最晚开始时间的秒数，未设置截止时间时返回 None"""
+        cutoff = self.cutoff(share)
+        return None if cutoff is None else max(0.0, cutoff - time.time())
+
+    def record(self, kind):
+        """记录一个使用上次结果（stale_*）或没有可用结果（missing_*）的仓库或成员"""
+        with self.lock:
+            self.stats[kind] += 1
+
+    @property
+    def partial(self):
+        return any(self.stats.values())
+
+    def summary(self):
+        return (f"{self.seconds:.0f} 秒, 已用 {time.time() - self.start:.0f} 秒 | "
+                f"仓库 {self.stats['stale_repos']} 个沿用上次结果, {self.stats['missing_repos']} 个缺失 | "
+                f"成员 {self.stats['stale_members']} 个沿用上次资料, {self.stats['missing_members']} 个缺失")
+
+def parse_duration(value):
+    """解析时长：秒数，或带 s/m/h 后缀（如 50m、1.5h）"""
+    text = (value or '').strip().lower()
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    try:
+        if text and text[-1] in units:
+            seconds = float(text[:-1]) * units[text[-1]]
+        else:
+            seconds = float(text)
+    except ValueError:
+        seconds = 0
+    if seconds <= 0:
+        raise ValueError(f"无效的时长: {value}（如 3000、50m、1.5h）")
+    return seconds
+
+DEADLINE = Deadline(CONFIG['DEADLINE_SECONDS'])
+
+def retry_after_seconds(response):
+    """解析 Retry-After 响应头（秒数或 HTTP 日期），没有时返回 None"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
 
-        # 过滤掉 fork 的仓库，只保留原创仓库
-        original_repos = [repo for repo in repos if not repo.get('fork', False)]
-        all_repos.extend(original_repos)
+def is_secondary_rate_limit(response):
+    """额度未耗尽的 403/429：次级速率限制（并发或频率过高、滥用检测）"""
+    if response.status_code == 429 or 'Retry-After' in response.headers:
+        return True
+    try:
+        message = str(response.json().get('message', '')).lower()
+    except (ValueError, AttributeError):
+        return False
+    return 'rate limit' in message or 'abuse' in message
 
-        print(f"获取第 {page} 页：{len(repos)} 个仓库（{len(original_repos)} 个原创）")
+def backoff_delay(attempt):
+    """指数退避延迟，加入随机抖动（0.5~1 倍），避免并发线程同时重试"""
+    return (2 ** attempt) * (0.5 + random.random() / 2)
 
-        # 测试模式：限制总仓库数
-        if CONFIG.get('TEST_MODE', False) and len(all_repos) >= CONFIG.get('TEST_MAX_REPOS', 5):
-            print(f"🧪 测试模式：已达到仓库数限制 ({CONFIG.get('TEST_MAX_REPOS', 5)} 个)，停止获取")
-            all_repos = all_repos[:CONFIG.get('TEST_MAX_REPOS', 5)]  # 确保不超过限制
-            break
+def fetch_api_response(url, retries=3, payload=None):
+    """
+    发送 API 请求（从 Token 池中选择余量最多的 Token），返回 (data, 响应头)，失败时返回 (None, None)
+    传入 payload 时以 JSON body 发送 POST 请求（GraphQL）
+    按响应分类处理：
+    - 404/410/451 等永久性失败不重试，资源不存在的结果写入负缓存
+    - 主速率限制（额度耗尽）切换 Token（所有 Token 的该类额度都耗尽时等到重置），计入重试次数；次级速率限制按 Retry-After 等待
+    - 5xx 和网络错误指数退避重试，连续失败过多时熔断
+    """
+    if not CONFIG['GITHUB_TOKENS']:
+        print("⚠️  未设置 GITHUB_TOKEN，可能会遇到 API 速率限制")
 
-        # 如果返回的仓库数少于每页限制，说明已经是最后一页
-        if len(repos) < per_page:
-            break
+    cached_status = NEGATIVE_CACHE.get(url) if payload is None else None
+    if cached_status is not None:
+        print(f"⏭️  跳过已知失败的请求 ({cached_status}): {url}")
+        return None, None
 
-        page += 1
+    try:
+        resource = rate_limit_resource(url, payload)
+        attempt = 0
+        while attempt < retries:
+            if not CIRCUIT_BREAKER.allow():
+                print(f"⛔ 熔断中，跳过请求: {url}")
+                return None, None
+
+            token, reset_at = TOKEN_POOL.acquire(resource)
+            if token is None:
+                # 所有 Token 额度都已耗尽
+                wait_time = int(reset_at - time.time()) + 1
+                if wait_time > CONFIG['RATE_LIMIT_MAX_WAIT'] or (DEADLINE.enabled and wait_time > DEADLINE.remaining()):
+                    print(f"⛔ 所有 Token 的 {resource} 额度已耗尽，{wait_time} 秒后才会重置，跳过请求: {url}")
+                    return None, None
+                print(f"⏳ 所有 Token 的 {resource} 额度已耗尽，等待 {wait_time} 秒后重试...")
+                time.sleep(max(wait_time, 0))
+                continue
 
-        # 安全限制：最多获取20页（2000个仓库）
-        if page > 20:
-            print("⚠️ 达到页数限制，停止获取")
-            break
+            try:
+                print(f"🔄 请求 {url} (尝试 {attempt + 1}/{retries})")
+                if payload is None:
+                    response = requests.get(url, headers=get_headers(token), timeout=30)
+                else:
+                    response = requests.post(url, headers=get_headers(token), json=payload, timeout=60)
+            except requests.RequestException as e:
+                attempt += 1
+                CIRCUIT_BREAKER.record_failure()
+                print(f"❌ 请求失败 (尝试 {attempt}/{retries}): {url}")
+                print(f"错误: {e}")
+                if attempt >= retries:
+                    return None, None
+                wait_time = backoff_delay(attempt - 1)
+                print(f"⏳ 等待 {wait_time:.1f} 秒后重试...")
+                time.sleep(wait_time)
+                continue
 
-    print(f"总共找到 {len(all_repos)} 个原创仓库")
-    return all_repos
+            TOKEN_POOL.update(token, response.headers, resource)
 
-def get_repo_contributors(org_name, repo_name):
-    """获取仓库贡献者（过滤机器人账户）"""
-    all_contributors = []
-    page = 1
-    per_page = 100
+            # 检查速率限制
+            remaining = response.headers.get('X-RateLimit-Remaining')
+            if remaining:
+                print(f"📊 API 剩余请求次数: {remaining}")
 
-    while True:
-        url = f"{CONFIG['API_BASE']}/repos/{org_name}/{repo_name}/contributors?per_page={per_page}&page={page}"
-        contributors = fetch_api(url)
+            status = response.status_code
+            if status < 400:
+                CIRCUIT_BREAKER.record_success()
+                if status == 204:
+                    return [], response.headers  # 无内容（如空仓库）
+                if status == 202 and not response.content:
+                    return {}, response.headers  # 服务端仍在计算（如仓库统计），稍后再请求
+                try:
+                    return response.json(), response.headers
+                except ValueError:
+                    print(f"❌ 响应不是有效的 JSON: {url}")
+                    return None, None
+
+            if status in (403, 429) and remaining == '0':
+                # 当前 Token 的该类额度已耗尽（池中已记录重置时间），换用其他 Token 重试，同样计入重试次数
+                attempt += 1
+                if attempt >= retries:
+                    print(f"⛔ {resource} 额度已耗尽，放弃请求: {url}")
+                    return None, None
+                print(f"⏳ 当前 Token 的 {resource} 额度已耗尽，切换 Token 重试...")
+                continue
 
-        if not contributors or len(contributors) == 0:
-            break
+            if status in (403, 429) and is_secondary_rate_limit(response):
+                # 次级速率限制：换 Token 无济于事，按 Retry-After 等待（没有时至少等待一分钟）
+                attempt += 1
+                wait_time = retry_after_seconds(response)
+                if wait_time is None:
+                    wait_time = max(60.0, backoff_delay(attempt))
+                wait_time += random.random()
+                if attempt >= retries or wait_time > CONFIG['RATE_LIMIT_MAX_WAIT']:
+                    print(f"⛔ 触发次级速率限制，放弃请求: {url}")
+                    return None, None
+                print(f"⏳ 触发次级速率限制，等待 {wait_time:.0f} 秒后重试...")
+                time.sleep(wait_time)
+                continue
 
-        all_contributors.extend(contributors)
+            if 400 <= status < 500 and status not in TRANSIENT_CLIENT_STATUSES:
+                # 永久性失败（不存在、无权限、参数错误等），服务端本身是正常的
+                CIRCUIT_BREAKER.record_success()
+                if status in NEGATIVE_CACHE_STATUSES and payload is None:
+                    NEGATIVE_CACHE.put(url, status)
+                print(f"❌ 请求失败 ({status}，不重试): {url}")
+                return None, None
+
+            # 5xx、408 等暂时性失败
+            attempt += 1
+            CIRCUIT_BREAKER.record_failure()
+            print(f"❌ 请求失败 ({status}，尝试 {attempt}/{retries}): {url}")
+            if attempt >= retries:
+                return None, None
+            wait_time = retry_after_seconds(response)
+            if wait_time is None:
+                wait_time = backoff_delay(attempt - 1)
+            if wait_time > CONFIG['RATE_LIMIT_MAX_WAIT']:
+                return None, None
+            print(f"⏳ 等待 {wait_time:.1f} 秒后重试...")
+            time.sleep(wait_time)
 
-        # 如果返回的贡献者数少于每页限制，说明已经是最后一页
-        if len(contributors) < per_page:
-            break
+        return None, None
+    finally:
+        # 试探请求以速率限制、Token 耗尽等结束时交还试探机会，避免熔断器一直停在半开状态
+        CIRCUIT_BREAKER.release()
 
-        page += 1
+def fetch_api(url, retries=3):
+    """发送 API 请求，返回解析后的 JSON（失败时返回 None）"""
+    return fetch_api_response(url, retries)[0]
 
-        # 安全限制：最多获取10页（1000个贡献者）
-        if page > 10:
-            print(f"    ⚠️ 仓库 {repo_name} 贡献者过多，已达页数限制")
-            break
+def fetch_api_conditional(url, etag=None):
+    """
+    带 ETag 的条件请求，返回 (status, data, etag, poll_interval)
+    内容未变化时返回 304（不消耗速率限制额度），请求失败时 status 为 None
+    """
+    if not CIRCUIT_BREAKER.allow():
+        print(f"⛔ 熔断中，跳过本次轮询: {url}")
+        return None, None, etag, None
+
+    try:
+        token, _ = TOKEN_POOL.acquire()
+        if token is None:
+            print(f"⏳ 所有 Token 额度已耗尽，跳过本次轮询: {url}")
+            return None, None, etag, None
+
+        headers = get_headers(token)
+        if etag:
+            headers['If-None-Match'] = etag
+
+        response = requests.get(url, headers=headers, timeout=30)
+        TOKEN_POOL.update(token, response.headers)
+        poll_interval = int(response.headers.get('X-Poll-Interval') or 0) or None
+        if response.status_code >= 500:
+            CIRCUIT_BREAKER.record_failure()
+        else:
+            CIRCUIT_BREAKER.record_success()
+        if response.status_code == 304:
+            return 304, None, etag, poll_interval
+        response.raise_for_status()
+        return response.status_code, response.json(), response.headers.get('ETag'), poll_interval
+    except (requests.ConnectionError, requests.Timeout) as e:
+        CIRCUIT_BREAKER.record_failure()
+        print(f"❌ 条件请求失败: {url}")
+        print(f"错误: {e}")
+        return None, None, etag, None
+    except (requests.RequestException, ValueError) as e:
+        print(f"❌ 条件请求失败: {url}")
+        print(f"错误: {e}")
+        return None, None, etag, None
+    finally:
+        CIRCUIT_BREAKER.release()
+
+class ListingStats:
+    """
+    分页列表的抓取统计
+    记录请求的页数、去重丢弃的条目，以及未能完整获取的列表（请求失败或超出配置上限）
+    """
 
-    # 过滤掉贡献数低于阈值的贡献者和机器人账户
-    qualified_contributors = []
-    for contributor in all_contributors:
-        username = contributor['login']
-        contributions = contributor.get('contributions', 0)
-        
-        # 检查是否为机器人账户
-        if is_bot_account(username):
-            print(f"    🤖 跳过机器人账户: {username}")
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {'lists': 0, 'pages': 0, 'duplicates': 0}
+        self.truncated = {}  # {列表名: 原因}
+
+    def record(self, pages, duplicates=0):
+        with self.lock:
+            self.stats['lists'] += 1
+            self.stats['pages'] += pages
+            self.stats['duplicates'] += duplicates
+
+    def truncate(self, name, reason):
+        with self.lock:
+            self.truncated[name] = reason
+
+    def summary(self):
+        """统计摘要（截断的列表逐个列出）"""
+        with self.lock:
+            return dict(self.stats, truncated=dict(sorted(self.truncated.items())))
+
+LISTING_STATS = ListingStats()
+
+def link_header_pages(headers):
+    """从 Link 响应头解析 {rel: 页码}（如 next、last）"""
+    pages = {}
+    for part in ((headers or {}).get('Link') or '').split(','):
+        match = re.search(r'<([^>]*)>\s*;\s*rel="(\w+)"', part)
+        if not match:
             continue
-            
-        if contributions >= CONFIG['MIN_CONTRIBUTIONS']:
-            qualified_contributors.append({
-                'login': contributor['login'],
-                'contributions': contributions,
-                'html_url': contributor['html_url'],
-                'avatar_url': contributor['avatar_url']
-            })
+        page = parse_qs(urlparse(match.group(1)).query).get('page')
+        if page and page[0].isdigit():
+            pages[match.group(2)] = int(page[0])
+    return pages
 
-    print(f"    📊 总贡献者: {len(all_contributors)}, 符合条件(≥{CONFIG['MIN_CONTRIBUTIONS']}行): {len(qualified_contributors)}")
-    return qualified_contributors
+def has_next_page(headers):
+    """响应之后是否还有更多分页"""
+    pages = link_header_pages(headers)
+    return 'next' in pages or pages.get('last', 1) > 1
 
-def collect_contributors_from_repos(org_name):
-    """从组织仓库中收集贡献者数据"""
-    print(f"🚀 开始从 {org_name} 组织仓库收集贡献者数据...")
+def fetch_all_pages(url, name, per_page=100, max_items=None, key=None, project=None, listing=None):
+    """
+    获取分页列表的全部结果，请求失败时返回 None
+    先请求第一页，从 Link 头得知总页数后并发请求其余页；结果按页序合并并按 key 去重
+    （并发翻页期间列表变化会让条目在相邻页重复出现），未能完整获取时记入 LISTING_STATS
+    传入 project 时每页一收到就把条目投影为精简记录（返回 None 的条目丢弃），key 作用于投影后的记录
+    传入 listing（dict）时写入 listing['complete']：列表是否完整（没有超出上限、没有失败的分页）
+    """
+    separator = '&' if '?' in url else '?'
+    page_sizes = {}  # 每页原始条目数，用于判断是否还有下一页
+
+    def project_page(page, data):
+        if data is None:
+            return None
+        page_sizes[page] = len(data)
+        if project is None:
+            return data
+        return [record for record in map(project, data) if record is not None]
+
+    def fetch_page(page):
+        return project_page(page, fetch_api(f"{url}{separator}per_page={per_page}&page={page}"))
+
+    first_page, headers = fetch_api_response(f"{url}{separator}per_page={per_page}&page=1")
+    if first_page is None:
+        LISTING_STATS.truncate(name, '第 1 页请求失败')
+        if listing is not None:
+            listing['complete'] = False
+        return None
 
-    # 获取组织所有仓库
-    repos = get_org_repos(org_name)
-    if not repos:
-        print("❌ 未找到任何仓库")
-        return {}
+    pages = {1: project_page(1, first_page)}
+    last_page = link_header_pages(headers).get('last', 1)
+    limit_pages = math.ceil(max_items / per_page) if max_items else None
+    complete = True
+    if limit_pages and last_page > limit_pages:
+        LISTING_STATS.truncate(name, f'超出上限 {max_items} 条（共 {last_page} 页）')
+        last_page = limit_pages
+        complete = False
+
+    if last_page > 1:
+        with ThreadPoolExecutor(max_workers=max(1, min(CONFIG['PAGE_WORKERS'], last_page - 1))) as executor:
+            pages.update(zip(range(2, last_page + 1), executor.map(fetch_page, range(2, last_page + 1))))
+
+    # 枚举期间列表可能变长：最后一页仍是满页时继续顺序请求，直到不满一页
+    page = last_page
+    while page_sizes.get(page, 0) >= per_page and not (limit_pages and page >= limit_pages):
+        page += 1
+        pages[page] = fetch_page(page)
+
+    if limit_pages and page >= limit_pages and page_sizes.get(page, 0) >= per_page:
+        complete = False  # 停在上限页且仍是满页，之后可能还有条目
+
+    failed = [page for page, data in pages.items() if data is None]
+    if failed:
+        LISTING_STATS.truncate(name, f"第 {', '.join(map(str, sorted(failed)))} 页请求失败")
+        complete = False
+
+    items = []
+    seen = set()
+    duplicates = 0
+    for page in sorted(pages):
+        for item in pages[page] or []:
+            item_key = key(item) if key else None
+            if item_key is not None:
+                if item_key in seen:
+                    duplicates += 1
+                    continue
+                seen.add(item_key)
+            items.append(item)
+
+    LISTING_STATS.record(len(pages), duplicates)
+    if max_items and len(items) > max_items:
+        items = items[:max_items]
+        complete = False
+    if listing is not None:
+        listing['complete'] = complete
+    return items
+
+# 精简记录类型：API 返回的 JSON 一收到就投影为只含后续用到字段的 __slots__ 对象
+# （没有每个实例的 __dict__，也不保留几十个 URL 字段，大组织下每个实体的内存占用小一个数量级）
+class Record:
+    """__slots__ 记录的基类：按字段名构造（忽略多余字段），与 dict 互转用于缓存文件和流水线产物"""
+
+    __slots__ = ()
+    OPTIONAL = ()  # 为 None 时不写入 to_dict 结果的字段
+    TRANSIENT = ()  # 不写入 to_dict 结果、构造时重新计算的字段
+
+    def __init__(self, **fields):
+        for field in self.__slots__:
+            setattr(self, field, fields.get(field))
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def to_dict(self):
+        result = {}
+        for field in self.__slots__:
+            value = getattr(self, field)
+            if field in self.TRANSIENT or (value is None and field in self.OPTIONAL):
+                continue
+            result[field] = value
+        return result
+
+    def replace(self, **changes):
+        """返回修改了部分字段的副本"""
+        return type(self)(**dict({field: getattr(self, field) for field in self.__slots__}, **changes))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+# 仓库列表接口已返回的元数据，保留下来生成仓库数据集（不需要额外请求）
+REPO_METADATA_FIELDS = ('name', 'full_name', 'description', 'html_url', 'language', 'topics', 'stargazers_count',
+                        'forks_count', 'open_issues_count', 'archived', 'created_at', 'pushed_at')
+
+class Repo(Record):
+    """组织仓库（仓库列表接口返回的元数据）"""
+
+    __slots__ = REPO_METADATA_FIELDS
+
+class Contributor(Record):
+    """仓库贡献者（增删行数只在有行数统计时存在）"""
+
+    __slots__ = ('login', 'contributions', 'html_url', 'avatar_url', 'lines_added', 'lines_deleted')
+    OPTIONAL = ('lines_added', 'lines_deleted')
+
+class UserProfile(Record):
+    """用户资料：/users/{name} 中用到的字段，加上由 /users/{name}/repos 汇总的 Star 数和仓库 topics"""
+
+    __slots__ = ('login', 'name', 'bio', 'location', 'company', 'avatar_url',
+                 'public_repos', 'followers', 'following', 'type', 'total_stars', 'repo_topics')
+
+    @classmethod
+    def from_api(cls, user_details, user_repos):
+        """由用户详情和用户仓库列表构造，用户详情获取失败时返回 None"""
+        if not user_details:
+            return None
+        repos = [repo for repo in user_repos or [] if isinstance(repo, dict)]
+        return cls(**dict(user_details,
+                          total_stars=sum(repo.get('stargazers_count') or 0 for repo in repos),
+                          repo_topics=[topic for repo in repos for topic in repo.get('topics') or []]))
+
+class Commit(Record):
+    """统计窗口内的 commit（提交时间只解析一次，日期、小时、北京时间等字段按需计算）"""
+
+    __slots__ = ('sha', 'message', 'author_name', 'author_email', 'date', 'repo', 'org', 'url',
+                 'github_username', 'author_avatar_url', 'lines_added', 'lines_deleted', 'date_parsed')
+    OPTIONAL = ('lines_added', 'lines_deleted')
+    TRANSIENT = ('date_parsed',)
+
+    def __init__(self, **fields):
+        super().__init__(**fields)
+        if self.date_parsed is None:
+            self.date_parsed = datetime.fromisoformat(self.date.replace('Z', '+00:00'))
+
+    @classmethod
+    def from_api(cls, commit, org_name, repo_name):
+        """由 commits API 返回的记录（或 git 镜像生成的同结构记录）构造"""
+        author = commit['commit']['author']
+        user = commit.get('author') or {}
+        fields = {
+            'sha': commit['sha'][:8],
+            'message': commit['commit']['message'].split('\n')[0][:100],
+            'author_name': author['name'],
+            'author_email': author['email'],
+            'date': author['date'],
+            'repo': repo_name,
+            'org': org_name,
+            'url': commit['html_url'],
+            'github_username': user.get('login'),
+            'author_avatar_url': user.get('avatar_url')
+        }
+        # 本地 git 镜像提供增删行数（commits 列表 API 不返回）
+        if commit.get('stats'):
+            fields['lines_added'] = commit['stats'].get('additions', 0)
+            fields['lines_deleted'] = commit['stats'].get('deletions', 0)
+        return cls(**fields)
+
+    @property
+    def date_str(self):
+        return self.date_parsed.strftime('%Y-%m-%d')
+
+    @property
+    def hour(self):
+        return self.date_parsed.hour
+
+    @property
+    def beijing_hour(self):
+        return (self.date_parsed + timedelta(hours=8)).hour
+
+    @property
+    def beijing_time(self):
+        """北京时间（UTC+8）"""
+        return (self.date_parsed + timedelta(hours=8)).isoformat()
+
+    @property
+    def is_night_owl(self):
+        """是否为深夜时段（北京时间22:00-06:00）"""
+        return self.beijing_hour >= 22 or self.beijing_hour < 6
+
+class Member(Record):
+    """
+    成员记录（members.csv 的一行；avatar_url 只在头像留给 avatars 阶段下载时记录）
+    freshness 为资料的新鲜度：本次获取或缓存未过期为 fresh，截止时间模式下沿用过期缓存为 stale（as_of 为上次获取时间），
+    没有任何资料为 missing
+    """
 
-    contributors_data = {}  # {username: {repos: [repo_names], total_contributions: int, user_info: dict}}
+    __slots__ = ('id', 'name', 'github', 'domains', 'repositories', 'public_repos', 'total_stars', 'followers',
+                 'following', 'avatar', 'bio', 'location', 'company', 'freshness', 'as_of', 'avatar_url')
+    OPTIONAL = ('freshness', 'as_of', 'avatar_url')
 
-    for i, repo in enumerate(repos):
-        repo_name = repo['name']
-        print(f"\n📁 处理仓库 {i + 1}/{len(repos)}: {repo_name}")
+def get_org_repos(org_name):
+    """获取组织仓库列表（并发分页，不限页数），返回 Repo 记录"""
+    print(f"正在获取组织 {org_name} 的仓库列表...")
 
-        try:
-            # 获取仓库贡献者
-            contributors = get_repo_contributors(org_name, repo_name)
-            print(f"  ✓ 找到 {len(contributors)} 个符合条件的贡献者（≥{CONFIG['MIN_CONTRIBUTIONS']}行）")
-
-            for contributor in contributors:
-                username = contributor['login']
-                contributions = contributor['contributions']
-
-                if username not in contributors_data:
-                    contributors_data[username] = {
-                        'repos': [],
-                        'total_contributions': 0,
-                        'user_info': {
-                            'html_url': contributor['html_url'],
-                            'avatar_url': contributor['avatar_url']
-                        }
-                    }
+    # 测试模式：限制总仓库数
+    max_repos = CONFIG.get('TEST_MAX_REPOS', 5) if CONFIG.get('TEST_MODE', False) else None
+    url = f"{CONFIG['API_BASE']}/orgs/{org_name}/repos?type=public&sort=updated"
+    forks = []
 
-                contributors_data[username]['repos'].append(repo_name)
-                contributors_data[username]['total_contributions'] += contributions
+    def project(repo):
+        # 过滤掉 fork 的仓库，只保留原创仓库
+        if repo.get('fork', False):
+            forks.append(repo.get('id'))
+            return None
+        return Repo.from_dict(repo)
 
-            # API 速率限制控制
-            delay = 0.1 if CONFIG['GITHUB_TOKEN'] else 0.5
-            time.sleep(delay)
+    all_repos = fetch_all_pages(url, f"{org_name} 仓库列表", CONFIG['MAX_REPOS_PER_PAGE'],
+                                max_items=CONFIG['MAX_REPOS_PER_PAGE'] if max_repos is not None else None,
+                                key=lambda repo: repo.full_name, project=project) or []
+    print(f"获取到 {len(all_repos) + len(set(forks))} 个仓库（{len(all_repos)} 个原创）")
 
-        except Exception as e:
-            print(f"  ⚠️ 处理仓库 {repo_name} 时出错: {e}")
-            continue
+    if max_repos is not None and len(all_repos) > max_repos:
+        print(f"🧪 测试模式：已达到仓库数限制 ({max_repos} 个)，停止获取")
+        all_repos = all_repos[:max_repos]
+
+    print(f"总共找到 {len(all_repos)} 个原创仓库")
+    return all_repos
+
+# 共享头像存储：多组织并发抓取时同一用户的头像只下载一次
+_avatar_locks = defaultdict(threading.Lock)
+_avatar_locks_guard = threading.Lock()
+
+def get_avatar_lock(username):
+    """获取指定用户头像的下载锁"""
+    with _avatar_locks_guard:
+        return _avatar_locks[username]
 
-    print(f"\n🎉 收集完成！总共发现 {len(contributors_data)} 个贡献者")
-    return contributors_data
+def write_avatar_file(avatar_path, content):
+    """先写临时文件再重命名，避免并发读取到半个头像文件"""
+    tmp_path = avatar_path.with_name(f".{avatar_path.name}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, avatar_path)
 
 def download_avatar(avatar_url, username):
     """下载并缓存用户头像"""
@@ -316,22 +1006,24 @@ def download_avatar(avatar_url, username):
     avatar_filename = f"{username}.jpg"
     avatar_path = CONFIG['AVATARS_DIR'] / avatar_filename
 
-    # 如果头像已存在，直接返回相对路径
-    if avatar_path.exists():
-        return f"avatars/{avatar_filename}"
+    with get_avatar_lock(username):
+        # 如果头像已存在，直接返回相对路径
+        if avatar_path.exists():
+            return f"avatars/{avatar_filename}"
+        if not DEADLINE.allows():
+            return None  # 临近截止时间，新头像留到下次运行下载
 
-    try:
-        print(f"  📸 下载头像: {username}")
-        response = requests.get(avatar_url, timeout=30)
-        response.raise_for_status()
+        try:
+            print(f"  📸 下载头像: {username}")
+            response = requests.get(avatar_url, timeout=30)
+            response.raise_for_status()
 
-        with open(avatar_path, 'wb') as f:
-            f.write(response.content)
+            write_avatar_file(avatar_path, response.content)
 
-        return f"avatars/{avatar_filename}"
-    except Exception as e:
-        print(f"  ⚠️ 头像下载失败 {username}: {e}")
-        return None
+            return f"avatars/{avatar_filename}"
+        except Exception as e:
+            print(f"  ⚠️ 头像下载失败 {username}: {e}")
+            return None
 
 def ensure_avatar_exists(username, avatar_url):
     """确保指定用户的头像文件存在，如果不存在则下载"""
@@ -345,24 +1037,24 @@ def ensure_avatar_exists(username, avatar_url):
     avatar_filename = f"{username}.jpg"
     avatar_path = CONFIG['AVATARS_DIR'] / avatar_filename
 
-    # 如果头像已存在，无需下载
-    if avatar_path.exists():
-        return True
+    with get_avatar_lock(username):
+        # 如果头像已存在，无需下载
+        if avatar_path.exists():
+            return True
 
-    try:
-        # 静默下载头像，避免过多输出
-        response = requests.get(avatar_url, timeout=10)
-        response.raise_for_status()
+        try:
+            # 静默下载头像，避免过多输出
+            response = requests.get(avatar_url, timeout=10)
+            response.raise_for_status()
 
-        with open(avatar_path, 'wb') as f:
-            f.write(response.content)
+            write_avatar_file(avatar_path, response.content)
 
-        print(f"      📸 新增头像: {username}")
-        return True
+            print(f"      📸 新增头像: {username}")
+            return True
 
-    except Exception as e:
-        # 静默处理错误，避免中断数据收集流程
-        return False
+        except Exception as e:
+            # 静默处理错误，避免中断数据收集流程
+            return False
 
 def get_user_details(username):
     """获取用户详细信息"""
@@ -378,9 +1070,181 @@ def get_user_repos(username, max_repos=None):
     repos = fetch_api(url)
     return repos if repos else []
 
-def calculate_user_stats(user_details, user_repos):
-    """计算用户统计信息"""
-    if not user_details:
+class ProfileCache:
+    """
+    用户资料缓存（/users/{name} 与 /users/{name}/repos）
+    跨运行持久化到 CACHE_DIR，按分级 TTL 决定哪些成员需要刷新：
+    近期有commit的活跃成员使用 PROFILE_TTL_ACTIVE_HOURS，其余成员使用 PROFILE_TTL_INACTIVE_HOURS，
+    已缓存资料的刷新次数受 PROFILE_REFRESH_LIMIT 限制（最过期的优先），新成员总是立即获取
+    截止时间模式下按 plan 排出的优先级获取，到时未获取的成员沿用过期的缓存资料
+    """
+
+    VERSION = 2
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.fresh = set()  # 本次运行可直接使用缓存的用户
+        self.due = []  # 本次运行需要获取资料的用户（新成员、强制刷新的、最过期的在前）
+        self.deferred = {}  # 截止时间前未获取的用户 -> 沿用的缓存资料获取时间（没有缓存时为 None）
+        self.failed = set()  # 本次运行获取失败且没有缓存的用户，之后不再重复请求
+        self.stats = {'hits': 0, 'fetched': 0, 'stale_fallback': 0, 'deferred': 0, 'failed': 0}
+        self.load()
+
+    def load(self):
+        """读取缓存文件（格式不兼容或损坏时忽略；版本 1 的缓存保存的是精简后的原始资料，直接转换）"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                self.entries = {
+                    username: {'fetched_at': entry.get('fetched_at', 0), 'profile': UserProfile.from_dict(entry['profile'])}
+                    for username, entry in data.get('profiles', {}).items()
+                }
+            elif data.get('version') == 1:
+                self.entries = {
+                    username: {'fetched_at': entry.get('fetched_at', 0),
+                               'profile': UserProfile.from_api(entry['details'], entry['repos'])}
+                    for username, entry in data.get('profiles', {}).items() if entry.get('details')
+                }
+        except (OSError, ValueError, KeyError, TypeError):
+            self.entries = {}
+
+    def save(self):
+        """原子写入缓存文件"""
+        with self.lock:
+            profiles = {
+                username: {'fetched_at': entry['fetched_at'], 'profile': entry['profile'].to_dict()}
+                for username, entry in self.entries.items()
+            }
+            data = {'version': self.VERSION, 'profiles': profiles}
+            with OutputGeneration() as generation:
+                json.dump(data, generation.open(self.path), ensure_ascii=False)
+
+    def plan(self, usernames, active_users=(), refresh_users=()):
+        """
+        根据分级 TTL 和刷新上限，确定本次运行哪些成员可直接使用缓存
+        refresh_users 中的成员（如监听模式下事件涉及的用户）不论是否过期都重新获取
+        """
+        now = time.time()
+        due = []
+        fresh = set()
+        new_users = []
+        forced_users = []
+        for username in usernames:
+            entry = self.entries.get(username)
+            if not entry:
+                new_users.append(username)  # 新成员，必须获取
+                continue
+            if username in refresh_users:
+                forced_users.append(username)
+                continue
+            ttl_hours = CONFIG['PROFILE_TTL_ACTIVE_HOURS'] if username in active_users else CONFIG['PROFILE_TTL_INACTIVE_HOURS']
+            age_hours = (now - entry.get('fetched_at', 0)) / 3600
+            if age_hours < ttl_hours:
+                fresh.add(username)
+            else:
+                due.append((age_hours / max(ttl_hours, 1e-6), username))
+
+        # 超出刷新上限的过期资料本次继续使用缓存，留到后续运行刷新（最过期的优先刷新）
+        limit = CONFIG['PROFILE_REFRESH_LIMIT']
+        due.sort(reverse=True)
+        deferred = due[limit:] if limit > 0 else []
+        fresh.update(username for _, username in deferred)
+        # 获取顺序：新成员（活跃的在前）、强制刷新的、到期的（相对 TTL 最过期的在前）
+        new_users.sort(key=lambda username: username not in active_users)
+        refresh_order = new_users + forced_users + [username for _, username in due[:len(due) - len(deferred)]]
+
+        with self.lock:
+            self.fresh = fresh
+            self.due = refresh_order
+            self.deferred = {}
+            self.failed = set()
+        print(f"🗂️  用户资料缓存: {len(fresh) - len(deferred)} 个未过期, {len(due) - len(deferred)} 个到期刷新, "
+              f"{len(deferred)} 个推迟刷新, {len(forced_users)} 个强制刷新, {len(new_users)} 个新成员")
+
+    def has_failed(self, username):
+        """本次运行是否已获取失败（没有缓存可回退）"""
+        with self.lock:
+            return username in self.failed
+
+    def get(self, username):
+        """返回可直接使用的缓存资料（UserProfile），需要刷新时返回 None"""
+        with self.lock:
+            if username not in self.fresh or username not in self.entries:
+                return None
+            if username not in self.deferred:
+                self.stats['hits'] += 1
+            return self.entries[username]['profile']
+
+    def defer(self, username):
+        """截止时间前来不及获取：返回过期的缓存资料（没有缓存时返回 None），并记录沿用的资料获取时间"""
+        with self.lock:
+            entry = self.entries.get(username)
+            if username not in self.deferred:
+                self.fresh.add(username)
+                self.deferred[username] = entry['fetched_at'] if entry else None
+                self.stats['deferred'] += 1
+                DEADLINE.record('stale_members' if entry else 'missing_members')
+            return entry['profile'] if entry else None
+
+    def freshness(self, username):
+        """成员资料的新鲜度，返回 (fresh/stale/missing, 沿用资料的获取时间或 None)"""
+        with self.lock:
+            if username not in self.deferred:
+                return 'fresh', None
+            fetched_at = self.deferred[username]
+            if fetched_at is None:
+                return 'missing', None
+            return 'stale', search_timestamp(datetime.fromtimestamp(fetched_at, timezone.utc))
+
+    def put(self, username, user_details, user_repos):
+        """
+        写入新获取的资料，返回 UserProfile；获取失败时回退到旧缓存（如果有），
+        没有时返回 None，并记入 failed（本次运行的其余部分不再重复请求）
+        """
+        with self.lock:
+            self.fresh.add(username)
+            if user_details is None and username in self.entries:
+                self.stats['stale_fallback'] += 1
+                return self.entries[username]['profile']
+            if user_details is None:
+                self.failed.add(username)
+                self.stats['failed'] += 1
+                return None
+            self.stats['fetched'] += 1
+            profile = UserProfile.from_api(user_details, user_repos)
+            if profile is not None:
+                self.entries[username] = {'fetched_at': time.time(), 'profile': profile}
+            return profile
+
+PROFILE_CACHE = ProfileCache(CONFIG['CACHE_DIR'] / 'user_profiles.json')
+
+def get_user_profile(username, api_stats=None):
+    """获取用户详情和用户仓库（优先使用缓存，跨组织共享），返回 UserProfile，获取失败时返回 None"""
+    cached = PROFILE_CACHE.get(username)
+    if cached:
+        return cached
+    if PROFILE_CACHE.has_failed(username):
+        return None
+    if not DEADLINE.allows():
+        # 临近截止时间，不再发起新请求
+        return PROFILE_CACHE.defer(username)
+
+    user_details = get_user_details(username)
+    user_repos = get_user_repos(username)
+
+    with PROFILE_CACHE.lock:
+        if api_stats is not None:
+            api_stats['users'] += 1
+            api_stats['user_repos'] += 1
+            api_stats['total'] += 2
+    return PROFILE_CACHE.put(username, user_details, user_repos)
+
+def calculate_user_stats(profile):
+    """计算用户统计信息（总 Stars 在构造 UserProfile 时已从用户仓库中累加）"""
+    if not profile:
         return {
             'public_repos': 0,
             'total_stars': 0,
@@ -389,20 +1253,14 @@ def calculate_user_stats(user_details, user_repos):
         }
 
     # 从用户详情获取基本统计
-    stats = {
-        'public_repos': user_details.get('public_repos', 0),
-        'followers': user_details.get('followers', 0),
-        'following': user_details.get('following', 0),
-        'total_stars': 0
+    return {
+        'public_repos': profile.public_repos,
+        'followers': profile.followers,
+        'following': profile.following,
+        'total_stars': profile.total_stars
     }
 
-    # 计算总 Stars（从用户仓库中累加）
-    if user_repos:
-        stats['total_stars'] = sum(repo.get('stargazers_count', 0) for repo in user_repos)
-
-    return stats
-
-def infer_domains_from_repos(repo_names, user_bio='', user_repos=None):
+def infer_domains_from_repos(repo_names, user_bio='', repo_topics=None):
     """根据仓库 topics、名称和用户简介推断研究方向"""
     domains = set()
 
@@ -412,14 +1270,8 @@ def infer_domains_from_repos(repo_names, user_bio='', user_repos=None):
         if key in text or value.lower() in text:
             domains.add(value)
 
-    # 收集所有仓库的 topics
-    all_topics = []
-    if user_repos:
-        for repo in user_repos:
-            if isinstance(repo, dict) and 'topics' in repo:
-                topics = repo.get('topics', [])
-                if topics:
-                    all_topics.extend(topics)
+    # 所有仓库的 topics（构造 UserProfile 时已按仓库顺序收集）
+    all_topics = list(repo_topics or [])
 
     # 从仓库 topics 中提取关键词（优先使用 topics）
     topics_text = ' '.join(all_topics).lower()
@@ -461,85 +1313,1784 @@ def infer_domains_from_repos(repo_names, user_bio='', user_repos=None):
     if any(keyword in search_text for keyword in ['competition']):
         domains.add('数据竞赛')
 
-    # 如果没有找到任何领域，设置默认值
-    if not domains:
-        domains.add('数据科学')
+    # 如果没有找到任何领域，设置默认值
+    if not domains:
+        domains.add('数据科学')
+
+    return sorted(domains)
+
+def clean_csv_field(text):
+    """清理CSV字段中的换行符和其他问题字符"""
+    if not text:
+        return ''
+
+    # 转换为字符串并清理
+    text = str(text)
+
+    # 替换换行符为空格
+    text = text.replace('\n', ' ').replace('\r', ' ')
+
+    # 替换多个连续空格为单个空格
+    import re
+    text = re.sub(r'\s+', ' ', text)
+
+    # 去除首尾空格
+    text = text.strip()
+
+    return text
+
+class OutputGeneration:
+    """
+    一次原子输出（一“代”数据）
+    所有文件先写入目标目录下的临时文件，全部写完后统一 fsync 并依次 os.replace 覆盖目标文件，
+    避免脚本中途崩溃时站点读到被截断的文件，或新的 CSV 与旧的 JSON 混在一起；
+    进程被强制结束（SIGKILL、超时）时来不及清理的临时文件，由之后写入同一目标的输出清理
+    """
+
+    # 无法判断写入进程是否仍在运行时，临时文件超过这个时间（秒）才视为遗留
+    ABANDONED_AFTER = 24 * 3600
+
+    def __init__(self):
+        self.id = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        self.files = []  # [(临时文件路径, 目标路径, 文件对象)]
+
+    def open(self, target_path, newline=None, binary=False):
+        """打开目标文件对应的临时文件用于写入（由 commit/abort 负责关闭）"""
+        target_path = Path(target_path)
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        self.remove_abandoned(target_path)
+        tmp_path = target_path.with_name(f".{target_path.name}.{self.id}.tmp")
+        f = open(tmp_path, 'wb') if binary else open(tmp_path, 'w', encoding='utf-8', newline=newline)
+        self.files.append((tmp_path, target_path, f))
+        return f
+
+    def remove_abandoned(self, target_path):
+        """删除目标文件此前被中断的输出留下的临时文件（写入进程仍在运行的不删除）"""
+        prefix = f".{target_path.name}."
+        for tmp_path in target_path.parent.iterdir():
+            name = tmp_path.name
+            if not (name.startswith(prefix) and name.endswith('.tmp')) or not self.abandoned(tmp_path):
+                continue
+            try:
+                tmp_path.unlink()
+                print(f"🧹 清理遗留的临时文件: {tmp_path}")
+            except OSError:
+                pass
+
+    @classmethod
+    def abandoned(cls, tmp_path):
+        """临时文件的写入进程是否已不存在（无法判断时按修改时间）"""
+        pid = tmp_path.name[:-len('.tmp')].rsplit('-', 1)[-1]
+        if pid.isdigit() and int(pid) == os.getpid():
+            return False
+        if pid.isdigit() and os.name == 'posix':
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                return True
+            except OSError:
+                return False
+            return False
+        try:
+            return time.time() - tmp_path.stat().st_mtime > cls.ABANDONED_AFTER
+        except OSError:
+            return False
+
+    def commit(self):
+        """fsync 所有临时文件后原子替换目标文件"""
+        for _, _, f in self.files:
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+        for tmp_path, target_path, _ in self.files:
+            os.replace(tmp_path, target_path)
+        for directory in {target_path.parent for _, target_path, _ in self.files}:
+            fsync_directory(directory)
+        self.files = []
+
+    def abort(self):
+        """放弃本次输出，删除临时文件，目标文件保持不变"""
+        for tmp_path, _, f in self.files:
+            f.close()
+            if tmp_path.exists():
+                tmp_path.unlink()
+        self.files = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+        return False
+
+def fsync_directory(directory):
+    """fsync 目录，确保重命名操作落盘（Windows 不支持时忽略）"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+MEMBER_CSV_HEADER = [
+    'id', 'name', 'github', 'domain', 'repositories',
+    'public_repos', 'total_stars', 'followers', 'following',
+    'avatar', 'bio', 'location', 'company', 'freshness', 'as_of'
+]
+
+def member_to_csv_row(member):
+    """将成员记录（Member）转换为 CSV 行"""
+    return [
+        clean_csv_field(member.id),
+        clean_csv_field(member.name),
+        clean_csv_field(member.github),
+        ';'.join(member.domains),
+        ';'.join(member.repositories or []),
+        member.public_repos,
+        member.total_stars,
+        member.followers,
+        member.following,
+        clean_csv_field(member.avatar),
+        clean_csv_field(member.bio),
+        clean_csv_field(member.location),
+        clean_csv_field(member.company),
+        member.freshness or 'fresh',
+        member.as_of or ''
+    ]
+
+# 不参与内容哈希的易变字段（每次运行都会变化，不代表数据有实质变更）
+VOLATILE_FIELDS = ('update_time', 'generation', 'optimization_stats')
+
+# 变更报告中按数值计算差值的成员字段
+NUMERIC_MEMBER_FIELDS = ('public_repos', 'total_stars', 'followers', 'following')
+
+def canonical_hash(data):
+    """计算数据的规范化 SHA-256（键排序、紧凑格式）"""
+    text = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def members_content_hash(header, row_hashes):
+    """成员 CSV 的内容哈希（与行顺序无关）"""
+    digest = hashlib.sha256(canonical_hash(header).encode('utf-8'))
+    for member_id in sorted(row_hashes):
+        digest.update(f"{member_id}:{row_hashes[member_id]}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+def json_content_hash(json_data):
+    """JSON 数据（commit 数据、关系图等）的内容哈希（忽略更新时间等易变字段）"""
+    content = {key: value for key, value in json_data.items() if key not in VOLATILE_FIELDS}
+    # 先按 JSON 往返一次（如整数键转为字符串），保证与从文件读回的数据哈希一致
+    return canonical_hash(json.loads(json.dumps(content, ensure_ascii=False)))
+
+def csv_int(value):
+    """CSV 中的数值字段转为整数（空值或无法解析时为 0）"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+class MemberCsvWriter:
+    """
+    流式写入成员 CSV：成员补全完成一个就写一行，同时记录每行的内容哈希和数值字段合计（用于变更报告）
+    keep_rows 为 True 时保留各行内容（关系图、搜索索引等派生数据需要全部成员，各组织的 CSV 不需要）
+    """
+
+    def __init__(self, csvfile, keep_rows=False):
+        self.writer = csv.writer(csvfile)
+        self.writer.writerow(MEMBER_CSV_HEADER)
+        self.count = 0
+        self.row_hashes = {}
+        self.totals = dict.fromkeys(NUMERIC_MEMBER_FIELDS, 0)
+        self.rows = {} if keep_rows else None
+
+    def write(self, member):
+        row = member_to_csv_row(member)
+        self.writer.writerow(row)
+        self.count += 1
+
+        values = [str(value) for value in row]
+        record = dict(zip(MEMBER_CSV_HEADER, values))
+        self.row_hashes[values[0]] = canonical_hash(values)
+        for field in NUMERIC_MEMBER_FIELDS:
+            self.totals[field] += csv_int(record[field])
+        if self.rows is not None:
+            self.rows[values[0]] = record
+
+    def content_hash(self):
+        return members_content_hash(MEMBER_CSV_HEADER, self.row_hashes)
+
+def iter_member_csv(path):
+    """逐行读取成员 CSV，产出 (表头, 行)；文件不存在时不产出任何行"""
+    try:
+        f = open(path, 'r', newline='', encoding='utf-8')
+    except OSError:
+        return
+    with f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        for row in reader:
+            if row:
+                yield header, row
+
+def read_members_hash(path):
+    """流式计算现有成员 CSV 的内容哈希（只保留每行的哈希），文件不存在时返回 None"""
+    if not Path(path).exists():
+        return None
+    header, row_hashes = None, {}
+    for header, row in iter_member_csv(path):
+        row_hashes[row[0]] = canonical_hash(row)
+    if header is None:
+        # 只有表头（或空文件）时单独读取表头
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            header = next(csv.reader(f), [])
+    return members_content_hash(header, row_hashes)
+
+def read_commits_snapshot(path):
+    """读取现有 commit 数据，返回 (内容哈希, 数据)；文件不存在或损坏时返回 (None, {})"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None, {}
+    return json_content_hash(data), data
+
+def read_content_hash(path):
+    """按文件类型读取现有输出文件的内容哈希"""
+    if Path(path).suffix == '.csv':
+        return read_members_hash(path)
+    return read_commits_snapshot(path)[0]
+
+def summarize_member_changes(previous_path, writer):
+    """
+    比较上次发布的成员 CSV 与本次写入的成员：新增/移除成员、字段变化和汇总指标差值
+    旧文件逐行读取，按行哈希找出有变化的成员，只对这些成员逐字段比较（writer 需保留各行内容）
+    """
+    previous_ids = set()
+    old_totals = dict.fromkeys(NUMERIC_MEMBER_FIELDS, 0)
+    changed = {}
+    for header, row in iter_member_csv(previous_path):
+        member_id = row[0]
+        previous_ids.add(member_id)
+        old_row = dict(zip(header, row))
+        for field in NUMERIC_MEMBER_FIELDS:
+            old_totals[field] += csv_int(old_row.get(field))
+        if member_id not in writer.row_hashes or writer.row_hashes[member_id] == canonical_hash(row):
+            continue
+
+        new_row = writer.rows[member_id]
+        diff = {}
+        for field in MEMBER_CSV_HEADER[1:]:
+            old_value, new_value = old_row.get(field, ''), new_row.get(field, '')
+            if old_value == new_value:
+                continue
+            if field in NUMERIC_MEMBER_FIELDS:
+                diff[field] = {'old': csv_int(old_value), 'new': csv_int(new_value),
+                               'delta': csv_int(new_value) - csv_int(old_value)}
+            else:
+                diff[field] = {'old': old_value, 'new': new_value}
+        if diff:
+            changed[member_id] = diff
+
+    metrics = {
+        field: {'old': old_totals[field], 'new': writer.totals[field], 'delta': writer.totals[field] - old_totals[field]}
+        for field in NUMERIC_MEMBER_FIELDS
+    }
+    return {
+        'total': writer.count,
+        'previous_total': len(previous_ids),
+        'added': sorted(set(writer.row_hashes) - previous_ids),
+        'removed': sorted(previous_ids - set(writer.row_hashes)),
+        'changed': dict(sorted(changed.items())),
+        'metrics': metrics
+    }
+
+def summarize_commit_changes(previous, current):
+    """比较前后两次的 commit 数据：总数差值和活跃用户变化"""
+    old_users = previous.get('user_commits', {})
+    new_users = current.get('user_commits', {})
+    old_total = previous.get('total_commits', 0)
+    new_total = current.get('total_commits', 0)
+    return {
+        'total_commits': {'old': old_total, 'new': new_total, 'delta': new_total - old_total},
+        'active_users': {'old': len(old_users), 'new': len(new_users), 'delta': len(new_users) - len(old_users)},
+        'users_added': sorted(set(new_users) - set(old_users)),
+        'users_removed': sorted(set(old_users) - set(new_users))
+    }
+
+def build_change_report(generation, previous_hashes, current_hashes, member_changes, commit_changes):
+    """生成变更报告（供 CI 判断是否需要重新构建部署）"""
+    data_dir = CONFIG['OUTPUT_FILE'].parent
+    files = {}
+    for path, current_hash in current_hashes.items():
+        files[Path(path).relative_to(data_dir).as_posix()] = {
+            'changed': previous_hashes.get(path) != current_hash,
+            'content_hash': current_hash
+        }
+
+    return {
+        'changed': previous_hashes != current_hashes,
+        'generation': generation.id,
+        'generated_at': datetime.now().isoformat(),
+        'content_hash': canonical_hash(sorted((name, info['content_hash']) for name, info in files.items())),
+        'files': files,
+        'members': member_changes,
+        'commits': commit_changes
+    }
+
+def write_manifest(generation, change_report):
+    """把内容哈希清单和变更报告写入本代输出"""
+    manifest = {
+        'content_hash': change_report['content_hash'],
+        'generation': change_report['generation'],
+        'generated_at': change_report['generated_at'],
+        'files': {name: info['content_hash'] for name, info in change_report['files'].items()}
+    }
+    json.dump(manifest, generation.open(CONFIG['MANIFEST_FILE']), ensure_ascii=False, indent=2)
+    json.dump(change_report, generation.open(CONFIG['CHANGES_FILE']), ensure_ascii=False, indent=2)
+
+# 导出数据包中每个用户的 commit 聚合字段（分时分布、commit 消息等明细留在 commits_weekly.json）
+EXPORT_COMMIT_FIELDS = ('total_commits', 'repo_count', 'repos', 'active_days', 'avg_commits_per_day', 'night_owl_commits',
+                        'night_owl_percentage', 'first_commit_date', 'last_commit_date', 'lines_added', 'lines_deleted',
+                        'prs_opened', 'issues_opened', 'reviews', 'daily_commits')
+
+def export_member_records(member_rows):
+    """成员 CSV 行转为带类型的记录（列表字段拆分、数值字段转为整数）"""
+    records = []
+    for member_id in sorted(member_rows):
+        record = dict(member_rows[member_id])
+        record['domain'] = [d for d in record.get('domain', '').split(';') if d]
+        record['repositories'] = [r for r in record.get('repositories', '').split(';') if r]
+        for field in NUMERIC_MEMBER_FIELDS:
+            record[field] = int(record.get(field) or 0)
+        records.append(record)
+    return records
+
+def export_commit_records(commits_data):
+    """每个用户的 commit 聚合记录（没有 commit 数据时为空）"""
+    return [
+        dict({'id': username}, **{field: stats.get(field) for field in EXPORT_COMMIT_FIELDS})
+        for username, stats in sorted(((commits_data or {}).get('user_commits') or {}).items())
+    ]
+
+def gzip_bytes(data):
+    """确定性的 gzip 压缩（不写入文件名和时间戳，相同内容得到相同校验和）"""
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def columnar_value(value):
+    """列式格式中嵌套的对象存为 JSON 字符串（列表保持原样）"""
+    return json.dumps(value, ensure_ascii=False, sort_keys=True) if isinstance(value, dict) else value
+
+def encode_columnar(records):
+    """
+    记录编码为列式格式，返回 (扩展名, 字节)
+    安装了 pyarrow 时输出 Parquet（列内 zstd 压缩），否则输出 gzip 压缩的列式 JSON
+    """
+    columns = []
+    for record in records:
+        columns.extend(key for key in record if key not in columns)
+    data = {column: [columnar_value(record.get(column)) for record in records] for column in columns}
+
+    if pyarrow is not None:
+        sink = pyarrow.BufferOutputStream()
+        pyarrow.parquet.write_table(pyarrow.table(data), sink, compression='zstd')
+        return 'parquet', sink.getvalue().to_pybytes()
+
+    content = {'columns': columns, 'rows': len(records), 'data': data}
+    return 'columns.json.gz', gzip_bytes(json.dumps(content, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+def write_export_bundles(generation, datasets, change_report):
+    """
+    把各数据集写成预压缩的导出数据包（NDJSON.gz + 列式格式）和带 SHA-256 的清单，随本代数据一起发布
+    datasets 为 {数据集名: [记录]}
+    """
+    export_dir = CONFIG['EXPORT_DIR']
+    files = {}
+    for name, records in datasets.items():
+        ndjson = ''.join(json.dumps(record, ensure_ascii=False, sort_keys=True) + '\n' for record in records)
+        extension, columnar = encode_columnar(records)
+        for file_name, content, file_format in ((f"{name}.ndjson.gz", gzip_bytes(ndjson.encode('utf-8')), 'ndjson'),
+                                                (f"{name}.{extension}", columnar, extension.split('.')[0])):
+            generation.open(export_dir / file_name, binary=True).write(content)
+            files[file_name] = {
+                'dataset': name,
+                'format': file_format,
+                'rows': len(records),
+                'bytes': len(content),
+                'sha256': hashlib.sha256(content).hexdigest()
+            }
+
+    manifest = {
+        'generation': change_report['generation'],
+        'generated_at': change_report['generated_at'],
+        'content_hash': change_report['content_hash'],
+        'files': files
+    }
+    json.dump(manifest, generation.open(export_dir / 'manifest.json'), ensure_ascii=False, indent=2)
+    # 与 sha256sum -c 兼容的校验和文件
+    generation.open(export_dir / 'SHA256SUMS').write(''.join(f"{info['sha256']}  {file_name}\n" for file_name, info in files.items()))
+    print(f"📦 导出数据包: {len(files)} 个文件（{', '.join(sorted({info['format'] for info in files.values()}))}）")
+
+def write_github_output(name, value):
+    """在 GitHub Actions 中设置步骤输出（本地运行时忽略）"""
+    output_path = os.getenv('GITHUB_OUTPUT')
+    if output_path:
+        with open(output_path, 'a', encoding='utf-8') as f:
+            f.write(f"{name}={value}\n")
+
+def save_to_csv(members, output_file, generation=None):
+    """保存数据到 CSV 文件（未传入 generation 时单独原子写入）"""
+    if generation is None:
+        with OutputGeneration() as own_generation:
+            return save_to_csv(members, output_file, own_generation)
+
+    writer = MemberCsvWriter(generation.open(output_file, newline=''))
+    for member in members:
+        writer.write(member)
+    return writer.count
+
+def check_existing_data():
+    """检查现有数据文件"""
+    return os.path.exists(CONFIG['OUTPUT_FILE'])
+
+def backup_existing_data():
+    """备份现有数据"""
+    if os.path.exists(CONFIG['OUTPUT_FILE']):
+        # 将Path对象转换为字符串进行操作
+        output_file_str = str(CONFIG['OUTPUT_FILE'])
+        backup_path = output_file_str.replace('.csv', f'.backup.{int(time.time())}.csv')
+        import shutil
+        shutil.copy2(CONFIG['OUTPUT_FILE'], backup_path)
+        print(f"📋 已备份现有数据: {backup_path}")
+        return backup_path
+    return None
+
+# 关系图节点类型
+GRAPH_NODE_MEMBER, GRAPH_NODE_DOMAIN, GRAPH_NODE_REPO = 0, 1, 2
+
+# 布局时每个节点最多参与斥力计算的邻居数
+GRAPH_LAYOUT_MAX_NEIGHBORS = 48
+
+def build_sparse_adjacency(node_count, edges):
+    """由边列表构建 CSR 格式的稀疏邻接表，返回 (indptr, indices)"""
+    degree = array('l', [0]) * node_count
+    for source, target in edges:
+        degree[source] += 1
+        degree[target] += 1
+
+    indptr = array('l', [0]) * (node_count + 1)
+    for i in range(node_count):
+        indptr[i + 1] = indptr[i] + degree[i]
+
+    indices = array('l', [0]) * indptr[node_count]
+    fill = array('l', indptr[:node_count])
+    for source, target in edges:
+        indices[fill[source]] = target
+        fill[source] += 1
+        indices[fill[target]] = source
+        fill[target] += 1
+    return indptr, indices
+
+def stable_unit(text, salt=''):
+    """根据字符串得到稳定的 [0, 1) 伪随机数（不受 PYTHONHASHSEED 影响）"""
+    digest = hashlib.sha1(f"{salt}:{text}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+def compute_graph_layout(node_ids, edges, iterations=None):
+    """
+    确定性的力导向布局（Fruchterman-Reingold）
+    初始位置由节点 ID 哈希得到，斥力只在相邻网格内计算，单次迭代接近 O(节点数 + 边数)
+    """
+    iterations = CONFIG['GRAPH_LAYOUT_ITERATIONS'] if iterations is None else iterations
+    n = len(node_ids)
+    if n == 0:
+        return [], []
+
+    k = 10.0  # 理想边长
+    radius = k * math.sqrt(n)
+    xs, ys = [], []
+    for node_id in node_ids:
+        angle = 2 * math.pi * stable_unit(node_id, 'angle')
+        r = radius * math.sqrt(stable_unit(node_id, 'radius'))
+        xs.append(r * math.cos(angle))
+        ys.append(r * math.sin(angle))
+
+    cell_size = 2 * k
+    temperature = radius / 4
+    for iteration in range(iterations):
+        dx = [0.0] * n
+        dy = [0.0] * n
+
+        # 斥力：只计算相邻网格中的节点，邻居过多时等间隔抽样并按比例放大，控制单次迭代的开销
+        grid = defaultdict(list)
+        for i in range(n):
+            grid[(math.floor(xs[i] / cell_size), math.floor(ys[i] / cell_size))].append(i)
+        for (cx, cy), cell_nodes in grid.items():
+            neighbors = [j for gx in (cx - 1, cx, cx + 1) for gy in (cy - 1, cy, cy + 1) for j in grid.get((gx, gy), ())]
+            stride = max(1, len(neighbors) // GRAPH_LAYOUT_MAX_NEIGHBORS)
+            for offset, i in enumerate(cell_nodes):
+                sample = neighbors[offset % stride::stride]
+                weight = len(neighbors) / len(sample)
+                for j in sample:
+                    if j == i:
+                        continue
+                    ddx, ddy = xs[i] - xs[j], ys[i] - ys[j]
+                    dist_sq = ddx * ddx + ddy * ddy or 0.01
+                    force = weight * k * k / dist_sq
+                    dx[i] += ddx * force
+                    dy[i] += ddy * force
+
+        # 引力：沿边相互吸引
+        for source, target in edges:
+            ddx, ddy = xs[source] - xs[target], ys[source] - ys[target]
+            dist = math.sqrt(ddx * ddx + ddy * ddy) or 0.01
+            force = dist / k
+            dx[source] -= ddx * force
+            dy[source] -= ddy * force
+            dx[target] += ddx * force
+            dy[target] += ddy * force
+
+        # 轻微向心力，避免孤立的连通分量漂远；位移受温度限制并逐步冷却
+        for i in range(n):
+            dx[i] -= xs[i] * 0.05
+            dy[i] -= ys[i] * 0.05
+            length = math.sqrt(dx[i] * dx[i] + dy[i] * dy[i])
+            if length > 0:
+                step = min(length, temperature)
+                xs[i] += dx[i] / length * step
+                ys[i] += dy[i] / length * step
+        temperature *= 1 - 1 / max(iterations - iteration, 2)
+
+    # 归一化到 0-1000 的坐标范围
+    min_x, max_x, min_y, max_y = min(xs), max(xs), min(ys), max(ys)
+    scale = 1000 / max(max_x - min_x, max_y - min_y, 1e-6)
+    return ([round((x - min_x) * scale, 1) for x in xs],
+            [round((y - min_y) * scale, 1) for y in ys])
+
+def detect_communities(indptr, indices, max_iterations=20):
+    """确定性标签传播：按节点顺序异步更新，平票时取最小标签；社区编号按规模从大到小排列"""
+    n = len(indptr) - 1
+    labels = list(range(n))
+    for _ in range(max_iterations):
+        changed = False
+        for i in range(n):
+            if indptr[i] == indptr[i + 1]:
+                continue
+            counts = Counter(labels[j] for j in indices[indptr[i]:indptr[i + 1]])
+            best_count = max(counts.values())
+            best_label = min(label for label, count in counts.items() if count == best_count)
+            if best_label != labels[i]:
+                labels[i] = best_label
+                changed = True
+        if not changed:
+            break
+
+    sizes = Counter(labels)
+    order = {label: rank for rank, (label, _) in enumerate(sorted(sizes.items(), key=lambda item: (-item[1], item[0])))}
+    return [order[label] for label in labels]
+
+def degree_stats(degrees):
+    """度数统计：数量、最大值、平均值、中位数"""
+    if not degrees:
+        return {'count': 0, 'max': 0, 'mean': 0, 'median': 0}
+    ordered = sorted(degrees)
+    middle = len(ordered) // 2
+    median = ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+    return {'count': len(ordered), 'max': ordered[-1], 'mean': round(sum(ordered) / len(ordered), 2), 'median': median}
+
+def build_member_graph(member_rows):
+    """
+    构建成员-仓库、成员-研究方向二部图，预计算布局坐标、社区和度数统计
+    member_rows 为 {id: CSV 行字典}，输出为按列存储的紧凑结构，前端可直接渲染
+    """
+    node_ids, names, types = [], [], []
+    index = {}
+
+    def add_node(node_id, name, node_type):
+        if node_id not in index:
+            index[node_id] = len(node_ids)
+            node_ids.append(node_id)
+            names.append(name)
+            types.append(node_type)
+        return index[node_id]
+
+    # 节点按类型和名称排序后编号，保证相同数据得到相同的图
+    domains = sorted({d for row in member_rows.values() for d in row.get('domain', '').split(';') if d})
+    repos = sorted({r for row in member_rows.values() for r in row.get('repositories', '').split(';') if r})
+    for member_id in sorted(member_rows):
+        row = member_rows[member_id]
+        name = row.get('name') or ''
+        add_node(f"member:{member_id}", name if name not in ('', 'None') else member_id, GRAPH_NODE_MEMBER)
+    for domain in domains:
+        add_node(f"domain:{domain}", domain, GRAPH_NODE_DOMAIN)
+    for repo in repos:
+        add_node(f"repo:{repo}", repo, GRAPH_NODE_REPO)
+
+    edges = []
+    for member_id in sorted(member_rows):
+        row = member_rows[member_id]
+        member_index = index[f"member:{member_id}"]
+        for domain in sorted({d for d in row.get('domain', '').split(';') if d}):
+            edges.append((member_index, index[f"domain:{domain}"]))
+        for repo in sorted({r for r in row.get('repositories', '').split(';') if r}):
+            edges.append((member_index, index[f"repo:{repo}"]))
+
+    indptr, indices = build_sparse_adjacency(len(node_ids), edges)
+    degrees = [indptr[i + 1] - indptr[i] for i in range(len(node_ids))]
+    xs, ys = compute_graph_layout(node_ids, edges)
+    communities = detect_communities(indptr, indices)
+
+    return {
+        'version': 1,
+        'node_types': ['member', 'domain', 'repo'],
+        'nodes': {
+            'id': node_ids,
+            'name': names,
+            'type': types,
+            'x': xs,
+            'y': ys,
+            'community': communities,
+            'degree': degrees
+        },
+        # 边按 [source, target, source, target, ...] 扁平存储
+        'edges': [node for edge in edges for node in edge],
+        'community_count': len(set(communities)),
+        'degree_stats': {
+            node_type: degree_stats([d for d, t in zip(degrees, types) if t == type_index])
+            for type_index, node_type in enumerate(['member', 'domain', 'repo'])
+        }
+    }
+
+# 搜索索引覆盖的字段；姓名和 ID 额外建立 n-gram，支持中间片段匹配
+SEARCH_INDEX_FIELDS = ('name', 'id', 'bio', 'company', 'location', 'domain')
+SEARCH_GRAM_FIELDS = ('name', 'id')
+SEARCH_GRAM_SIZE = 3
+# 中日韩文字逐字切分，其余字母数字连续串作为一个词（与 MembersList.vue 中的规则保持一致）
+SEARCH_CJK_RANGES = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+SEARCH_TOKEN_PATTERN = re.compile(f'[{SEARCH_CJK_RANGES}]|[^\\W_{SEARCH_CJK_RANGES}]+')
+
+def tokenize_search_text(text):
+    """规范化（NFKC + 小写）并切分搜索文本"""
+    if not text or text in ('None', 'null', 'undefined'):
+        return []
+    return SEARCH_TOKEN_PATTERN.findall(unicodedata.normalize('NFKC', text).lower())
+
+def delta_encode(postings):
+    """有序倒排列表差分编码，减小 JSON 体积"""
+    encoded, previous = [], 0
+    for doc in postings:
+        encoded.append(doc - previous)
+        previous = doc
+    return encoded
+
+def build_search_index(member_rows):
+    """
+    由成员数据构建搜索索引：有序词表 + 倒排列表（前缀查询走二分查找）、
+    姓名/ID 的 n-gram 倒排列表、按研究方向的分面索引
+    文档编号沿用 members.csv 的行顺序，前端筛选结果与列表顺序一致
+    """
+    ids = list(member_rows)
+    token_postings = defaultdict(set)
+    gram_postings = defaultdict(set)
+    facets = defaultdict(list)
+
+    for doc, member_id in enumerate(ids):
+        row = member_rows[member_id]
+        for field in SEARCH_INDEX_FIELDS:
+            tokens = tokenize_search_text(row.get(field, ''))
+            for token in tokens:
+                token_postings[token].add(doc)
+            if field in SEARCH_GRAM_FIELDS:
+                for token in tokens:
+                    for start in range(len(token) - SEARCH_GRAM_SIZE + 1):
+                        gram_postings[token[start:start + SEARCH_GRAM_SIZE]].add(doc)
+        for domain in sorted({d for d in row.get('domain', '').split(';') if d}):
+            facets[domain].append(doc)
+
+    # 按 UTF-16 编码排序，与浏览器端字符串比较的顺序一致，保证二分查找正确
+    vocabulary = sorted(token_postings, key=lambda token: token.encode('utf-16-be'))
+    return {
+        'version': 1,
+        'fields': list(SEARCH_INDEX_FIELDS),
+        'gram_size': SEARCH_GRAM_SIZE,
+        'ids': ids,
+        'tokens': vocabulary,
+        'postings': [delta_encode(sorted(token_postings[token])) for token in vocabulary],
+        'grams': {gram: delta_encode(sorted(gram_postings[gram])) for gram in sorted(gram_postings)},
+        'facets': {domain: delta_encode(facets[domain]) for domain in sorted(facets)}
+    }
+
+# 相似成员：MinHash 签名 + LSH 分桶找候选对，再按特征集合的 Jaccard 相似度排序，整体接近线性
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 32  # 每段 2 行，Jaccard 高于 0.18 左右的成员对大概率成为候选
+MINHASH_PRIME = 4294967291  # 小于 2^32 的最大素数，a·x + b 不会超出 uint64
+SIMILAR_BUCKET_WINDOW = 8  # 超大桶中每个成员向后比较的成员数
+SIMILAR_MIN_SCORE = 0.1
+
+def member_interest_features(row, repo_topics):
+    """成员的兴趣特征集合：参与的组织仓库、研究方向、这些仓库的 topics"""
+    repos = {r for r in row.get('repositories', '').split(';') if r}
+    features = {f"repo:{repo}" for repo in repos}
+    features.update(f"domain:{d}" for d in row.get('domain', '').split(';') if d)
+    features.update(f"topic:{topic}" for repo in repos for topic in repo_topics.get(repo, ()))
+    return features
+
+def minhash_signatures(feature_sets):
+    """
+    每个特征集合的 MinHash 签名，哈希函数为 (a·x + b) mod p，系数由 stable_unit 生成，相同数据得到相同签名
+    特征集合为空时签名为 None
+    """
+    vocabulary = sorted({feature for features in feature_sets for feature in features})
+    column = {feature: i for i, feature in enumerate(vocabulary)}
+    values = [int.from_bytes(hashlib.sha1(feature.encode('utf-8')).digest()[:8], 'big') % MINHASH_PRIME
+              for feature in vocabulary]
+    coefficients = [(1 + int(stable_unit(i, 'minhash-a') * (MINHASH_PRIME - 1)), int(stable_unit(i, 'minhash-b') * MINHASH_PRIME))
+                    for i in range(MINHASH_PERMUTATIONS)]
+
+    # 先对词表中的每个特征计算全部哈希值（MINHASH_PERMUTATIONS × 词表大小），成员签名只需按列取最小值
+    if np is not None and vocabulary:
+        a = np.array([c[0] for c in coefficients], dtype=np.uint64)[:, None]
+        b = np.array([c[1] for c in coefficients], dtype=np.uint64)[:, None]
+        hashed = (a * np.array(values, dtype=np.uint64)[None, :] + b) % np.uint64(MINHASH_PRIME)
+        return [hashed[:, [column[f] for f in features]].min(axis=1).tolist() if features else None
+                for features in feature_sets]
+
+    hashed = [[(a * x + b) % MINHASH_PRIME for x in values] for a, b in coefficients]
+    signatures = []
+    for features in feature_sets:
+        columns = [column[f] for f in features]
+        signatures.append([min(row[c] for c in columns) for row in hashed] if columns else None)
+    return signatures
+
+def lsh_candidate_pairs(ids, signatures):
+    """
+    LSH 分桶：签名切成 MINHASH_BANDS 段，任一段完全相同的成员成为候选对，返回 {(i, j)}（i < j）
+    超大桶（如只参与同一个热门仓库的成员）按稳定随机顺序只与相邻的成员配对，避免退化为两两比较
+    """
+    rows = MINHASH_PERMUTATIONS // MINHASH_BANDS
+    buckets = defaultdict(list)
+    for doc, signature in enumerate(signatures):
+        if signature is None:
+            continue
+        for band in range(MINHASH_BANDS):
+            buckets[(band, tuple(signature[band * rows:(band + 1) * rows]))].append(doc)
+
+    pairs = set()
+    for (band, _), docs in buckets.items():
+        if len(docs) < 2:
+            continue
+        if len(docs) > SIMILAR_BUCKET_WINDOW + 1:
+            # 按其余段的签名排序，其他段也相同（更相似）的成员排在一起
+            start = (band + 1) * rows
+            docs = sorted(docs, key=lambda doc: (signatures[doc][start:] + signatures[doc][:start], ids[doc]))
+        for i, doc in enumerate(docs):
+            for other in docs[i + 1:i + 1 + SIMILAR_BUCKET_WINDOW]:
+                pairs.add((min(doc, other), max(doc, other)))
+    return pairs
+
+def build_similar_members(member_rows, repos_data=None, k=None):
+    """
+    为每个成员找出兴趣最相近的 k 个成员（仓库、研究方向、仓库 topics 的 Jaccard 相似度）
+    member_rows 为 {id: CSV 行字典}；repos_data 为仓库数据集，提供仓库 topics（为 None 时只用仓库和研究方向）
+    """
+    k = CONFIG['SIMILAR_MEMBERS_K'] if k is None else k
+    ids = sorted(member_rows)
+    repo_topics = {repo['id']: repo.get('topics') or [] for repo in (repos_data or {}).get('repos', [])}
+    feature_sets = [member_interest_features(member_rows[member_id], repo_topics) for member_id in ids]
+    pairs = lsh_candidate_pairs(ids, minhash_signatures(feature_sets))
+
+    scored = defaultdict(list)
+    for doc, other in pairs:
+        score = len(feature_sets[doc] & feature_sets[other]) / len(feature_sets[doc] | feature_sets[other])
+        if score >= SIMILAR_MIN_SCORE:
+            scored[doc].append((score, other))
+            scored[other].append((score, doc))
+
+    neighbors = []
+    for doc in range(len(ids)):
+        top = sorted(scored[doc], key=lambda item: (-item[0], ids[item[1]]))[:k]
+        neighbors.append([value for score, other in top for value in (other, round(score * 1000))])
+
+    return {
+        'version': 1,
+        'k': k,
+        'permutations': MINHASH_PERMUTATIONS,
+        'bands': MINHASH_BANDS,
+        'candidate_pairs': len(pairs),
+        'ids': ids,
+        # 与 ids 对齐，每个成员的近邻按 [成员序号, 相似度×1000, ...] 扁平存储，相似度从高到低
+        'neighbors': neighbors
+    }
+
+def is_multi_org():
+    """是否为多组织模式"""
+    return len(CONFIG['ORG_NAMES']) > 1
+
+def qualify_repo_name(org_name, repo_name):
+    """多组织模式下仓库名带上组织前缀（org/repo），单组织模式保持原样"""
+    if is_multi_org():
+        return f"{org_name}/{repo_name}"
+    return repo_name
+
+def crawl_orgs(org_names, repo_states=None):
+    """
+    并发抓取多个组织的贡献者和commit数据，返回 {org: (contributors_data, all_commits, api_calls)}
+    传入 repo_states（{org: {}}）时按仓库记录抓取结果
+    """
+    repo_states = repo_states or {}
+    if len(org_names) == 1:
+        return {org_names[0]: collect_unified_data(org_names[0], True, repo_states.get(org_names[0]))}
+
+    print(f"🏢 多组织模式：并发抓取 {len(org_names)} 个组织 {', '.join(org_names)}")
+    results = {}
+    workers = max(1, min(len(org_names), CONFIG['MAX_ORG_WORKERS']))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {org: executor.submit(collect_unified_data, org, True, repo_states.get(org)) for org in org_names}
+        for org_name, future in futures.items():
+            try:
+                results[org_name] = future.result()
+            except Exception as e:
+                print(f"❌ 抓取组织 {org_name} 失败: {e}")
+                results[org_name] = (None, None, None)
+    return results
+
+def merge_api_stats(org_results):
+    """合并各组织的API调用统计"""
+    merged = defaultdict(int)
+    for _, _, api_calls in org_results.values():
+        for key, value in (api_calls or {}).items():
+            merged[key] += value
+    for key in ('repos_list', 'contributors', 'commits', 'users', 'user_repos', 'total'):
+        merged.setdefault(key, 0)
+    return merged
+
+def merge_org_contributors(org_results):
+    """
+    合并各组织的贡献者数据，同一用户只保留一条记录（用户资料只需获取一次）
+    成员按用户名排序、仓库列表按名称排序，保证输出顺序与仓库列表的返回顺序无关
+    """
+    merged = {}
+    for org_name, (contributors_data, _, _) in org_results.items():
+        for username, info in (contributors_data or {}).items():
+            if username not in merged:
+                merged[username] = {
+                    'user_info': info['user_info'],
+                    'repos': [],
+                    'total_contributions': 0,
+                    'orgs': {}
+                }
+            entry = merged[username]
+            entry['repos'].extend(qualify_repo_name(org_name, repo_name) for repo_name in info['repos'])
+            entry['total_contributions'] += info['total_contributions']
+            entry['orgs'][org_name] = sorted(info['repos'])
+
+    for entry in merged.values():
+        entry['repos'].sort()
+    return dict(sorted(merged.items(), key=lambda item: (item[0].lower(), item[0])))
+
+def merge_org_commits(org_results):
+    """合并各组织的commit记录（多组织模式下仓库名带组织前缀）"""
+    merged = []
+    for org_name, (_, all_commits, _) in org_results.items():
+        for commit in all_commits or []:
+            if is_multi_org():
+                commit = commit.replace(repo=qualify_repo_name(org_name, commit.repo))
+            merged.append(commit)
+    return merged
+
+def build_member_record(username, repo_names, user_info, profile, user_stats, local_avatar):
+    """根据用户资料（UserProfile，获取失败时为 None）构建一条成员记录"""
+    # 推断研究方向（基于仓库 topics、参与的仓库名称和用户简介），仓库名去掉组织前缀
+    user_bio = profile.bio if profile else ''
+    domains = infer_domains_from_repos([name.split('/')[-1] for name in repo_names], user_bio,
+                                       profile.repo_topics if profile else None)
+
+    return Member(
+        id=username,
+        name=profile.name if profile else username,
+        github=user_info.html_url,
+        domains=domains,
+        repositories=repo_names,  # 参与的组织仓库列表
+        public_repos=user_stats['public_repos'],  # 个人公开仓库数
+        total_stars=user_stats['total_stars'],  # 总 Stars 数
+        followers=user_stats['followers'],  # 关注者数
+        following=user_stats['following'],  # 关注数
+        avatar=local_avatar,  # 本地头像路径
+        bio=profile.bio if profile else '',
+        location=profile.location if profile else '',
+        company=profile.company if profile else ''
+    )
+
+def enrich_member(username, contrib_info, api_stats, download_avatars=True):
+    """
+    补全单个成员的信息（用户资料、统计、头像、研究方向），返回 (member, {org: member})
+    download_avatars 为 False 时不下载头像，只在 member.avatar_url 中记录头像地址
+    """
+    # 获取用户详细信息和仓库信息（跨组织共享缓存）
+    profile = get_user_profile(username, api_stats)
+
+    # 计算用户统计信息
+    user_stats = calculate_user_stats(profile)
+
+    # 下载并缓存头像
+    avatar_url = profile.avatar_url if profile else contrib_info['user_info'].avatar_url
+    local_avatar = download_avatar(avatar_url, username) if download_avatars else None
+
+    member = build_member_record(username, contrib_info['repos'], contrib_info['user_info'],
+                                 profile, user_stats, local_avatar)
+    member.freshness, member.as_of = PROFILE_CACHE.freshness(username)
+    if not download_avatars:
+        member.avatar_url = avatar_url
+
+    org_records = {}
+    if is_multi_org():
+        for org_name, repo_names in contrib_info['orgs'].items():
+            org_records[org_name] = build_member_record(
+                username, repo_names, contrib_info['user_info'],
+                profile, user_stats, local_avatar
+            ).replace(freshness=member.freshness, as_of=member.as_of)
+
+    print(f"👤 {username}: {(profile.name if profile else None) or 'N/A'} | "
+          f"{user_stats['public_repos']} 仓库, {user_stats['total_stars']} Stars, {user_stats['followers']} 关注者 | "
+          f"方向: {', '.join(member.domains)}")
+    return member, org_records
+
+def refresh_profiles(api_stats, workers=None):
+    """
+    截止时间模式：补全成员之前，按 PROFILE_CACHE.plan 排出的优先级并发获取需要刷新的用户资料
+    超过可用时间后排在后面的成员不再请求，补全时沿用过期的缓存资料
+    """
+    usernames = list(PROFILE_CACHE.due)
+    if not usernames:
+        return
+    print(f"\n⏰ 按优先级获取 {len(usernames)} 个成员的资料（剩余 {DEADLINE.remaining():.0f} 秒）...")
+
+    def refresh(username):
+        try:
+            get_user_profile(username, api_stats)
+        except Exception as e:
+            print(f"  ❌ 获取成员 {username} 的资料时出错: {e}")
+
+    with ThreadPoolExecutor(max_workers=max(1, workers or CONFIG['ENRICH_WORKERS'])) as executor:
+        list(executor.map(refresh, usernames))
+
+def enrich_members(contributors_data, api_stats, workers=None, download_avatars=True):
+    """
+    并发补全成员信息（有界线程池）
+    按 contributors_data 的原有顺序逐个产出 (member, org_records)，单个成员失败时跳过，不影响其他成员
+    """
+    workers = max(1, workers or CONFIG['ENRICH_WORKERS'])
+    window = workers * 2  # 最多同时排队的成员数，避免结果在内存中堆积
+
+    def drain(pending):
+        username, future = pending.popleft()
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"  ❌ 处理成员 {username} 时出错: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for username, contrib_info in contributors_data.items():
+            pending.append((username, executor.submit(enrich_member, username, contrib_info, api_stats, download_avatars)))
+            if len(pending) >= window:
+                result = drain(pending)
+                if result:
+                    yield result
+        while pending:
+            result = drain(pending)
+            if result:
+                yield result
+
+SEARCH_RESULT_CAP = 1000  # 搜索最多返回 1000 条结果，超过时把切片一分为二
+SEARCH_MIN_SLICE_SECONDS = 3600
+SEARCH_ACTIVITY_QUERY = """
+query($q: String!, $cursor: String) {
+  search(query: $q, type: ISSUE, first: 100, after: $cursor) {
+    issueCount
+    pageInfo { hasNextPage endCursor }
+    nodes {
+      __typename
+      ... on Issue { author { login } createdAt }
+      ... on PullRequest { author { login } createdAt }
+    }
+  }
+}
+"""
+# review 不跟随 PR 的创建时间：按 PR 的更新时间切片查询（统计窗口内有 review 的 PR，更新时间一定在窗口内），
+# 每个 PR 的 review 超过一页时用 SEARCH_REVIEWS_PAGE_QUERY 继续翻页
+SEARCH_REVIEWS_QUERY = """
+query($q: String!, $cursor: String) {
+  search(query: $q, type: ISSUE, first: 100, after: $cursor) {
+    issueCount
+    pageInfo { hasNextPage endCursor }
+    nodes {
+      ... on PullRequest {
+        id
+        author { login }
+        reviews(first: 100) { pageInfo { hasNextPage endCursor } nodes { id author { login } submittedAt } }
+      }
+    }
+  }
+}
+"""
+SEARCH_REVIEWS_PAGE_QUERY = """
+query($id: ID!, $cursor: String) {
+  node(id: $id) {
+    ... on PullRequest {
+      reviews(first: 100, after: $cursor) { pageInfo { hasNextPage endCursor } nodes { id author { login } submittedAt } }
+    }
+  }
+}
+"""
+
+class SearchSliceCache:
+    """
+    按日期切片的搜索结果缓存
+    跨运行持久化到 CACHE_DIR；切片的结束时间早于 SEARCH_SLICE_SETTLE_HOURS 之前时视为已结束，不再重新查询。
+    review 切片按 PR 更新时间查询，已结束的切片之后只会因 PR 再次更新而减少 PR（这些 review 出现在更晚的切片中，按 id 去重），
+    不会增加，所以同样可以缓存；尚未结束的切片只作为截止时间模式下的回退结果
+    """
+
+    VERSION = 2
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.dirty = False
+        self.stats = {'cached': 0, 'queried': 0, 'split': 0, 'failed': 0}
+        self.load()
+
+    def load(self):
+        """读取缓存文件（格式不兼容或损坏时忽略）"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                self.entries = data.get('slices', {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self, oldest=None):
+        """原子写入缓存文件，丢弃结束时间早于 oldest 的切片（没有变化时跳过）"""
+        with self.lock:
+            if oldest:
+                stale = [key for key, entry in self.entries.items() if entry['end'] < oldest]
+                for key in stale:
+                    del self.entries[key]
+                self.dirty = self.dirty or bool(stale)
+            if not self.dirty:
+                return
+            data = {'version': self.VERSION, 'slices': self.entries}
+            with OutputGeneration() as generation:
+                json.dump(data, generation.open(self.path), ensure_ascii=False)
+            self.dirty = False
+
+    def get(self, key, final_only=True):
+        """已结束切片的缓存结果；final_only 为 False 时也返回尚未结束的切片上次的结果"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and (entry['final'] or not final_only):
+                self.stats['cached'] += 1
+                return entry['counts']
+            return None
+
+    def put(self, key, start, end, counts, final):
+        with self.lock:
+            self.entries[key] = {'start': start, 'end': end, 'final': final, 'counts': counts}
+            self.dirty = True
+
+SEARCH_SLICE_CACHE = SearchSliceCache(CONFIG['CACHE_DIR'] / 'search_slices.json')
+
+def search_timestamp(moment):
+    return moment.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def search_slice_final(end):
+    """切片结束已超过 SEARCH_SLICE_SETTLE_HOURS（搜索索引已更新），结果不再增加"""
+    return end.timestamp() <= time.time() - CONFIG['SEARCH_SLICE_SETTLE_HOURS'] * 3600
+
+def add_search_count(counts, username, kind, timestamp):
+    """按用户、类型和日期累加一条活动（过滤机器人和已删除账户）"""
+    if not username or not timestamp or is_bot_account(username):
+        return
+    day = timestamp[:10]
+    kinds = counts.setdefault(username, {})
+    kinds.setdefault(kind, {})
+    kinds[kind][day] = kinds[kind].get(day, 0) + 1
+
+def merge_search_counts(target, counts):
+    for username, kinds in counts.items():
+        for kind, days in kinds.items():
+            for day, count in days.items():
+                bucket = target.setdefault(username, {}).setdefault(kind, {})
+                bucket[day] = bucket.get(day, 0) + count
+
+def query_search_slice(org_name, start, end):
+    """
+    查询一个切片内创建的 PR 和 issue，返回 {用户: {类型: {日期: 数量}}}，失败时返回 None
+    结果超过搜索上限时切成两半分别查询（最小 SEARCH_MIN_SLICE_SECONDS）
+    """
+    key = f"{org_name}/{search_timestamp(start)}/{search_timestamp(end)}"
+    cached = SEARCH_SLICE_CACHE.get(key)
+    if cached is not None:
+        return cached
+    if not DEADLINE.allows():
+        # 临近截止时间，沿用尚未结束的切片上次的结果，没有时按查询失败处理
+        previous = SEARCH_SLICE_CACHE.get(key, final_only=False)
+        if previous is None:
+            print(f"    ⏰ 临近截止时间，跳过搜索切片: {key}")
+        return previous
+
+    query = f"org:{org_name} created:{search_timestamp(start)}..{search_timestamp(end - timedelta(seconds=1))}"
+    counts = {}
+    cursor = None
+    while True:
+        result = fetch_api_response(CONFIG['GRAPHQL_URL'], payload={
+            'query': SEARCH_ACTIVITY_QUERY, 'variables': {'q': query, 'cursor': cursor}
+        })[0]
+        search = ((result or {}).get('data') or {}).get('search')
+        if search is None:
+            errors = (result or {}).get('errors') or [{}]
+            print(f"    ❌ 搜索失败: {query} {errors[0].get('message') or ''}")
+            with SEARCH_SLICE_CACHE.lock:
+                SEARCH_SLICE_CACHE.stats['failed'] += 1
+            return None
+
+        if cursor is None and search['issueCount'] > SEARCH_RESULT_CAP and (end - start).total_seconds() > SEARCH_MIN_SLICE_SECONDS:
+            middle = start + (end - start) / 2
+            middle = middle.replace(microsecond=0)
+            with SEARCH_SLICE_CACHE.lock:
+                SEARCH_SLICE_CACHE.stats['split'] += 1
+            halves = [query_search_slice(org_name, start, middle), query_search_slice(org_name, middle, end)]
+            if None in halves:
+                return None
+            for half in halves:
+                merge_search_counts(counts, half)
+            break
+
+        for node in search['nodes']:
+            if not node:
+                continue
+            author = (node.get('author') or {}).get('login')
+            if node.get('__typename') == 'PullRequest':
+                add_search_count(counts, author, 'prs_opened', node.get('createdAt'))
+            else:
+                add_search_count(counts, author, 'issues_opened', node.get('createdAt'))
+
+        if not search['pageInfo']['hasNextPage']:
+            if search['issueCount'] > SEARCH_RESULT_CAP:
+                LISTING_STATS.truncate(f"{org_name} 搜索 {search_timestamp(start)}", f"超出搜索上限 {SEARCH_RESULT_CAP} 条")
+            break
+        cursor = search['pageInfo']['endCursor']
+
+    SEARCH_SLICE_CACHE.put(key, search_timestamp(start), search_timestamp(end), counts, search_slice_final(end))
+    with SEARCH_SLICE_CACHE.lock:
+        SEARCH_SLICE_CACHE.stats['queried'] += 1
+    return counts
+
+def fetch_remaining_reviews(pr_id, cursor):
+    """PR 的 review 超过一页时继续翻页，返回其余的 review 节点，失败时返回 None"""
+    reviews = []
+    while cursor:
+        result = fetch_api_response(CONFIG['GRAPHQL_URL'], payload={
+            'query': SEARCH_REVIEWS_PAGE_QUERY, 'variables': {'id': pr_id, 'cursor': cursor}
+        })[0]
+        page = (((result or {}).get('data') or {}).get('node') or {}).get('reviews')
+        if page is None:
+            return None
+        reviews.extend(page['nodes'] or [])
+        cursor = page['pageInfo']['endCursor'] if page['pageInfo']['hasNextPage'] else None
+    return reviews
+
+def query_review_slice(org_name, start, end, since):
+    """
+    查询一个切片内更新过的 PR 上、提交时间不早于 since 的 review，返回 {review id: [用户, 提交时间]}，失败时返回 None
+    已结束的切片直接使用缓存：之后再次更新的 PR 会出现在更晚（尚未结束、每次重新查询）的切片中，按 review id 合并去重；
+    缓存的结果可能早于本次的 since（统计窗口随日期后移），读取时重新过滤
+    """
+    key = f"reviews:{org_name}/{search_timestamp(start)}/{search_timestamp(end)}"
+    cached = SEARCH_SLICE_CACHE.get(key)
+    if cached is None and not DEADLINE.allows():
+        # 临近截止时间，沿用尚未结束的切片上次的结果，没有时按查询失败处理
+        cached = SEARCH_SLICE_CACHE.get(key, final_only=False)
+        if cached is None:
+            print(f"    ⏰ 临近截止时间，跳过 review 切片: {key}")
+            return None
+    if cached is not None:
+        return {review_id: review for review_id, review in cached.items() if review[1] >= since}
+
+    query = f"org:{org_name} is:pr updated:{search_timestamp(start)}..{search_timestamp(end - timedelta(seconds=1))}"
+    reviews = {}
+    cursor = None
+    while True:
+        result = fetch_api_response(CONFIG['GRAPHQL_URL'], payload={
+            'query': SEARCH_REVIEWS_QUERY, 'variables': {'q': query, 'cursor': cursor}
+        })[0]
+        search = ((result or {}).get('data') or {}).get('search')
+        if search is None:
+            errors = (result or {}).get('errors') or [{}]
+            print(f"    ❌ 搜索失败: {query} {errors[0].get('message') or ''}")
+            with SEARCH_SLICE_CACHE.lock:
+                SEARCH_SLICE_CACHE.stats['failed'] += 1
+            return None
+
+        if cursor is None and search['issueCount'] > SEARCH_RESULT_CAP and (end - start).total_seconds() > SEARCH_MIN_SLICE_SECONDS:
+            middle = start + (end - start) / 2
+            middle = middle.replace(microsecond=0)
+            with SEARCH_SLICE_CACHE.lock:
+                SEARCH_SLICE_CACHE.stats['split'] += 1
+            halves = [query_review_slice(org_name, start, middle, since), query_review_slice(org_name, middle, end, since)]
+            if None in halves:
+                return None
+            for half in halves:
+                reviews.update(half)
+            break
+
+        for node in search['nodes']:
+            if not node or 'reviews' not in node:
+                continue
+            author = (node.get('author') or {}).get('login')
+            page = node['reviews'] or {'nodes': [], 'pageInfo': {'hasNextPage': False}}
+            nodes = list(page['nodes'] or [])
+            if page['pageInfo']['hasNextPage']:
+                more = fetch_remaining_reviews(node['id'], page['pageInfo']['endCursor'])
+                if more is None:
+                    LISTING_STATS.truncate(f"{org_name} PR {node['id']} review", '翻页请求失败')
+                nodes.extend(more or [])
+            for review in nodes:
+                reviewer = (review.get('author') or {}).get('login')
+                submitted_at = review.get('submittedAt')
+                # 不计入作者对自己 PR 的回复，也不计入统计窗口之前的 review
+                if review.get('id') and reviewer and reviewer != author and submitted_at and submitted_at >= since:
+                    reviews[review['id']] = [reviewer, submitted_at]
+
+        if not search['pageInfo']['hasNextPage']:
+            if search['issueCount'] > SEARCH_RESULT_CAP:
+                LISTING_STATS.truncate(f"{org_name} review 搜索 {search_timestamp(start)}", f"超出搜索上限 {SEARCH_RESULT_CAP} 条")
+            break
+        cursor = search['pageInfo']['endCursor']
+
+    SEARCH_SLICE_CACHE.put(key, search_timestamp(start), search_timestamp(end), reviews, search_slice_final(end))
+    with SEARCH_SLICE_CACHE.lock:
+        SEARCH_SLICE_CACHE.stats['queried'] += 1
+    return reviews
+
+def search_activity_window():
+    """活动统计窗口：按 UTC 自然日对齐，覆盖最近 COMMIT_DAYS_RANGE 天（含今天）"""
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return [today - timedelta(days=offset) for offset in range(CONFIG['COMMIT_DAYS_RANGE'], -1, -1)]
+
+def collect_search_activity(org_names):
+    """
+    收集各组织在统计窗口内的 PR、issue 和 review 活动，返回 {组织: {用户: {类型: {日期: 数量}}}}
+    每个组织按天切片并发查询：PR 和 issue 按创建时间，review 按 PR 更新时间（按提交时间计入）；
+    没有 Token（GraphQL 需要认证）或已关闭时返回 None
+    """
+    if not CONFIG['SEARCH_ACTIVITY']:
+        return None
+    if not CONFIG['GITHUB_TOKENS']:
+        print("⚠️  未设置 GITHUB_TOKEN，跳过 PR/issue/review 活动统计（GraphQL 需要认证）")
+        return None
+
+    days = search_activity_window()
+    since = search_timestamp(days[0])
+    slices = [(org_name, start, start + timedelta(days=1)) for org_name in org_names for start in days]
+    print(f"\n🔎 按日期切片收集 PR/issue/review 活动: {len(org_names)} 个组织 × {len(days)} 天（{CONFIG['SEARCH_WORKERS']} 个并发）")
+    with ThreadPoolExecutor(max_workers=max(1, CONFIG['SEARCH_WORKERS'])) as executor:
+        results = list(executor.map(lambda item: query_search_slice(*item), slices))
+        review_results = list(executor.map(lambda item: query_review_slice(*item, since), slices))
+
+    activity = {org_name: {} for org_name in org_names}
+    for (org_name, start, _), counts in zip(slices, results):
+        if counts is None:
+            LISTING_STATS.truncate(f"{org_name} 搜索 {search_timestamp(start)}", '切片查询失败')
+            continue
+        merge_search_counts(activity[org_name], counts)
+
+    # 同一 review 可能在相邻切片中重复出现（查询期间 PR 被更新），按 id 去重
+    reviews = {org_name: {} for org_name in org_names}
+    for (org_name, start, _), slice_reviews in zip(slices, review_results):
+        if slice_reviews is None:
+            LISTING_STATS.truncate(f"{org_name} review 搜索 {search_timestamp(start)}", '切片查询失败')
+            continue
+        reviews[org_name].update(slice_reviews)
+    for org_name, org_reviews in reviews.items():
+        for reviewer, submitted_at in org_reviews.values():
+            add_search_count(activity[org_name], reviewer, 'reviews', submitted_at)
+    SEARCH_SLICE_CACHE.save(oldest=search_timestamp(days[0]))
+    print(f"  ✓ 活动统计完成: {SEARCH_SLICE_CACHE.stats}")
+    return activity
+
+def summarize_search_activity(activity):
+    """把各组织的活动合并为窗口内的每用户计数 {用户: {prs_opened, issues_opened, reviews}}"""
+    first_day = search_timestamp(search_activity_window()[0])[:10]
+    totals = {}
+    for org_activity in activity.values():
+        for username, kinds in org_activity.items():
+            user_totals = totals.setdefault(username, {'prs_opened': 0, 'issues_opened': 0, 'reviews': 0})
+            for kind, days in kinds.items():
+                user_totals[kind] += sum(count for day, count in days.items() if day >= first_day)
+    return {username: counts for username, counts in sorted(totals.items()) if any(counts.values())}
+
+def build_commits_data(all_commits, api_stats, start_time, generation=None, search_activity=None):
+    """构建commit数据文件内容（传入 search_activity 时附带每用户的 PR、issue 和 review 数）"""
+    # 按时间倒序（同一时间按仓库和 SHA）排列，保证聚合结果（如保留的 commit 消息）稳定
+    all_commits = sorted(all_commits, key=lambda commit: (commit.date_parsed, commit.repo, commit.sha), reverse=True)
+    user_commits = aggregate_commits_by_user(all_commits)
+
+    commits_data = {
+        'update_time': datetime.now().isoformat(),
+        'generation': generation.id if generation else None,
+        'days_range': CONFIG['COMMIT_DAYS_RANGE'],
+        'total_commits': len(all_commits),
+        'total_repos': len(set(commit.repo for commit in all_commits)),
+        'user_commits': user_commits,
+        'optimization_stats': {
+            'api_calls': dict(api_stats),
+            'execution_time': f"{time.time() - start_time:.1f}s",
+            'optimization_enabled': True
+        }
+    }
+    if search_activity is not None:
+        # 没有 commit 的 reviewer 和 issue 参与者也列在 user_activity 中
+        user_activity = summarize_search_activity(search_activity)
+        for username, stats in user_commits.items():
+            stats.update(user_activity.get(username) or {'prs_opened': 0, 'issues_opened': 0, 'reviews': 0})
+        commits_data['user_activity'] = user_activity
+    return commits_data
+
+# 打卡矩阵：7 行（周一到周日）× 24 列（0-23 时），按行展开为 168 个整数
+PUNCH_CARD_CELLS = 7 * 24
+PUNCH_CARD_WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+# 时区偏移按 15 分钟为粒度计算，覆盖所有实际使用中的夏令时切换点
+TIMEZONE_OFFSET_BUCKET = 900
+
+def resolve_activity_timezone(name=None):
+    """解析打卡矩阵使用的时区：IANA 名称（如 Asia/Shanghai）或固定偏移（如 +08:00、UTC-5）"""
+    name = (name or CONFIG['ACTIVITY_TIMEZONE']).strip()
+    match = re.fullmatch(r'(?:UTC)?([+-])(\d{1,2})(?::?(\d{2}))?', name)
+    if match:
+        sign = 1 if match.group(1) == '+' else -1
+        return timezone(sign * timedelta(hours=int(match.group(2)), minutes=int(match.group(3) or 0)))
+    if name.upper() == 'UTC':
+        return timezone.utc
+    if ZoneInfo is not None:
+        try:
+            return ZoneInfo(name)
+        except Exception:
+            pass
+    print(f"⚠️  无法识别时区 {name}，打卡矩阵使用 UTC+8")
+    return timezone(timedelta(hours=8))
+
+def timezone_offset_seconds(tz, epoch):
+    """指定时刻在时区中的 UTC 偏移秒数"""
+    return int(datetime.fromtimestamp(epoch, tz).utcoffset().total_seconds())
+
+def punch_card_cells(epochs, tz):
+    """
+    批量把 UTC 时间戳换算为打卡矩阵的格子编号（星期 × 24 + 小时）
+    时区偏移只对去重后的 15 分钟时间段计算一次，再整体应用到所有时间戳
+    """
+    # 1970-01-01 是周四，(天数 + 3) % 7 得到以周一为 0 的星期
+    if np is not None:
+        epoch_values = np.asarray(epochs, dtype=np.int64)
+        buckets, inverse = np.unique(epoch_values // TIMEZONE_OFFSET_BUCKET, return_inverse=True)
+        offsets = np.array([timezone_offset_seconds(tz, int(bucket) * TIMEZONE_OFFSET_BUCKET) for bucket in buckets],
+                           dtype=np.int64)
+        local = epoch_values + offsets[inverse.reshape(-1)]
+        return ((local // 86400 + 3) % 7) * 24 + (local % 86400) // 3600
+
+    offsets = {}
+    cells = array('l')
+    for epoch in epochs:
+        bucket = epoch // TIMEZONE_OFFSET_BUCKET
+        if bucket not in offsets:
+            offsets[bucket] = timezone_offset_seconds(tz, bucket * TIMEZONE_OFFSET_BUCKET)
+        local = epoch + offsets[bucket]
+        cells.append(((local // 86400 + 3) % 7) * 24 + (local % 86400) // 3600)
+    return cells
+
+def count_punch_cards(groups, cells, group_count):
+    """按分组统计每个格子的 commit 数，返回每组 168 个整数"""
+    if np is not None:
+        index = np.asarray(groups, dtype=np.int64) * PUNCH_CARD_CELLS + np.asarray(cells, dtype=np.int64)
+        counts = np.bincount(index, minlength=group_count * PUNCH_CARD_CELLS).reshape(group_count, PUNCH_CARD_CELLS)
+        return [row.tolist() for row in counts]
+
+    counts = array('l', [0]) * (group_count * PUNCH_CARD_CELLS)
+    for group, cell in zip(groups, cells):
+        counts[group * PUNCH_CARD_CELLS + cell] += 1
+    return [counts[i * PUNCH_CARD_CELLS:(i + 1) * PUNCH_CARD_CELLS].tolist() for i in range(group_count)]
+
+def build_activity_matrices(all_commits):
+    """
+    计算全体、各组织、各成员的 7×24 提交打卡矩阵（按配置的时区）
+    先把 commit 展开为用户编号、组织编号、时间戳三个整数数组，再一次性批量计算（有 NumPy 时向量化）
+    """
+    tz = resolve_activity_timezone()
+    users, orgs = {}, {}
+    user_groups, org_groups, epochs = array('l'), array('l'), array('q')
+    for commit in all_commits:
+        username = commit_username(commit)
+        if not username:
+            continue
+        user_groups.append(users.setdefault(username, len(users)))
+        org_groups.append(orgs.setdefault(commit.org or CONFIG['ORG_NAME'], len(orgs)))
+        epochs.append(int(commit.date_parsed.timestamp()))
+
+    cells = punch_card_cells(epochs, tz)
+    member_cards = count_punch_cards(user_groups, cells, len(users))
+    org_cards = count_punch_cards(org_groups, cells, len(orgs))
+    total = count_punch_cards(array('l', [0]) * len(epochs), cells, 1)[0]
 
-    return list(domains)
+    return {
+        'timezone': CONFIG['ACTIVITY_TIMEZONE'],
+        'layout': {'rows': PUNCH_CARD_WEEKDAYS, 'columns': 24},
+        'total_commits': len(epochs),
+        'total': total,
+        'orgs': {org_name: org_cards[index] for org_name, index in sorted(orgs.items())},
+        'members': {username: member_cards[index] for username, index in sorted(users.items())}
+    }
 
-def clean_csv_field(text):
-    """清理CSV字段中的换行符和其他问题字符"""
-    if not text:
-        return ''
+def build_repos_data(repo_states):
+    """
+    仓库数据集：仓库列表返回的元数据，加上贡献者数和统计窗口内的 commit 数（按仓库列出、按组织汇总）
+    repo_states 为 {org: {repo: {'contributors', 'commits', 'meta'}}}，commit 只统计窗口内的
+    每个仓库标明数据的新鲜度：本次抓取为 fresh，截止时间模式下沿用上次的结果为 stale（as_of 为上次抓取时间），没有结果为 missing
+    """
+    cutoff = datetime.fromisoformat(commit_since_iso().replace('Z', '+00:00'))
+    repos = []
+    orgs = {}
+    for org_name, states in sorted(repo_states.items()):
+        if not states:
+            continue
+        org_contributors = set()
+        org_summary = {'repos': 0, 'active_repos': 0, 'archived_repos': 0, 'stars': 0, 'forks': 0, 'open_issues': 0,
+                       'commits': 0}
+        for repo_name, state in sorted(states.items()):
+            # 监听模式中由事件新发现的仓库没有元数据，等下次全量抓取时补上
+            meta = state.get('meta') or Repo(name=repo_name, full_name=f"{org_name}/{repo_name}")
+            commits = [commit for commit in state['commits'] if commit.date_parsed >= cutoff]
+            committers = {commit_username(commit) for commit in commits} - {None}
+            entry = dict(meta.to_dict(),
+                         id=qualify_repo_name(org_name, repo_name),
+                         org=org_name,
+                         contributors=len(state['contributors']),
+                         contributions=sum(contributor.contributions or 0 for contributor in state['contributors']),
+                         commits=len(commits),
+                         committers=len(committers),
+                         daily_commits=dict(sorted(Counter(commit.date_str for commit in commits).items())),
+                         freshness=state.get('freshness', 'fresh'))
+            if state.get('as_of'):
+                entry['as_of'] = state['as_of']
+            # 增删行数（只有 git 镜像来源的 commit 带有）
+            if any(commit.lines_added is not None for commit in commits):
+                entry['lines_added'] = sum(commit.lines_added or 0 for commit in commits)
+                entry['lines_deleted'] = sum(commit.lines_deleted or 0 for commit in commits)
+            # 贡献者累计增删行数（来自仓库统计）
+            if any(contributor.lines_added is not None for contributor in state['contributors']):
+                entry['contributor_lines_added'] = sum(c.lines_added or 0 for c in state['contributors'])
+                entry['contributor_lines_deleted'] = sum(c.lines_deleted or 0 for c in state['contributors'])
+            repos.append(entry)
+
+            org_contributors.update(contributor.login for contributor in state['contributors'])
+            org_summary['repos'] += 1
+            org_summary['active_repos'] += 1 if commits else 0
+            org_summary['archived_repos'] += 1 if meta.archived else 0
+            org_summary['stars'] += meta.stargazers_count or 0
+            org_summary['forks'] += meta.forks_count or 0
+            org_summary['open_issues'] += meta.open_issues_count or 0
+            org_summary['commits'] += len(commits)
+        org_summary['contributors'] = len(org_contributors)
+        orgs[org_name] = org_summary
+
+    # 默认按 Star 数排列（相同时按仓库名），前端可直接作为排行榜展示
+    repos.sort(key=lambda repo: (-(repo.get('stargazers_count') or 0), repo['id']))
+    return {
+        'days_range': CONFIG['COMMIT_DAYS_RANGE'],
+        'total_repos': len(repos),
+        'orgs': orgs,
+        'repos': repos
+    }
 
-    # 转换为字符串并清理
-    text = str(text)
+# 成员加入、离开记录：每次运行把各仓库的贡献者集合与上次的记录比较，只在有变化时改变文件内容
+# 记录本身就是累积的状态，保存在数据目录中随数据文件一起提交（不放在可能被清除的 CACHE_DIR）
+MEMBERSHIP_VERSION = 1
 
-    # 替换换行符为空格
-    text = text.replace('\n', ' ').replace('\r', ' ')
+def read_membership():
+    """读取上次发布的成员加入、离开记录，不存在、损坏或版本不一致时返回 None"""
+    data = read_commits_snapshot(CONFIG['MEMBERSHIP_FILE'])[1]
+    return data if data.get('version') == MEMBERSHIP_VERSION else None
 
-    # 替换多个连续空格为单个空格
-    import re
-    text = re.sub(r'\s+', ' ', text)
+def days_between(start, end):
+    """两个 ISO 时间戳之间的天数"""
+    parse = lambda timestamp: datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    return (parse(end) - parse(start)).total_seconds() / 86400
 
-    # 去除首尾空格
-    text = text.strip()
+def build_membership(previous, repo_states, now=None):
+    """
+    比较本次抓取的各仓库贡献者集合与上次的记录，更新每个成员在各仓库的首次出现、离开时间和在组织中的任期
+    repo_states 为 {org: {repo: {'contributors', 'roster', ...}}}，比较的是 roster（过滤机器人后、按阈值筛选前的名单，
+    没有时退回 contributors），不受贡献阈值和行数统计是否就绪的影响；
+    贡献者列表获取失败的仓库（contributors_fetched 为 False）不参与比较，名单不完整（roster_complete 为 False，
+    如超出 MAX_CONTRIBUTORS_PER_REPO）的仓库只记录新出现的成员，不把名单外的成员记为离开；
+    仓库列表获取成功的组织中已不存在的仓库视为没有贡献者。仓库统一用 org/repo 作为键，与单/多组织模式无关
+    成员不再出现在任何仓库时记为离开，之后重新出现时开始新的一段任期（past_days 累计已结束各段的天数）
+    """
+    now = now or search_timestamp(datetime.now(timezone.utc))
+    previous = previous or {}
+    members = json.loads(json.dumps(previous.get('members', {})))  # 深拷贝，不修改传入的记录
+
+    observed = {}  # 本次获取到贡献者列表的仓库 -> 贡献者集合
+    complete = set()  # 名单完整的仓库（不在名单中的成员才能记为离开）
+    listed = {}  # 仓库列表获取成功的组织 -> 仓库集合
+    for org_name, states in (repo_states or {}).items():
+        if not states:
+            continue
+        listed[org_name] = set(states)
+        for repo_name, state in states.items():
+            if not state.get('contributors_fetched', True):
+                continue
+            roster = state.get('roster')
+            if roster is None:
+                roster = [contributor.login for contributor in state['contributors']]
+            observed[f"{org_name}/{repo_name}"] = set(roster)
+            if state.get('roster_complete', True):
+                complete.add(f"{org_name}/{repo_name}")
+
+    left_repos = 0
+    for username, entry in members.items():
+        for repo_id, span in entry['repos'].items():
+            org_name, _, repo_name = repo_id.partition('/')
+            gone = repo_id in complete and username not in observed[repo_id]
+            removed = org_name in listed and repo_name not in listed[org_name]
+            if span['left'] is None and (gone or removed):
+                span['left'] = now
+                left_repos += 1
+
+    joined_repos = 0
+    for repo_id, usernames in observed.items():
+        for username in usernames:
+            entry = members.setdefault(username, {'first_seen': now, 'joined': None, 'left': None, 'stints': 0,
+                                                  'past_days': 0.0, 'repos': {}})
+            span = entry['repos'].get(repo_id)
+            if span is None:
+                entry['repos'][repo_id] = {'first_seen': now, 'left': None}
+            elif span['left'] is not None:
+                span['left'] = None  # 离开后重新出现在该仓库，首次出现时间不变
+            else:
+                continue
+            joined_repos += 1
+
+    joined, left = [], []
+    for username, entry in members.items():
+        active = any(span['left'] is None for span in entry['repos'].values())
+        if active and (entry['joined'] is None or entry['left'] is not None):
+            entry.update(joined=now, left=None, stints=entry['stints'] + 1)
+            joined.append(username)
+        elif not active and entry['left'] is None and entry['joined'] is not None:
+            entry.update(left=now, past_days=round(entry['past_days'] + days_between(entry['joined'], now), 2))
+            left.append(username)
+
+    print(f"🧭 成员记录: {len(joined)} 人加入, {len(left)} 人离开, {joined_repos} 次加入仓库, {left_repos} 次离开仓库"
+          f"（{len(observed)} 个仓库参与比较，其中 {len(observed) - len(complete)} 个名单不完整）")
+    return {
+        'version': MEMBERSHIP_VERSION,
+        'baseline': previous.get('baseline') or now,  # 开始记录的时间，first_seen 等于它表示在此之前已经出现
+        'members': {
+            username: dict(members[username], repos=dict(sorted(members[username]['repos'].items())))
+            for username in sorted(members)
+        }
+    }
 
-    return text
+def publish_outputs(org_results, api_stats, contributors_data, all_commits, overall_start_time, has_existing_data,
+                    refresh_users=(), backup=True, repo_states=None):
+    """
+    补全成员信息并把成员、commit、仓库、关系图、搜索索引作为同一代数据发布
+    内容与上次发布一致时保留现有文件；没有成功处理任何成员时返回 None
+    refresh_users 中的成员忽略资料缓存，强制重新获取；backup 为 False 时不备份旧的成员 CSV
+    repo_states 为按仓库保存的抓取结果（{org: {repo: {...}}}），用于生成仓库数据集和更新成员加入、离开记录
+    """
+    # 确定哪些成员的资料需要刷新（活跃成员与不活跃成员使用不同 TTL）
+    active_users = {commit.github_username for commit in all_commits if commit.github_username}
+    PROFILE_CACHE.plan(list(contributors_data), active_users, refresh_users)
+    if DEADLINE.enabled:
+        refresh_profiles(api_stats)
+
+    # 处理成员数据（并发补全，按原有顺序产出，边补全边写入临时文件）
+    print(f"\n👥 开始处理 {len(contributors_data)} 个成员的详细信息（{CONFIG['ENRICH_WORKERS']} 个并发）...")
+
+    search_activity = collect_search_activity(list(org_results))
+
+    def build_commit_outputs(generation):
+        outputs = {}
+        if all_commits:
+            print(f"\n📊 处理 {len(all_commits)} 个commit数据...")
+            outputs[CONFIG['COMMITS_FILE']] = build_commits_data(all_commits, api_stats, overall_start_time, generation,
+                                                                 search_activity)
+
+        if is_multi_org():
+            for org_name, (_, org_commits, org_api_calls) in org_results.items():
+                if org_commits:
+                    org_commits_file = CONFIG['ORGS_DATA_DIR'] / org_name / 'commits_weekly.json'
+                    org_activity = {org_name: search_activity[org_name]} if search_activity else None
+                    outputs[org_commits_file] = build_commits_data(org_commits, org_api_calls or {}, overall_start_time,
+                                                                   generation, org_activity)
+        return outputs
+
+    activity = build_activity_matrices(all_commits) if all_commits else None
+    repos_data = build_repos_data(repo_states) if repo_states else None
+    membership = build_membership(read_membership(), repo_states) if repo_states else None
+    change_report = write_outputs(list(org_results), enrich_members(contributors_data, api_stats),
+                                  build_commit_outputs, has_existing_data, backup, activity, repos_data, membership)
+    if change_report is None:
+        return None
 
-def save_to_csv(members, output_file):
-    """保存数据到 CSV 文件"""
-    with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.writer(csvfile)
-
-        # 写入表头（包含所有字段）
-        writer.writerow([
-            'id', 'name', 'github', 'domain', 'repositories',
-            'public_repos', 'total_stars', 'followers', 'following',
-            'avatar', 'bio', 'location', 'company'
-        ])
-
-        # 写入数据
-        for member in members:
-            writer.writerow([
-                clean_csv_field(member['id']),
-                clean_csv_field(member['name']),
-                clean_csv_field(member['github']),
-                ';'.join(member['domains']),
-                ';'.join(member.get('repositories', [])),
-                member.get('public_repos', 0),
-                member.get('total_stars', 0),
-                member.get('followers', 0),
-                member.get('following', 0),
-                clean_csv_field(member.get('avatar', '')),
-                clean_csv_field(member.get('bio', '')),
-                clean_csv_field(member.get('location', '')),
-                clean_csv_field(member.get('company', ''))
-            ])
+    write_github_output('content_changed', 'true' if change_report['changed'] else 'false')
 
-def check_existing_data():
-    """检查现有数据文件"""
-    return os.path.exists(CONFIG['OUTPUT_FILE'])
+    PROFILE_CACHE.save()
+    NEGATIVE_CACHE.save()
+    GIT_MIRRORS.save()
+    CONTRIBUTOR_STATS.save()
+    REPO_CRAWL_CACHE.save()
+    return change_report
 
-def backup_existing_data():
-    """备份现有数据"""
-    if os.path.exists(CONFIG['OUTPUT_FILE']):
-        # 将Path对象转换为字符串进行操作
-        output_file_str = str(CONFIG['OUTPUT_FILE'])
-        backup_path = output_file_str.replace('.csv', f'.backup.{int(time.time())}.csv')
-        import shutil
-        shutil.copy2(CONFIG['OUTPUT_FILE'], backup_path)
-        print(f"📋 已备份现有数据: {backup_path}")
-        return backup_path
-    return None
+def write_outputs(org_names, member_results, build_commit_outputs, has_existing_data, backup=True, activity=None,
+                  repos_data=None, membership=None):
+    """
+    把成员记录和 commit 数据作为同一代数据发布，并生成关系图、搜索索引和变更报告
+    member_results 逐个产出 (member, {org: member})；build_commit_outputs(generation) 返回 {文件路径: commit数据}
+    activity 为 build_activity_matrices 生成的打卡矩阵（没有 commit 时为 None）
+    repos_data 为 build_repos_data 生成的仓库数据集（为 None 时不输出）
+    membership 为 build_membership 更新后的成员加入、离开记录（为 None 时保留现有文件）
+    内容与上次发布一致时保留现有文件；没有任何成员时返回 None
+    """
+    with OutputGeneration() as generation:
+        members_writer = MemberCsvWriter(generation.open(CONFIG['OUTPUT_FILE'], newline=''), keep_rows=True)
+        org_writers = {}  # 多组织模式下各组织的成员 CSV
+
+        if is_multi_org():
+            for org_name in org_names:
+                org_file = CONFIG['ORGS_DATA_DIR'] / org_name / 'members.csv'
+                org_writers[org_name] = MemberCsvWriter(generation.open(org_file, newline=''))
+
+        for member, org_records in member_results:
+            members_writer.write(member)
+            for org_name, record in org_records.items():
+                org_writers[org_name].write(record)
+
+        if not members_writer.count:
+            # 放弃本次输出，保留现有数据文件
+            generation.abort()
+            print("❌ 没有成功处理任何成员")
+            return None
+
+        print(f"✅ 成功处理 {members_writer.count} 个成员")
+        for org_name, writer in org_writers.items():
+            print(f"✅ 组织 {org_name}: {writer.count} 个成员")
+
+        current_hashes = {CONFIG['OUTPUT_FILE']: members_writer.content_hash()}
+        for org_name, writer in org_writers.items():
+            current_hashes[CONFIG['ORGS_DATA_DIR'] / org_name / 'members.csv'] = writer.content_hash()
+
+        # 处理commit数据，与成员数据作为同一代一起发布
+        commit_outputs = build_commit_outputs(generation)
+        for commits_file, commits_data in commit_outputs.items():
+            save_commits_data(commits_data, commits_file, generation=generation)
+            current_hashes[commits_file] = json_content_hash(commits_data)
+
+        # 打卡矩阵以紧凑格式单独保存，前端可直接渲染热力图
+        if activity:
+            json.dump(activity, generation.open(CONFIG['ACTIVITY_FILE']), ensure_ascii=False, separators=(',', ':'))
+            current_hashes[CONFIG['ACTIVITY_FILE']] = json_content_hash(activity)
+            print(f"🗓️  打卡矩阵: {activity['total_commits']} 个commit, {len(activity['members'])} 个成员 ({activity['timezone']})")
+
+        # 仓库数据集：元数据与贡献者、commit 统计，供仓库排行榜和健康度视图使用
+        if repos_data:
+            json.dump(repos_data, generation.open(CONFIG['REPOS_FILE']), ensure_ascii=False, separators=(',', ':'))
+            current_hashes[CONFIG['REPOS_FILE']] = json_content_hash(repos_data)
+            active_repos = sum(org['active_repos'] for org in repos_data['orgs'].values())
+            print(f"📦 仓库数据: {repos_data['total_repos']} 个仓库, {active_repos} 个近 {repos_data['days_range']} 天有commit")
+
+        # 成员加入、离开记录：既是下次运行比较的基准，也供前端计算任期
+        if membership:
+            json.dump(membership, generation.open(CONFIG['MEMBERSHIP_FILE']), ensure_ascii=False, indent=2)
+            current_hashes[CONFIG['MEMBERSHIP_FILE']] = json_content_hash(membership)
+            current_members = sum(1 for entry in membership['members'].values() if entry['left'] is None)
+            print(f"🧭 成员任期: {current_members}/{len(membership['members'])} 人在组织中（自 {membership['baseline'][:10]} 起记录）")
+
+        # 预计算成员-仓库-方向关系图（布局、社区、度数），前端直接渲染
+        graph = build_member_graph(members_writer.rows)
+        json.dump(graph, generation.open(CONFIG['GRAPH_FILE']), ensure_ascii=False, separators=(',', ':'))
+        current_hashes[CONFIG['GRAPH_FILE']] = json_content_hash(graph)
+        print(f"🕸️  关系图: {len(graph['nodes']['id'])} 个节点, {len(graph['edges']) // 2} 条边, {graph['community_count']} 个社区")
+
+        # 预构建搜索索引，前端按索引查询而不是逐个成员扫描
+        search_index = build_search_index(members_writer.rows)
+        json.dump(search_index, generation.open(CONFIG['SEARCH_INDEX_FILE']), ensure_ascii=False, separators=(',', ':'))
+        current_hashes[CONFIG['SEARCH_INDEX_FILE']] = json_content_hash(search_index)
+        print(f"🔎 搜索索引: {len(search_index['tokens'])} 个词, {len(search_index['grams'])} 个 n-gram, {len(search_index['facets'])} 个研究方向")
+
+        # 离线计算兴趣相近的成员，成员卡片直接读取
+        similar = build_similar_members(members_writer.rows, repos_data)
+        json.dump(similar, generation.open(CONFIG['SIMILAR_MEMBERS_FILE']), ensure_ascii=False, separators=(',', ':'))
+        current_hashes[CONFIG['SIMILAR_MEMBERS_FILE']] = json_content_hash(similar)
+        print(f"🤝 相似成员: {sum(1 for n in similar['neighbors'] if n)} 个成员有推荐, {similar['candidate_pairs']} 对候选")
+
+        # 语义变更检测：与现有文件比较内容哈希（忽略更新时间等易变字段）
+        previous_hashes = {path: read_content_hash(path) for path in current_hashes}
+        change_report = build_change_report(
+            generation, previous_hashes, current_hashes,
+            summarize_member_changes(CONFIG['OUTPUT_FILE'], members_writer),
+            summarize_commit_changes(read_commits_snapshot(CONFIG['COMMITS_FILE'])[1],
+                                     commit_outputs.get(CONFIG['COMMITS_FILE'], {}))
+        )
+
+        export_datasets = {
+            'members': export_member_records(members_writer.rows),
+            'repos': (repos_data or {}).get('repos', []),
+            'commits': export_commit_records(commit_outputs.get(CONFIG['COMMITS_FILE']))
+        }
+
+        if change_report['changed']:
+            if has_existing_data and backup:
+                backup_existing_data()
+            write_manifest(generation, change_report)
+            if CONFIG['EXPORT_BUNDLES']:
+                write_export_bundles(generation, export_datasets, change_report)
+            member_changes = change_report['members']
+            print(f"📝 数据有变化: 新增 {len(member_changes['added'])} 人, 移除 {len(member_changes['removed'])} 人, "
+                  f"{len(member_changes['changed'])} 人信息变化")
+            print(f"💾 发布数据版本: {generation.id} ({change_report['content_hash'][:12]})")
+        else:
+            # 内容与上次发布一致，保留现有文件，不触发重新构建
+            generation.abort()
+            print("ℹ️  数据内容与上次发布一致，保留现有数据文件")
+            if CONFIG['EXPORT_BUNDLES'] and not (CONFIG['EXPORT_DIR'] / 'manifest.json').exists():
+                # 首次启用导出时补全数据包
+                with OutputGeneration() as export_generation:
+                    write_export_bundles(export_generation, export_datasets, change_report)
+
+    return change_report
 
 def main():
     """主函数 - 统一版本，始终收集commit数据"""
     print("🚀 开始执行数据拉取脚本（包含commit数据）...")
     print(f"📁 输出文件: {CONFIG['OUTPUT_FILE']}")
     print(f"📊 Commit数据文件: {CONFIG['COMMITS_FILE']}")
-    print(f"🏢 组织名称: {CONFIG['ORG_NAME']}")
-    print(f"🔑 Token 状态: {'已配置' if CONFIG['GITHUB_TOKEN'] else '未配置'}")
+    print(f"🏢 组织名称: {', '.join(CONFIG['ORG_NAMES'])}")
+    token_count = len(CONFIG['GITHUB_TOKENS'])
+    print(f"🔑 Token 状态: {f'已配置 {token_count} 个' if token_count else '未配置'}")
+    if DEADLINE.enabled:
+        print(f"⏰ 截止时间: {DEADLINE.seconds:.0f} 秒（其中 {CONFIG['DEADLINE_RESERVE_SECONDS']:.0f} 秒留给写入数据文件）")
 
     # 当未安装 requests 时优雅降级
     if requests is None:
@@ -555,11 +3106,12 @@ def main():
     overall_start_time = time.time()
 
     try:
-        if has_existing_data:
-            backup_existing_data()
-
-        # 统一数据收集（同时获取成员和commit数据）
-        contributors_data, all_commits, api_stats = collect_unified_data(CONFIG['ORG_NAME'], include_commits=True)
+        # 统一数据收集（同时获取成员和commit数据），多组织时并发抓取
+        repo_states = {org_name: {} for org_name in CONFIG['ORG_NAMES']}
+        org_results = crawl_orgs(CONFIG['ORG_NAMES'], repo_states)
+        api_stats = merge_api_stats(org_results)
+        contributors_data = merge_org_contributors(org_results)
+        all_commits = merge_org_commits(org_results)
 
         if not contributors_data:
             print("⚠️  未找到任何贡献者数据")
@@ -570,95 +3122,9 @@ def main():
                 print("💥 没有现有数据可用，构建失败")
                 sys.exit(1)
 
-        # 处理成员数据
-        print(f"\n👥 开始处理 {len(contributors_data)} 个成员的详细信息...")
-        processed_members = []
-
-        for username, contrib_info in contributors_data.items():
-            print(f"\n👤 处理成员: {username}")
-
-            try:
-                # 获取用户详细信息
-                user_details = get_user_details(username)
-                api_stats['users'] += 1
-                api_stats['total'] += 1
-
-                if user_details:
-                    print(f"  ✓ 获取用户信息: {user_details.get('name', 'N/A')}")
-
-                # 获取用户仓库信息
-                user_repos = get_user_repos(username)
-                api_stats['user_repos'] += 1
-                api_stats['total'] += 1
-                print(f"  ✓ 获取用户仓库: {len(user_repos) if user_repos else 0} 个")
-
-                # 计算用户统计信息
-                user_stats = calculate_user_stats(user_details, user_repos)
-                print(f"  ✓ 统计信息: {user_stats['public_repos']} 仓库, {user_stats['total_stars']} Stars, {user_stats['followers']} 关注者")
-
-                # 下载并缓存头像
-                avatar_url = user_details.get('avatar_url') if user_details else contrib_info['user_info'].get('avatar_url')
-                local_avatar = download_avatar(avatar_url, username)
-
-                # 推断研究方向（基于仓库 topics、参与的仓库名称和用户简介）
-                user_bio = user_details.get('bio') if user_details else ''
-                domains = infer_domains_from_repos(contrib_info['repos'], user_bio, user_repos)
-                print(f"  ✓ 推断研究方向: {', '.join(domains)}")
-
-                processed_members.append({
-                    'id': username,
-                    'name': user_details.get('name') if user_details else username,
-                    'github': contrib_info['user_info']['html_url'],
-                    'domains': domains,
-                    'repositories': contrib_info['repos'],  # 参与的组织仓库列表
-                    'public_repos': user_stats['public_repos'],  # 个人公开仓库数
-                    'total_stars': user_stats['total_stars'],  # 总 Stars 数
-                    'followers': user_stats['followers'],  # 关注者数
-                    'following': user_stats['following'],  # 关注数
-                    'avatar': local_avatar,  # 本地头像路径
-                    'bio': user_details.get('bio') if user_details else '',
-                    'location': user_details.get('location') if user_details else '',
-                    'company': user_details.get('company') if user_details else ''
-                })
-
-            except Exception as e:
-                print(f"  ❌ 处理成员 {username} 时出错: {e}")
-                continue
-
-        if processed_members:
-            # 保存成员数据
-            save_to_csv(processed_members, CONFIG['OUTPUT_FILE'])
-            print(f"✅ 成功处理 {len(processed_members)} 个成员")
-
-            # 处理并保存commit数据
-            if all_commits:
-                print(f"\n📊 处理 {len(all_commits)} 个commit数据...")
-                user_commits = aggregate_commits_by_user(all_commits)
-
-                commits_data = {
-                    'update_time': datetime.now().isoformat(),
-                    'days_range': CONFIG['COMMIT_DAYS_RANGE'],
-                    'total_commits': len(all_commits),
-                    'total_repos': len(set(commit['repo'] for commit in all_commits)),
-                    'user_commits': user_commits,
-                    'optimization_stats': {
-                        'api_calls': api_stats,
-                        'execution_time': f"{time.time() - overall_start_time:.1f}s",
-                        'optimization_enabled': True
-                    }
-                }
-
-                save_commits_data(commits_data)
-
-            # 显示执行统计
-            total_time = time.time() - overall_start_time
-            print(f"\n🎉 执行完成!")
-            print(f"📊 性能统计:")
-            print(f"  - 总API调用: {api_stats['total']} 次")
-            print(f"  - 总执行时间: {total_time:.1f} 秒")
-
-        else:
-            print("❌ 没有成功处理任何成员")
+        change_report = publish_outputs(org_results, api_stats, contributors_data, all_commits,
+                                        overall_start_time, has_existing_data, repo_states=repo_states)
+        if change_report is None:
             if has_existing_data:
                 print("🔄 使用现有数据继续构建...")
                 sys.exit(0)
@@ -666,6 +3132,24 @@ def main():
                 print("💥 构建失败")
                 sys.exit(1)
 
+        # 显示执行统计
+        total_time = time.time() - overall_start_time
+        print(f"\n🎉 执行完成!")
+        print(f"📊 性能统计:")
+        print(f"  - 总API调用: {api_stats['total']} 次")
+        print(f"  - Token 使用: {TOKEN_POOL.summary()}")
+        print(f"  - 用户资料缓存: {PROFILE_CACHE.stats}")
+        print(f"  - 失败请求缓存: {NEGATIVE_CACHE.stats}, 熔断: {CIRCUIT_BREAKER.stats}")
+        print(f"  - 分页列表: {LISTING_STATS.summary()}")
+        if CONFIG['COMMIT_SOURCE'] == 'git':
+            print(f"  - git 镜像: {GIT_MIRRORS.stats}")
+        if CONFIG['CONTRIBUTOR_STATS']:
+            print(f"  - 行数统计: {CONTRIBUTOR_STATS.stats}")
+        if DEADLINE.enabled:
+            print(f"  - 截止时间: {DEADLINE.summary()}")
+            write_github_output('partial', 'true' if DEADLINE.partial else 'false')
+        print(f"  - 总执行时间: {total_time:.1f} 秒")
+
     except Exception as e:
         print(f"💥 脚本执行失败: {e}")
         import traceback
@@ -678,6 +3162,708 @@ def main():
             print("💥 没有现有数据可用，构建失败")
             sys.exit(1)
 
+def org_results_from_repo_states(repo_states, api_calls=None):
+    """
+    由按仓库保存的抓取结果（{org: {repo: {'contributors', 'commits'}}}）生成与 crawl_orgs 相同结构的结果
+    commit 只保留统计窗口内的
+    """
+    cutoff = datetime.fromisoformat(commit_since_iso().replace('Z', '+00:00'))
+    results = {}
+    for org_name, repos in repo_states.items():
+        contributors_data = {}
+        all_commits = []
+        for repo_name, state in repos.items():
+            add_repo_contributors(contributors_data, repo_name, state['contributors'])
+            all_commits.extend(commit for commit in state['commits'] if commit.date_parsed >= cutoff)
+        results[org_name] = (contributors_data, all_commits, dict((api_calls or {}).get(org_name) or {}))
+    return results
+
+class OrgEventWatcher:
+    """
+    监听模式的内存状态
+    按组织、仓库保存贡献者和 commit，记录各组织事件流的 ETag 和已处理到的事件 ID
+    """
+
+    def __init__(self, org_names):
+        self.org_names = list(org_names)
+        self.repos = {org: {} for org in self.org_names}  # {org: {repo: {'contributors': [...], 'commits': [...], 'meta': Repo}}}
+        self.api_calls = {org: defaultdict(int) for org in self.org_names}
+        self.profile_calls = defaultdict(int)  # 发布时获取用户资料的调用（不属于某个组织）
+        self.etags = {}
+        self.last_event_ids = {}
+        self.poll_interval = CONFIG['WATCH_INTERVAL']
+        self.synced_at = None
+
+    def needs_resync(self):
+        """是否需要全量重新抓取"""
+        if self.synced_at is None:
+            return True
+        return time.time() - self.synced_at >= CONFIG['WATCH_RESYNC_HOURS'] * 3600
+
+    def full_sync(self):
+        """全量抓取所有组织，重建内存状态（抓取失败的组织保留原有状态）"""
+        repo_states = {org: {} for org in self.org_names}
+        org_results = crawl_orgs(self.org_names, repo_states)
+        for org_name, (contributors_data, _, api_calls) in org_results.items():
+            if contributors_data is None:
+                print(f"⚠️  组织 {org_name} 全量抓取失败，继续使用内存中的数据")
+                continue
+            self.repos[org_name] = repo_states[org_name]
+            self.api_calls[org_name] = defaultdict(int, api_calls or {})
+        self.profile_calls = defaultdict(int)
+        self.synced_at = time.time()
+
+    EVENTS_PER_PAGE = 100
+
+    def poll(self):
+        """
+        轮询各组织的事件流，返回 ({org: {repo}}, {username})
+        第一次轮询只记录基线，之前的事件已包含在全量抓取中
+        两次轮询之间的事件超过一页时继续翻页，翻完事件流仍未接上已处理的事件时安排全量抓取（needs_resync）
+        """
+        touched_repos = defaultdict(set)
+        touched_users = set()
+
+        for org_name in self.org_names:
+            url = f"{CONFIG['API_BASE']}/orgs/{org_name}/events?per_page={self.EVENTS_PER_PAGE}"
+            status, events, etag, poll_interval = fetch_api_conditional(url, self.etags.get(org_name))
+            self.api_calls[org_name]['events'] += 1
+            self.api_calls[org_name]['total'] += 1
+            if poll_interval:
+                self.poll_interval = max(CONFIG['WATCH_INTERVAL'], poll_interval)
+            if status != 200:
+                continue
+
+            last_event_id = self.last_event_ids.get(org_name)
+            events = list(events or [])
+            if last_event_id is not None:
+                older_events = self.fetch_older_events(org_name, url, events, last_event_id)
+                if older_events is None:
+                    # 以当前事件为新的基线，之前的变化由全量抓取覆盖
+                    print(f"⚠️  组织 {org_name} 两次轮询之间的事件超出事件流可翻阅的范围，改为全量抓取")
+                    self.synced_at = None
+                    last_event_id = None
+                else:
+                    events.extend(older_events)
+
+            self.etags[org_name] = etag
+            event_ids = [event_id for event_id in map(self.event_id, events) if event_id is not None]
+            if event_ids:
+                self.last_event_ids[org_name] = max(event_ids + [last_event_id or 0])
+            if last_event_id is None:
+                continue
+
+            for event in events:
+                event_id = self.event_id(event)
+                if event_id is None or event_id <= last_event_id:
+                    continue
+                repo_name = self.affected_repo(org_name, event)
+                if not repo_name:
+                    continue
+                touched_repos[org_name].add(repo_name)
+                actor = (event.get('actor') or {}).get('login')
+                if actor and not is_bot_account(actor):
+                    touched_users.add(actor)
+
+        return touched_repos, touched_users
+
+    @staticmethod
+    def event_id(event):
+        """事件 ID（整数），格式不符时返回 None"""
+        value = str(event.get('id', ''))
+        return int(value) if value.isdigit() else None
+
+    def fetch_older_events(self, org_name, url, first_page, last_event_id):
+        """
+        从第二页开始继续翻页，直到遇到已处理过的事件（ID 不大于 last_event_id），返回第一页之后的事件
+        某一页不满说明事件流已经到底，没有遗漏；翻页失败（事件流最多只能翻到约 300 条）时返回 None
+        """
+        older_events = []
+        page_events = first_page
+        page = 1
+        while not any((self.event_id(event) or 0) <= last_event_id for event in page_events):
+            if len(page_events) < self.EVENTS_PER_PAGE:
+                return older_events
+            page += 1
+            page_events, _ = fetch_api_response(f"{url}&page={page}")
+            self.api_calls[org_name]['events'] += 1
+            self.api_calls[org_name]['total'] += 1
+            if not page_events:
+                return None
+            older_events.extend(page_events)
+        return older_events
+
+    @staticmethod
+    def affected_repo(org_name, event):
+        """事件会改变贡献者或 commit 数据时返回仓库名，否则返回 None"""
+        event_type = event.get('type')
+        payload = event.get('payload') or {}
+        if event_type == 'PullRequestEvent' and not (payload.get('pull_request') or {}).get('merged'):
+            return None
+        if event_type == 'CreateEvent' and payload.get('ref_type') != 'repository':
+            return None
+        if event_type not in ('PushEvent', 'PullRequestEvent', 'CreateEvent', 'PublicEvent'):
+            return None
+
+        owner, _, repo_name = (event.get('repo') or {}).get('name', '').partition('/')
+        if owner.lower() != org_name.lower() or not repo_name:
+            return None
+        return repo_name
+
+    def refresh(self, touched_repos):
+        """只重新抓取事件涉及的仓库；请求失败的部分保留原有数据"""
+        since_iso = commit_since_iso()
+        crawled = []
+        for org_name, repo_names in touched_repos.items():
+            prefetch_commits(org_name, sorted(repo_names), since_iso)
+            # 有新推送的仓库行数统计已过期（事件中没有 pushed_at，总是重新请求）
+            CONTRIBUTOR_STATS.warm(org_name, [Repo(name=repo_name) for repo_name in repo_names])
+            for repo_name in sorted(repo_names):
+                print(f"\n📦 事件触发更新仓库: {org_name}/{repo_name}")
+                contributors, commits, complete = crawl_repo(org_name, repo_name, since_iso, self.api_calls[org_name])
+                crawled.append((org_name, repo_name, contributors, commits, complete))
+
+        CONTRIBUTOR_STATS.wait()
+        for org_name, repo_name, contributors, commits, complete in crawled:
+            state = self.repos[org_name].setdefault(repo_name, {'contributors': [], 'commits': []})
+            if contributors is not None:
+                state['contributors'] = qualify_contributors(org_name, repo_name, contributors)
+                state.update(roster=contributor_roster(contributors), roster_complete=complete, contributors_fetched=True)
+            if commits is not None:
+                state['commits'] = commits
+
+    def org_results(self):
+        """由内存状态生成与 crawl_orgs 相同结构的结果"""
+        return org_results_from_repo_states(self.repos, self.api_calls)
+
+    def api_stats(self):
+        """自上次全量抓取以来累计的 API 调用统计"""
+        stats = merge_api_stats({org: (None, None, calls) for org, calls in self.api_calls.items()})
+        for key, value in self.profile_calls.items():
+            stats[key] += value
+        return stats
+
+    def publish(self, refresh_users=(), backup=False):
+        """用内存状态重新生成输出文件（内容不变时不会改写）"""
+        start_time = time.time()
+        org_results = self.org_results()
+        contributors_data = merge_org_contributors(org_results)
+        if not contributors_data:
+            print("⚠️  内存中没有贡献者数据，跳过发布")
+            return None
+        api_stats = merge_api_stats(org_results)
+        before = {key: api_stats[key] for key in ('users', 'user_repos', 'total')}
+        change_report = publish_outputs(org_results, api_stats, contributors_data, merge_org_commits(org_results),
+                                        start_time, check_existing_data(), refresh_users, backup, self.repos)
+        for key, value in before.items():
+            self.profile_calls[key] += api_stats[key] - value
+        return change_report
+
+def watch():
+    """监听模式：全量抓取一次后轮询组织事件流，只重新抓取事件涉及的仓库和用户，有变化时增量发布"""
+    print("👀 启动监听模式...")
+    print(f"🏢 组织名称: {', '.join(CONFIG['ORG_NAMES'])}")
+    print(f"⏱️  轮询间隔: {CONFIG['WATCH_INTERVAL']} 秒, 全量重新抓取间隔: {CONFIG['WATCH_RESYNC_HOURS']} 小时")
+
+    if requests is None:
+        print("💥 缺少 requests 库，无法启动监听模式")
+        sys.exit(1)
+
+    watcher = OrgEventWatcher(CONFIG['ORG_NAMES'])
+    # 先记录事件流基线再全量抓取，抓取期间发生的事件会在下次轮询时重新处理
+    watcher.poll()
+    polls = 0
+
+    try:
+        while True:
+            if watcher.needs_resync():
+                print("\n🔁 全量抓取...")
+                watcher.full_sync()
+                watcher.publish(backup=True)
+            else:
+                time.sleep(watcher.poll_interval)
+                touched_repos, touched_users = watcher.poll()
+                polls += 1
+                if watcher.needs_resync():
+                    print(f"\n🔁 事件有遗漏，下次循环全量抓取（第 {polls} 次轮询）")
+                elif touched_repos:
+                    repo_count = sum(len(repo_names) for repo_names in touched_repos.values())
+                    print(f"\n🔔 新事件: {repo_count} 个仓库, {len(touched_users)} 个用户需要更新")
+                    watcher.refresh(touched_repos)
+                    watcher.publish(touched_users)
+                else:
+                    print(f"💤 没有新事件（第 {polls} 次轮询）")
+                print(f"📊 API 调用: {dict(watcher.api_stats())}")
+
+            if CONFIG['WATCH_MAX_POLLS'] and polls >= CONFIG['WATCH_MAX_POLLS']:
+                print(f"🛑 已达到轮询次数上限 ({CONFIG['WATCH_MAX_POLLS']})，退出监听")
+                break
+    except KeyboardInterrupt:
+        print("\n👋 停止监听")
+
+# 分阶段流水线：每个阶段的产物保存在 <CACHE_DIR>/pipeline/<阶段>.json，输入未变化时跳过
+# 产物中的记录保存为 Record.to_dict() 的字典，读取产物时再转换回记录
+PIPELINE_VERSION = 3
+
+def run_repos_stage(inputs):
+    """repos 阶段：获取各组织的原创仓库列表（保留元数据）"""
+    repos = {org_name: [repo.to_dict() for repo in get_org_repos(org_name)] for org_name in CONFIG['ORG_NAMES']}
+    if not any(repos.values()):
+        raise RuntimeError("未获取到任何仓库")
+    return repos
+
+def run_crawl_stage(inputs):
+    """crawl 阶段：抓取每个仓库的贡献者和统计窗口内的 commit（多组织时并发）"""
+    since_iso = commit_since_iso()
+
+    def crawl_org(org_name, org_repos):
+        api_calls = defaultdict(int)
+        repos = {}
+        org_repos = [Repo.from_dict(repo) for repo in org_repos]
+        prefetch_commits(org_name, [repo.name for repo in org_repos], since_iso)
+        CONTRIBUTOR_STATS.warm(org_name, org_repos)
+        for index, repo in enumerate(org_repos):
+            print(f"\n📦 处理仓库: {org_name}/{repo.name} ({index + 1}/{len(org_repos)})")
+            contributors, commits, complete = crawl_repo(org_name, repo.name, since_iso, api_calls)
+            repos[repo.name] = {
+                'contributors': contributors or [],
+                'roster': contributor_roster(contributors or []),
+                'commits': [commit.to_dict() for commit in commits or []],
+                'meta': repo.to_dict()
+            }
+            if contributors is None:
+                repos[repo.name]['contributors_fetched'] = False
+            elif not complete:
+                repos[repo.name]['roster_complete'] = False
+        CONTRIBUTOR_STATS.wait()
+        for repo_name, state in repos.items():
+            state['contributors'] = [contributor.to_dict()
+                                     for contributor in qualify_contributors(org_name, repo_name, state['contributors'])]
+        return repos, dict(api_calls)
+
+    workers = max(1, min(len(inputs['repos']), CONFIG['MAX_ORG_WORKERS']))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {org_name: executor.submit(crawl_org, org_name, org_repos)
+                   for org_name, org_repos in inputs['repos'].items()}
+        results = {org_name: future.result() for org_name, future in futures.items()}
+    return {
+        'repos': {org_name: repos for org_name, (repos, _) in results.items()},
+        'api_calls': {org_name: api_calls for org_name, (_, api_calls) in results.items()}
+    }
+
+def repo_states_from_crawl(crawl):
+    """由 crawl 阶段产物恢复按仓库保存的抓取结果（字典转换回 Contributor、Commit、Repo 记录）"""
+    return {
+        org_name: {
+            repo_name: {
+                'contributors': [Contributor.from_dict(contributor) for contributor in state['contributors']],
+                'commits': [Commit.from_dict(commit) for commit in state['commits']],
+                'meta': Repo.from_dict(state['meta']),
+                'contributors_fetched': state.get('contributors_fetched', True),
+                'roster': state.get('roster'),
+                'roster_complete': state.get('roster_complete', True)
+            }
+            for repo_name, state in repos.items()
+        }
+        for org_name, repos in crawl['repos'].items()
+    }
+
+def org_results_from_crawl(crawl):
+    """由 crawl 阶段产物生成与 crawl_orgs 相同结构的结果"""
+    return org_results_from_repo_states(repo_states_from_crawl(crawl), crawl['api_calls'])
+
+def run_enrich_stage(inputs):
+    """enrich 阶段：补全成员资料、统计和研究方向（头像留给 avatars 阶段）"""
+    org_results = org_results_from_crawl(inputs['crawl'])
+    contributors_data = merge_org_contributors(org_results)
+    all_commits = merge_org_commits(org_results)
+    active_users = {commit.github_username for commit in all_commits if commit.github_username}
+    PROFILE_CACHE.plan(list(contributors_data), active_users)
+
+    print(f"\n👥 开始处理 {len(contributors_data)} 个成员的详细信息（{CONFIG['ENRICH_WORKERS']} 个并发）...")
+    members = [
+        {'member': member.to_dict(), 'orgs': {org_name: record.to_dict() for org_name, record in org_records.items()}}
+        for member, org_records in enrich_members(contributors_data, merge_api_stats(org_results), download_avatars=False)
+    ]
+    PROFILE_CACHE.save()
+    NEGATIVE_CACHE.save()
+    if not members:
+        raise RuntimeError("没有成功处理任何成员")
+    return members
+
+def run_avatars_stage(inputs):
+    """avatars 阶段：下载成员头像（已存在的头像不会重复下载），返回 {用户名: 本地路径}"""
+    members = [Member.from_dict(entry['member']) for entry in inputs['enrich']]
+    with ThreadPoolExecutor(max_workers=max(1, CONFIG['ENRICH_WORKERS'])) as executor:
+        futures = {member.id: executor.submit(download_avatar, member.avatar_url, member.id) for member in members}
+        return {username: future.result() for username, future in futures.items()}
+
+def run_search_stage(inputs):
+    """search 阶段：按日期切片收集各组织的 PR、issue 和 review 活动（未启用时为 None）"""
+    return collect_search_activity(CONFIG['ORG_NAMES'])
+
+def run_aggregate_stage(inputs):
+    """
+    aggregate 阶段：按用户聚合 commit 数据和 PR/issue/review 活动（合并数据和各组织数据），计算打卡矩阵和仓库数据集，
+    并与上次发布的成员加入、离开记录比较
+    """
+    start_time = time.time()
+    repo_states = repo_states_from_crawl(inputs['crawl'])
+    org_results = org_results_from_repo_states(repo_states, inputs['crawl']['api_calls'])
+    all_commits = merge_org_commits(org_results)
+    search_activity = inputs['search']
+    aggregated = {
+        'all': build_commits_data(all_commits, merge_api_stats(org_results), start_time, None, search_activity) if all_commits else None,
+        'orgs': {},
+        'activity': build_activity_matrices(all_commits) if all_commits else None,
+        'repos': build_repos_data(repo_states),
+        'membership': build_membership(read_membership(), repo_states)
+    }
+    if is_multi_org():
+        for org_name, (_, org_commits, org_api_calls) in org_results.items():
+            if org_commits:
+                org_activity = {org_name: search_activity[org_name]} if search_activity else None
+                aggregated['orgs'][org_name] = build_commits_data(org_commits, org_api_calls, start_time, None, org_activity)
+    return aggregated
+
+def run_export_stage(inputs):
+    """export 阶段：把前面各阶段的产物作为同一代数据发布到 docs/public"""
+    avatars = inputs['avatars']
+
+    def member_results():
+        for entry in inputs['enrich']:
+            member = Member.from_dict(entry['member']).replace(avatar=avatars.get(entry['member']['id']), avatar_url=None)
+            org_records = {org_name: Member.from_dict(record).replace(avatar=member.avatar)
+                           for org_name, record in entry['orgs'].items()}
+            yield member, org_records
+
+    def build_commit_outputs(generation):
+        outputs = {}
+        if inputs['aggregate']['all']:
+            outputs[CONFIG['COMMITS_FILE']] = dict(inputs['aggregate']['all'], generation=generation.id)
+        for org_name, commits_data in inputs['aggregate']['orgs'].items():
+            outputs[CONFIG['ORGS_DATA_DIR'] / org_name / 'commits_weekly.json'] = dict(commits_data, generation=generation.id)
+        return outputs
+
+    change_report = write_outputs(CONFIG['ORG_NAMES'], member_results(), build_commit_outputs, check_existing_data(),
+                                  activity=inputs['aggregate'].get('activity'), repos_data=inputs['aggregate'].get('repos'),
+                                  membership=inputs['aggregate'].get('membership'))
+    if change_report is None:
+        raise RuntimeError("没有可发布的成员数据")
+    write_github_output('content_changed', 'true' if change_report['changed'] else 'false')
+    return {'generation': change_report['generation'], 'changed': change_report['changed'],
+            'content_hash': change_report['content_hash']}
+
+# 阶段定义：上游阶段、影响结果的配置项、影响结果的代码（函数源码变化时重新运行）
+# remote 为读取 GitHub 数据的阶段，产物超过 PIPELINE_REMOTE_TTL_HOURS 后重新运行；
+# windowed 为依赖统计窗口的阶段，窗口起始日期变化时重新运行
+PIPELINE_STAGES = {
+    'repos': {
+        'run': run_repos_stage,
+        'deps': (),
+        'remote': True,
+        'config': ('ORG_NAMES', 'MAX_REPOS_PER_PAGE', 'TEST_MODE', 'TEST_MAX_REPOS'),
+        'code': ('get_org_repos', 'fetch_all_pages', 'Record', 'Repo')
+    },
+    'crawl': {
+        'run': run_crawl_stage,
+        'deps': ('repos',),
+        'remote': True,
+        'windowed': True,
+        'config': ('MIN_CONTRIBUTIONS', 'MAX_CONTRIBUTORS_PER_REPO', 'COMMIT_DAYS_RANGE', 'MAX_COMMITS_PER_REPO',
+                   'BOT_USERNAMES', 'COMMIT_SOURCE', 'GIT_REMOTE_BASE', 'GIT_RESOLVE_AUTHORS', 'CONTRIBUTOR_STATS',
+                   'MIN_CONTRIBUTION_LINES'),
+        'code': ('crawl_repo', 'fetch_all_pages', 'contributor_roster', 'parse_commit', 'is_bot_account', 'Contributor', 'Commit', 'read_git_log', 'GitMirrors',
+                 'qualify_contributors', 'ContributorStats')
+    },
+    'enrich': {
+        'run': run_enrich_stage,
+        'deps': ('crawl',),
+        'remote': True,
+        'config': ('ORG_NAMES', 'DEFAULT_DOMAINS', 'MAX_USER_REPOS'),
+        'code': ('enrich_member', 'build_member_record', 'infer_domains_from_repos', 'calculate_user_stats',
+                 'merge_org_contributors', 'qualify_repo_name', 'UserProfile', 'Member')
+    },
+    'avatars': {
+        'run': run_avatars_stage,
+        'deps': ('enrich',),
+        'config': ('AVATARS_DIR',),
+        'code': ('download_avatar',)
+    },
+    'search': {
+        'run': run_search_stage,
+        'deps': (),
+        'remote': True,
+        'windowed': True,
+        'config': ('ORG_NAMES', 'COMMIT_DAYS_RANGE', 'SEARCH_ACTIVITY', 'BOT_USERNAMES'),
+        'code': ('collect_search_activity', 'query_search_slice', 'query_review_slice', 'fetch_remaining_reviews',
+                 'add_search_count')
+    },
+    'aggregate': {
+        'run': run_aggregate_stage,
+        'deps': ('crawl', 'search'),
+        'windowed': True,
+        'config': ('ORG_NAMES', 'COMMIT_DAYS_RANGE', 'ACTIVITY_TIMEZONE', 'MEMBERSHIP_FILE'),
+        'code': ('build_commits_data', 'aggregate_commits_by_user', 'merge_org_commits', 'commit_username',
+                 'build_activity_matrices', 'punch_card_cells', 'count_punch_cards', 'summarize_search_activity',
+                 'build_repos_data', 'Commit', 'build_membership')
+    },
+    'export': {
+        'run': run_export_stage,
+        'deps': ('enrich', 'avatars', 'aggregate'),
+        'config': ('ORG_NAMES', 'OUTPUT_FILE', 'COMMITS_FILE', 'ORGS_DATA_DIR', 'REPOS_FILE', 'GRAPH_LAYOUT_ITERATIONS',
+                   'SIMILAR_MEMBERS_K', 'EXPORT_BUNDLES', 'EXPORT_DIR'),
+        'code': ('run_export_stage', 'write_outputs', 'member_to_csv_row', 'build_member_graph', 'compute_graph_layout',
+                 'detect_communities', 'build_search_index', 'tokenize_search_text', 'build_similar_members',
+                 'member_interest_features', 'minhash_signatures', 'lsh_candidate_pairs', 'write_export_bundles',
+                 'export_member_records', 'export_commit_records', 'encode_columnar', 'Member'),
+        'outputs': ('OUTPUT_FILE',)  # 输出文件缺失时即使输入未变化也重新运行
+    }
+}
+
+def pipeline_artifact_path(stage):
+    """阶段产物的文件路径"""
+    return CONFIG['CACHE_DIR'] / 'pipeline' / f"{stage}.json"
+
+def load_pipeline_artifact(stage):
+    """读取阶段产物，不存在、损坏或格式版本不一致时返回 None"""
+    try:
+        with open(pipeline_artifact_path(stage), 'r', encoding='utf-8') as f:
+            artifact = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if artifact.get('version') != PIPELINE_VERSION or artifact.get('stage') != stage:
+        return None
+    return artifact
+
+def pipeline_config_value(value):
+    """把配置值转换为可哈希的 JSON 形式"""
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if isinstance(value, Path):
+        return str(value)
+    return value
+
+def pipeline_stage_fingerprint(stage):
+    """阶段自身的指纹：格式版本、相关配置、相关函数源码（依赖统计窗口的阶段还包括窗口起始日期）"""
+    spec = PIPELINE_STAGES[stage]
+    return canonical_hash({
+        'version': PIPELINE_VERSION,
+        'config': {key: pipeline_config_value(CONFIG.get(key)) for key in spec['config']},
+        'code': {name: hashlib.sha256(inspect.getsource(globals()[name]).encode('utf-8')).hexdigest() for name in spec['code']},
+        'window': commit_since_iso()[:10] if spec.get('windowed') else None
+    })
+
+def pipeline_artifact_expired(stage, artifact):
+    """读取 GitHub 数据的阶段产物是否已超过有效期"""
+    if not PIPELINE_STAGES[stage].get('remote'):
+        return False
+    try:
+        created_at = datetime.fromisoformat(artifact['created_at']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return True
+    return time.time() - created_at >= CONFIG['PIPELINE_REMOTE_TTL_HOURS'] * 3600
+
+def pipeline_inputs_hash(stage, dep_artifacts):
+    """阶段的输入哈希：阶段指纹和上游产物的内容哈希"""
+    return canonical_hash({
+        'stage': pipeline_stage_fingerprint(stage),
+        'deps': {dep: dep_artifacts[dep]['data_hash'] for dep in PIPELINE_STAGES[stage]['deps']}
+    })
+
+def write_pipeline_artifact(stage, inputs_hash, data):
+    """原子写入阶段产物"""
+    artifact = {
+        'version': PIPELINE_VERSION,
+        'stage': stage,
+        'inputs_hash': inputs_hash,
+        'data_hash': canonical_hash(data),
+        'created_at': datetime.now().isoformat(),
+        'data': data
+    }
+    with OutputGeneration() as generation:
+        json.dump(artifact, generation.open(pipeline_artifact_path(stage)), ensure_ascii=False)
+    return artifact
+
+def run_pipeline_stage(stage, force=False, completed=None, refresh_remote=False):
+    """
+    运行指定阶段（先确保上游阶段的产物是最新的），返回阶段产物
+    输入哈希与已有产物一致、且读取 GitHub 数据的阶段产物未过期时跳过
+    force 强制重新运行指定的阶段，并让上游读取 GitHub 数据的阶段一并重新运行（refresh_remote）
+    """
+    completed = {} if completed is None else completed
+    if stage in completed:
+        return completed[stage]
+
+    spec = PIPELINE_STAGES[stage]
+    force = force or (refresh_remote and spec.get('remote', False))
+    dep_artifacts = {dep: run_pipeline_stage(dep, completed=completed, refresh_remote=force or refresh_remote)
+                     for dep in spec['deps']}
+    inputs_hash = pipeline_inputs_hash(stage, dep_artifacts)
+
+    artifact = load_pipeline_artifact(stage)
+    outputs_exist = all(Path(CONFIG[key]).exists() for key in spec.get('outputs', ()))
+    if not force and artifact and artifact['inputs_hash'] == inputs_hash and outputs_exist:
+        if not pipeline_artifact_expired(stage, artifact):
+            print(f"⏭️  阶段 {stage}: 输入未变化，使用 {artifact['created_at']} 的产物")
+            completed[stage] = artifact
+            return artifact
+        print(f"⌛ 阶段 {stage}: {artifact['created_at']} 的产物已超过 {CONFIG['PIPELINE_REMOTE_TTL_HOURS']:g} 小时，重新获取")
+
+    print(f"\n▶️  阶段 {stage}: 开始运行...")
+    start_time = time.time()
+    data = spec['run']({dep: dep_artifact['data'] for dep, dep_artifact in dep_artifacts.items()})
+    artifact = write_pipeline_artifact(stage, inputs_hash, data)
+    print(f"✅ 阶段 {stage}: 完成，耗时 {time.time() - start_time:.1f} 秒")
+
+    completed[stage] = artifact
+    return artifact
+
+def repo_shard(org_name, repo_name, shard_count):
+    """按仓库全名的稳定哈希分片（与运行环境、仓库列表顺序无关）"""
+    digest = hashlib.sha1(f"{org_name}/{repo_name}".encode('utf-8')).hexdigest()
+    return int(digest[:8], 16) % shard_count
+
+def parse_shard(value):
+    """解析 --shard i/N（i 从 0 开始）"""
+    index, _, count = (value or '').partition('/')
+    index, count = int(index), int(count)
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"无效的分片: {value}（格式为 i/N，0 <= i < N）")
+    return index, count
+
+def shard_artifact_path(index, count):
+    """分片抓取结果的文件路径"""
+    return CONFIG['SHARD_DIR'] / f"crawl-{index}-of-{count}.json"
+
+def run_crawl_shard(index, count):
+    """
+    抓取一个分片：读取 repos 阶段产物中的完整仓库列表，只抓取哈希落在本分片的仓库，结果写入 SHARD_DIR
+    仓库列表只获取一次（先运行 repos 阶段），所有分片共用同一份列表，避免各分片看到的仓库不一致
+    """
+    repos_artifact = load_pipeline_artifact('repos')
+    if repos_artifact is None:
+        raise RuntimeError(f"没有仓库列表（{pipeline_artifact_path('repos')}），请先运行 repos 阶段，再把产物分发给各分片")
+    repos = repos_artifact['data']
+    partition = {
+        org_name: [repo for repo in org_repos if repo_shard(org_name, repo['name'], count) == index]
+        for org_name, org_repos in repos.items()
+    }
+    print(f"🧩 分片 {index}/{count}: 抓取 {sum(map(len, partition.values()))}/{sum(map(len, repos.values()))} 个仓库")
+
+    data = run_crawl_stage({'repos': partition})
+    artifact = {
+        'version': PIPELINE_VERSION,
+        'stage': 'crawl-shard',
+        'shard': index,
+        'shards': count,
+        # 合并时校验各分片使用相同的抓取配置和代码
+        'fingerprint': {stage: pipeline_stage_fingerprint(stage) for stage in ('repos', 'crawl')},
+        'repos_hash': repos_artifact['data_hash'],
+        'repos': partition,
+        'created_at': datetime.now().isoformat(),
+        'data': data
+    }
+    with OutputGeneration() as generation:
+        json.dump(artifact, generation.open(shard_artifact_path(index, count)), ensure_ascii=False)
+    print(f"💾 分片结果已保存: {shard_artifact_path(index, count)}")
+    return artifact
+
+def merge_crawl_shards():
+    """
+    合并 SHARD_DIR 中所有分片的抓取结果，写入 repos 和 crawl 阶段产物
+    仓库按名称排序合并，之后的阶段与单进程抓取得到相同的输出
+    """
+    shards = {}
+    for path in sorted(CONFIG['SHARD_DIR'].glob('crawl-*-of-*.json')):
+        with open(path, 'r', encoding='utf-8') as f:
+            artifact = json.load(f)
+        if artifact.get('version') != PIPELINE_VERSION or artifact.get('stage') != 'crawl-shard':
+            print(f"⚠️  跳过格式不兼容的分片文件: {path}")
+            continue
+        key = (artifact['shard'], artifact['shards'])
+        if key in shards:
+            raise RuntimeError(f"分片 {key[0]}/{key[1]} 重复")
+        shards[key] = artifact
+
+    if not shards:
+        raise RuntimeError(f"{CONFIG['SHARD_DIR']} 中没有分片结果")
+    counts = {count for _, count in shards}
+    if len(counts) != 1:
+        raise RuntimeError(f"分片总数不一致: {sorted(counts)}")
+    count = counts.pop()
+    missing = sorted(set(range(count)) - {index for index, _ in shards})
+    if missing:
+        raise RuntimeError(f"缺少分片: {', '.join(f'{index}/{count}' for index in missing)}")
+
+    fingerprint = {stage: pipeline_stage_fingerprint(stage) for stage in ('repos', 'crawl')}
+    for (index, _), artifact in sorted(shards.items()):
+        if artifact['fingerprint'] != fingerprint:
+            raise RuntimeError(f"分片 {index}/{count} 的抓取配置或代码与当前不一致")
+    if len({artifact.get('repos_hash') for artifact in shards.values()}) != 1:
+        raise RuntimeError("各分片使用的仓库列表不一致，请用同一份 repos 阶段产物重新运行分片")
+
+    repo_states = {org_name: {} for org_name in CONFIG['ORG_NAMES']}
+    api_calls = {org_name: defaultdict(int) for org_name in CONFIG['ORG_NAMES']}
+    for _, artifact in sorted(shards.items()):
+        # 分片文件中的组织可能不在当前 ORG_NAMES 中（例如合并任务的配置不同）
+        for org_name in artifact['repos']:
+            repo_states.setdefault(org_name, {})
+            api_calls.setdefault(org_name, defaultdict(int))
+        for org_name, repos in artifact['data']['repos'].items():
+            repo_states.setdefault(org_name, {}).update(repos)
+        for org_name, calls in artifact['data']['api_calls'].items():
+            for key, value in calls.items():
+                api_calls.setdefault(org_name, defaultdict(int))[key] += value
+
+    repos_data = {org_name: [repos[repo_name]['meta'] for repo_name in sorted(repos)] for org_name, repos in repo_states.items()}
+    crawl_data = {
+        'repos': {org_name: {repo_name: repos[repo_name] for repo_name in sorted(repos)} for org_name, repos in repo_states.items()},
+        'api_calls': {org_name: dict(calls) for org_name, calls in api_calls.items()}
+    }
+
+    repos_artifact = write_pipeline_artifact('repos', pipeline_inputs_hash('repos', {}), repos_data)
+    crawl_artifact = write_pipeline_artifact('crawl', pipeline_inputs_hash('crawl', {'repos': repos_artifact}), crawl_data)
+    print(f"🧩 已合并 {count} 个分片: {sum(map(len, repos_data.values()))} 个仓库")
+    return {'repos': repos_artifact, 'crawl': crawl_artifact}
+
+def run_pipeline(stage, force=False, shard=None):
+    """流水线子命令入口（stage 为 merge-shards 时合并分片结果后继续运行到 export）"""
+    print(f"🚀 运行流水线阶段: {stage}{'（强制）' if force else ''}{f'（分片 {shard[0]}/{shard[1]}）' if shard else ''}")
+    print(f"🏢 组织名称: {', '.join(CONFIG['ORG_NAMES'])}")
+
+    if requests is None and stage in ('repos', 'crawl', 'search', 'enrich', 'avatars', 'merge-shards'):
+        print("💥 缺少 requests 库，无法运行需要网络请求的阶段")
+        sys.exit(1)
+
+    start_time = time.time()
+    try:
+        if shard:
+            run_crawl_shard(*shard)
+        elif stage == 'merge-shards':
+            # 合并得到的 repos、crawl 产物直接使用（--force 不会让它们重新抓取）
+            run_pipeline_stage('export', force, completed=merge_crawl_shards())
+        else:
+            run_pipeline_stage(stage, force)
+    except Exception as e:
+        print(f"💥 阶段 {stage} 运行失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        NEGATIVE_CACHE.save()
+        GIT_MIRRORS.save()
+        CONTRIBUTOR_STATS.save()
+
+    print(f"\n🎉 执行完成! 总耗时 {time.time() - start_time:.1f} 秒")
+    print(f"  - Token 使用: {TOKEN_POOL.summary()}")
+    print(f"  - 失败请求缓存: {NEGATIVE_CACHE.stats}, 熔断: {CIRCUIT_BREAKER.stats}")
+    print(f"  - 分页列表: {LISTING_STATS.summary()}")
+    if CONFIG['COMMIT_SOURCE'] == 'git':
+        print(f"  - git 镜像: {GIT_MIRRORS.stats}")
+    if CONFIG['CONTRIBUTOR_STATS']:
+        print(f"  - 行数统计: {CONTRIBUTOR_STATS.stats}")
+
 def get_recent_commits_for_repo(org_name, repo_name, days=7):
     """获取指定仓库最近N天的commit数据"""
 
@@ -711,33 +3897,8 @@ def process_commits_data(commits, repo_name):
 
     for commit in commits:
         try:
-            # 提取commit信息
-            commit_data = {
-                'sha': commit['sha'][:8],  # 短SHA
-                'message': commit['commit']['message'].split('\n')[0][:100],  # 第一行消息，限制长度
-                'author': {
-                    'name': commit['commit']['author']['name'],
-                    'email': commit['commit']['author']['email'],
-                    'date': commit['commit']['author']['date']
-                },
-                'repo': repo_name,
-                'url': commit['html_url']
-            }
-
-            # 尝试获取GitHub用户名
-            if commit.get('author') and commit['author']:
-                commit_data['github_username'] = commit['author']['login']
-            else:
-                # 如果没有GitHub用户信息，尝试从email推断
-                commit_data['github_username'] = None
-
-            # 解析日期
-            commit_date = datetime.fromisoformat(commit_data['author']['date'].replace('Z', '+00:00'))
-            commit_data['date_parsed'] = commit_date
-            commit_data['date_str'] = commit_date.strftime('%Y-%m-%d')
-            commit_data['hour'] = commit_date.hour
-
-            processed_commits.append(commit_data)
+            # 提取commit信息（短SHA、第一行消息、GitHub用户名和提交时间）
+            processed_commits.append(Commit.from_api(commit, None, repo_name))
 
         except Exception as e:
             print(f"    ⚠️  处理commit数据时出错: {e}")
@@ -759,7 +3920,7 @@ def collect_weekly_commits_data(org_name, days=7):
     processed_repos = 0
 
     for repo in repos:
-        repo_name = repo['name']
+        repo_name = repo.name
         print(f"📁 处理仓库: {repo_name} ({processed_repos + 1}/{len(repos)})")
 
         # 获取仓库的commit数据
@@ -790,92 +3951,560 @@ def collect_weekly_commits_data(org_name, days=7):
         'total_commits': len(all_commits),
         'total_repos': len(repos),
         'user_commits': user_commits,
-        'raw_commits': all_commits[:1000]  # 只保存前1000个原始commit用于调试
+        'raw_commits': [commit.to_dict() for commit in all_commits[:1000]]  # 只保存前1000个原始commit用于调试
     }
 
-def aggregate_commits_by_user(commits):
-    """按用户聚合commit数据"""
-    from collections import defaultdict
+def commit_since_iso():
+    """commit 统计窗口的起始时间（ISO 格式）"""
+    since_date = datetime.now() - timedelta(days=CONFIG['COMMIT_DAYS_RANGE'])
+    return since_date.isoformat() + 'Z'
 
-    user_stats = defaultdict(lambda: {
-        'total_commits': 0,
-        'repos': set(),
-        'daily_commits': defaultdict(int),
-        'hourly_distribution': defaultdict(int),
-        'commit_messages': [],
-        'first_commit_date': None,
-        'last_commit_date': None
-    })
+def parse_commit(commit, org_name, repo_name):
+    """把单个 commit 记录投影为 Commit，机器人账户的提交返回 None"""
+    commit_data = Commit.from_api(commit, org_name, repo_name)
 
-    for commit in commits:
-        # 确定用户标识（优先使用GitHub用户名，否则使用邮箱）
-        user_key = commit.get('github_username') or commit['author']['email']
+    # 检查是否为机器人账户的提交
+    if commit_data.github_username and is_bot_account(commit_data.github_username):
+        print(f"      🤖 跳过机器人提交: {commit_data.github_username}")
+        return None
 
-        if not user_key:
-            continue
+    # 检查并下载新发现贡献者的头像
+    if commit_data.github_username and commit_data.author_avatar_url:
+        ensure_avatar_exists(commit_data.github_username, commit_data.author_avatar_url)
 
-        stats = user_stats[user_key]
+    return commit_data
 
-        # 更新统计信息
-        stats['total_commits'] += 1
-        stats['repos'].add(commit['repo'])
-        stats['daily_commits'][commit['date_str']] += 1
-        stats['hourly_distribution'][commit['hour']] += 1
+GIT_LOG_RECORD = '\x1e'
+GIT_LOG_FIELD = '\x1f'
+GIT_NOREPLY_PATTERN = re.compile(r'^(?:\d+\+)?([A-Za-z0-9-]+(?:\[bot\])?)@users\.noreply\.github\.com$', re.IGNORECASE)
 
-        # 保存commit消息（最多保存10个）
-        if len(stats['commit_messages']) < 10:
-            stats['commit_messages'].append({
-                'message': commit['message'],
-                'repo': commit['repo'],
-                'date': commit['date_str'],
-                'url': commit['url']
+def run_git(*args, cwd=None):
+    """运行 git 命令，失败时抛出 subprocess.CalledProcessError"""
+    return subprocess.run(['git', *args], cwd=cwd, capture_output=True, check=True,
+                          env=dict(os.environ, GIT_TERMINAL_PROMPT='0')).stdout
+
+def read_git_log(mirror_path, since_iso, max_count):
+    """
+    解析镜像中统计窗口内的 git log --numstat（在工作进程中运行）
+    浅克隆边界上的 commit 缺少父提交，无法得到真实的增删行数，记为 0
+    """
+    output = run_git('-C', mirror_path, 'log', 'HEAD', f'--since={since_iso}', f'--max-count={max_count}',
+                     '--numstat', '--no-renames',
+                     f'--format={GIT_LOG_RECORD}%H{GIT_LOG_FIELD}%an{GIT_LOG_FIELD}%ae{GIT_LOG_FIELD}%at{GIT_LOG_FIELD}%s')
+    try:
+        with open(Path(mirror_path) / 'shallow', 'r') as f:
+            boundary = set(f.read().split())
+    except OSError:
+        boundary = set()
+
+    commits = []
+    for record in output.decode('utf-8', 'replace').split(GIT_LOG_RECORD)[1:]:
+        header, _, numstat = record.partition('\n')
+        sha, name, email, timestamp, message = header.split(GIT_LOG_FIELD, 4)
+        # numstat 每行为 新增\t删除\t路径（二进制文件为 -）
+        additions = deletions = 0
+        if sha not in boundary:
+            for line in numstat.splitlines():
+                parts = line.split('\t', 2)
+                if len(parts) == 3:
+                    additions += int(parts[0]) if parts[0].isdigit() else 0
+                    deletions += int(parts[1]) if parts[1].isdigit() else 0
+        commits.append({'sha': sha, 'name': name, 'email': email, 'timestamp': int(timestamp),
+                        'message': message.strip(), 'additions': additions, 'deletions': deletions})
+    return commits
+
+class GitMirrors:
+    """
+    本地 git 镜像 commit 来源（COMMIT_SOURCE=git）
+    每个仓库在 GIT_MIRROR_DIR 中保留一个按统计窗口截断的浅克隆（bare，只含默认分支），每次运行增量 fetch；
+    git log --numstat 在工作进程中并行解析，生成与 commits API 相同结构的记录并附带增删行数
+    """
+
+    VERSION = 1
+
+    def __init__(self, root, authors_path):
+        self.root = Path(root)
+        self.authors_path = Path(authors_path)
+        self.lock = threading.Lock()
+        self.prefetched = {}  # {(org, repo): 解析后的 git log 或 None}
+        self.authors = {}  # {邮箱: GitHub 用户名或 None}
+        self.dirty = False
+        self.stats = {'cloned': 0, 'fetched': 0, 'failed': 0, 'commits': 0, 'author_lookups': 0}
+        self.load()
+
+    def load(self):
+        """读取邮箱到用户名的映射缓存（格式不兼容或损坏时忽略）"""
+        try:
+            with open(self.authors_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                self.authors = data.get('authors', {})
+        except (OSError, ValueError):
+            self.authors = {}
+
+    def save(self):
+        """原子写入映射缓存（没有变化时跳过）"""
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {'version': self.VERSION, 'authors': self.authors}
+            with OutputGeneration() as generation:
+                json.dump(data, generation.open(self.authors_path), ensure_ascii=False)
+            self.dirty = False
+
+    def sync(self, org_name, repo_name, since_iso):
+        """克隆或增量更新仓库镜像，返回镜像路径，失败时返回 None"""
+        path = self.root / org_name / f"{repo_name}.git"
+        url = f"{CONFIG['GIT_REMOTE_BASE']}/{org_name}/{repo_name}.git"
+        since = f"--shallow-since={since_iso}"
+
+        if path.exists():
+            try:
+                head_ref = run_git('-C', str(path), 'symbolic-ref', 'HEAD').decode().strip()
+                try:
+                    run_git('-C', str(path), 'fetch', '--quiet', since, url, f'+{head_ref}:{head_ref}')
+                    self.deepen(path, url, head_ref)
+                except subprocess.CalledProcessError:
+                    # 窗口内没有提交时 --shallow-since 会失败，退回只取最新提交
+                    run_git('-C', str(path), 'fetch', '--quiet', '--depth=1', url, f'+{head_ref}:{head_ref}')
+                with self.lock:
+                    self.stats['fetched'] += 1
+                return path
+            except (subprocess.CalledProcessError, OSError):
+                # 默认分支改名、镜像损坏等：删除后重新克隆
+                shutil.rmtree(path, ignore_errors=True)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            try:
+                run_git('clone', '--quiet', '--bare', '--single-branch', since, url, str(path))
+                self.deepen(path, url, run_git('-C', str(path), 'symbolic-ref', 'HEAD').decode().strip())
+            except subprocess.CalledProcessError:
+                shutil.rmtree(path, ignore_errors=True)
+                run_git('clone', '--quiet', '--bare', '--single-branch', '--depth=1', url, str(path))
+        except (subprocess.CalledProcessError, OSError) as e:
+            shutil.rmtree(path, ignore_errors=True)
+            print(f"    ❌ 克隆镜像失败: {org_name}/{repo_name} ({getattr(e, 'stderr', b'') or e})")
+            with self.lock:
+                self.stats['failed'] += 1
+            return None
+        with self.lock:
+            self.stats['cloned'] += 1
+        return path
+
+    @staticmethod
+    def deepen(path, url, head_ref):
+        """--shallow-since 的边界落在窗口内最早的 commit 上，多取一层父提交以得到它真实的增删行数"""
+        run_git('-C', str(path), 'fetch', '--quiet', '--deepen=1', url, f'+{head_ref}:{head_ref}')
+
+    def prefetch(self, org_name, repo_names, since_iso):
+        """并发同步一批仓库的镜像，并在工作进程中并行解析 git log，供之后的 commits() 直接使用"""
+        if not repo_names:
+            return
+        print(f"🪞 同步 {org_name} 的 {len(repo_names)} 个 git 镜像（{CONFIG['GIT_WORKERS']} 个并发）...")
+        with ThreadPoolExecutor(max_workers=CONFIG['GIT_WORKERS']) as executor:
+            paths = dict(zip(repo_names, executor.map(lambda repo_name: self.sync(org_name, repo_name, since_iso), repo_names)))
+
+        logs = {repo_name: None for repo_name in repo_names}
+        with ProcessPoolExecutor(max_workers=CONFIG['GIT_WORKERS']) as pool:
+            futures = {repo_name: pool.submit(read_git_log, str(path), since_iso, CONFIG['MAX_COMMITS_PER_REPO'])
+                       for repo_name, path in paths.items() if path}
+            for repo_name, future in futures.items():
+                try:
+                    logs[repo_name] = future.result()
+                except Exception as e:
+                    # 工作进程不可用（如无法序列化）时在当前进程中解析
+                    try:
+                        logs[repo_name] = read_git_log(str(paths[repo_name]), since_iso, CONFIG['MAX_COMMITS_PER_REPO'])
+                    except (subprocess.CalledProcessError, OSError):
+                        print(f"    ⚠️  解析 git log 失败: {org_name}/{repo_name} ({e})")
+        with self.lock:
+            self.prefetched.update(((org_name, repo_name), log) for repo_name, log in logs.items())
+
+    def resolve_author(self, email, org_name, repo_name, sha, api_calls):
+        """邮箱对应的 GitHub 用户名：noreply 邮箱直接解析，其余通过该 commit 的 API 记录查询一次并缓存"""
+        match = GIT_NOREPLY_PATTERN.match(email or '')
+        if match:
+            return match.group(1)
+        with self.lock:
+            if email in self.authors or not CONFIG['GIT_RESOLVE_AUTHORS'] or not email:
+                return self.authors.get(email)
+
+        commit = fetch_api(f"{CONFIG['API_BASE']}/repos/{org_name}/{repo_name}/commits/{sha}")
+        api_calls['commit_authors'] = api_calls.get('commit_authors', 0) + 1
+        api_calls['total'] += 1
+        if commit is None:
+            return None  # 请求失败，下次运行再试
+        login = (commit.get('author') or {}).get('login')
+        with self.lock:
+            self.authors[email] = login
+            self.stats['author_lookups'] += 1
+            self.dirty = True
+        return login
+
+    def commits(self, org_name, repo_name, since_iso, api_calls):
+        """仓库统计窗口内的 commit（与 commits API 相同结构，附带 stats），失败时返回 None"""
+        with self.lock:
+            prefetched = (org_name, repo_name) in self.prefetched
+            log = self.prefetched.pop((org_name, repo_name), None)
+        if not prefetched:
+            path = self.sync(org_name, repo_name, since_iso)
+            if path is None:
+                return None
+            try:
+                log = read_git_log(str(path), since_iso, CONFIG['MAX_COMMITS_PER_REPO'])
+            except (subprocess.CalledProcessError, OSError) as e:
+                print(f"    ⚠️  解析 git log 失败: {org_name}/{repo_name} ({e})")
+        if log is None:
+            return None
+
+        commits = []
+        for entry in log:
+            login = self.resolve_author(entry['email'], org_name, repo_name, entry['sha'], api_calls)
+            commits.append({
+                'sha': entry['sha'],
+                'commit': {
+                    'message': entry['message'],
+                    'author': {
+                        'name': entry['name'],
+                        'email': entry['email'],
+                        'date': datetime.fromtimestamp(entry['timestamp'], timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+                    }
+                },
+                'author': {'login': login, 'avatar_url': f"https://github.com/{login}.png"} if login else None,
+                'html_url': f"https://github.com/{org_name}/{repo_name}/commit/{entry['sha']}",
+                'stats': {'additions': entry['additions'], 'deletions': entry['deletions']}
             })
+        with self.lock:
+            self.stats['commits'] += len(commits)
+        return commits
 
-        # 更新时间范围
-        commit_date = commit['date_parsed']
-        if not stats['first_commit_date'] or commit_date < stats['first_commit_date']:
-            stats['first_commit_date'] = commit_date
-        if not stats['last_commit_date'] or commit_date > stats['last_commit_date']:
-            stats['last_commit_date'] = commit_date
+GIT_MIRRORS = GitMirrors(CONFIG['GIT_MIRROR_DIR'], CONFIG['CACHE_DIR'] / 'git_authors.json')
 
-    # 转换为可序列化的格式
-    result = {}
-    for user_key, stats in user_stats.items():
-        result[user_key] = {
-            'total_commits': stats['total_commits'],
-            'repos': list(stats['repos']),
-            'repo_count': len(stats['repos']),
-            'daily_commits': dict(stats['daily_commits']),
-            'hourly_distribution': dict(stats['hourly_distribution']),
-            'commit_messages': stats['commit_messages'],
-            'first_commit_date': stats['first_commit_date'].isoformat() if stats['first_commit_date'] else None,
-            'last_commit_date': stats['last_commit_date'].isoformat() if stats['last_commit_date'] else None,
-            'active_days': len(stats['daily_commits']),
-            'avg_commits_per_day': stats['total_commits'] / max(len(stats['daily_commits']), 1)
-        }
+def prefetch_commits(org_name, repo_names, since_iso):
+    """git 镜像模式下，抓取一批仓库前先并行同步镜像和解析 commit"""
+    if CONFIG['COMMIT_SOURCE'] == 'git':
+        GIT_MIRRORS.prefetch(org_name, list(repo_names), since_iso)
 
-    return result
+class ContributorStats:
+    """
+    仓库贡献者增删行数（/stats/contributors）的异步预热队列
+    GitHub 收到请求后才开始计算，期间返回 202；运行开始时为所有仓库发出预热请求，
+    后台线程按退避间隔轮询未完成的仓库，抓取仓库的同时统计在服务端计算，不额外占用运行时间
+    结果按仓库 pushed_at 缓存，仓库没有新推送时不再请求
+    """
 
-def save_commits_data(commits_data):
-    """保存commit数据到JSON文件"""
-    try:
-        # 确保目录存在
-        CONFIG['COMMITS_FILE'].parent.mkdir(parents=True, exist_ok=True)
+    VERSION = 1
+    MAX_POLLS = 8  # 单个仓库最多轮询次数（退避间隔 2、4、8…秒，最长 60 秒）
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.condition = threading.Condition()
+        self.entries = {}  # {org/repo: {'pushed_at': str, 'authors': {用户名: {'additions', 'deletions', 'commits'}}}}
+        self.pending = {}  # {org/repo: {'pushed_at': str, 'attempt': int, 'due': 时间戳}}
+        self.thread = None
+        self.dirty = False
+        self.stats = {'hits': 0, 'fetched': 0, 'polls': 0, 'failed': 0, 'timeouts': 0}
+        self.load()
+
+    def load(self):
+        """读取统计缓存（格式不兼容或损坏时忽略）"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                self.entries = data.get('repos', {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        """原子写入统计缓存（没有变化时跳过）"""
+        with self.condition:
+            if not self.dirty:
+                return
+            data = {'version': self.VERSION, 'repos': self.entries}
+            with OutputGeneration() as generation:
+                json.dump(data, generation.open(self.path), ensure_ascii=False)
+            self.dirty = False
+
+    def warm(self, org_name, repos):
+        """
+        为一批仓库（Repo 记录，需要 name 和 pushed_at）发出预热请求，立即返回
+        缓存中 pushed_at 一致的仓库跳过；没有 pushed_at 的仓库（如监听模式中事件触发的）总是重新请求
+        """
+        if not CONFIG['CONTRIBUTOR_STATS']:
+            return
+        with self.condition:
+            for repo in repos:
+                key = f"{org_name}/{repo.name}"
+                entry = self.entries.get(key)
+                if entry and repo.pushed_at and entry['pushed_at'] == repo.pushed_at:
+                    self.stats['hits'] += 1
+                    continue
+                if key not in self.pending:
+                    self.pending[key] = {'pushed_at': repo.pushed_at, 'attempt': 0, 'due': 0.0}
+            if self.pending and self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='contributor-stats', daemon=True)
+                self.thread.start()
+
+    def run(self):
+        """后台线程：请求到期的仓库，202 的仓库按退避间隔重新排队，直到队列清空"""
+        with ThreadPoolExecutor(max_workers=max(1, CONFIG['CONTRIBUTOR_STATS_WORKERS'])) as executor:
+            while True:
+                with self.condition:
+                    if not self.pending:
+                        self.thread = None
+                        self.condition.notify_all()
+                        return
+                    now = time.time()
+                    due = [key for key, item in self.pending.items() if item['due'] <= now and not item.get('running')]
+                    for key in due:
+                        self.pending[key]['running'] = True
+                    next_due = min((item['due'] for item in self.pending.values() if not item.get('running')), default=now + 1)
+                if due:
+                    executor.map(self.poll, due)
+                else:
+                    with self.condition:
+                        self.condition.wait(min(max(next_due - time.time(), 0.05), 1.0))
+
+    def poll(self, key):
+        """请求一个仓库的统计：200 写入缓存，202 稍后重试，失败时放弃（本次运行按提交数处理）"""
+        try:
+            data, _ = fetch_api_response(f"{CONFIG['API_BASE']}/repos/{key}/stats/contributors")
+        except Exception as e:
+            print(f"    ⚠️  获取行数统计出错: {key} ({e})")
+            data = None
+        with self.condition:
+            item = self.pending[key]
+            item['running'] = False
+            self.stats['polls'] += 1
+            if isinstance(data, list):
+                # 提交数超过 10000 的仓库 GitHub 不返回增删行数（均为 0）
+                authors = {}
+                for author in data:
+                    login = (author.get('author') or {}).get('login')
+                    if login:
+                        authors[login] = {
+                            'additions': sum(week.get('a', 0) for week in author.get('weeks') or []),
+                            'deletions': sum(week.get('d', 0) for week in author.get('weeks') or []),
+                            'commits': author.get('total', 0)
+                        }
+                self.entries[key] = {'pushed_at': item['pushed_at'], 'authors': authors}
+                self.dirty = True
+                self.stats['fetched'] += 1
+                del self.pending[key]
+            elif data is not None and item['attempt'] + 1 < self.MAX_POLLS:
+                item['attempt'] += 1
+                item['due'] = time.time() + min(60.0, backoff_delay(item['attempt']))
+            else:
+                self.stats['failed' if data is None else 'timeouts'] += 1
+                del self.pending[key]
+            self.condition.notify_all()
+
+    def wait(self, timeout=None):
+        """等待队列中的仓库完成，最多 timeout 秒（默认 CONTRIBUTOR_STATS_MAX_WAIT），返回仍未完成的仓库数"""
+        timeout = CONFIG['CONTRIBUTOR_STATS_MAX_WAIT'] if timeout is None else timeout
+        deadline = time.time() + timeout
+        with self.condition:
+            if self.pending:
+                print(f"⏳ 等待 {len(self.pending)} 个仓库的行数统计（最多 {timeout:.0f} 秒）...")
+            while self.pending and time.time() < deadline:
+                self.condition.wait(deadline - time.time())
+            return len(self.pending)
+
+    def get(self, org_name, repo_name):
+        """仓库各贡献者的增删行数，没有统计时返回 None（未就绪时使用上次推送前的缓存）"""
+        with self.condition:
+            entry = self.entries.get(f"{org_name}/{repo_name}")
+            return entry['authors'] if entry else None
+
+CONTRIBUTOR_STATS = ContributorStats(CONFIG['CACHE_DIR'] / 'contributor_stats.json')
+
+def contributor_roster(contributors):
+    """仓库贡献者名单（过滤机器人后、按阈值筛选前），用于比较成员加入、离开，不受阈值和行数统计是否就绪的影响"""
+    return sorted(contributor.login for contributor in contributors)
+
+def qualify_contributors(org_name, repo_name, contributors):
+    """
+    按贡献阈值筛选仓库贡献者，并附上增删行数（有统计时）
+    设置了 MIN_CONTRIBUTION_LINES 且仓库有行数统计时按增删行数筛选，否则按提交数（MIN_CONTRIBUTIONS）筛选
+    """
+    authors = CONTRIBUTOR_STATS.get(org_name, repo_name)
+    qualified = []
+    for contributor in contributors:
+        lines = (authors or {}).get(contributor.login)
+        if lines:
+            contributor = contributor.replace(lines_added=lines['additions'], lines_deleted=lines['deletions'])
+        if CONFIG['MIN_CONTRIBUTION_LINES'] and authors is not None:
+            if not lines or lines['additions'] + lines['deletions'] < CONFIG['MIN_CONTRIBUTION_LINES']:
+                continue
+        elif contributor.contributions < CONFIG['MIN_CONTRIBUTIONS']:
+            continue
+        qualified.append(contributor)
+    return qualified
 
-        with open(CONFIG['COMMITS_FILE'], 'w', encoding='utf-8') as f:
-            json.dump(commits_data, f, ensure_ascii=False, indent=2)
+def crawl_repo(org_name, repo_name, since_iso, api_calls, include_commits=True):
+    """
+    抓取单个仓库的贡献者（已过滤机器人，贡献阈值由 qualify_contributors 在行数统计就绪后筛选）和统计窗口内的commit
+    返回 (Contributor 列表, Commit 列表, 贡献者列表是否完整)，请求失败的部分为 None
+    """
+    # 1. 获取仓库贡献者信息（并发分页，最多 MAX_CONTRIBUTORS_PER_REPO 人）
+    print(f"  👥 获取贡献者...")
+    contributors_url = f"{CONFIG['API_BASE']}/repos/{org_name}/{repo_name}/contributors"
+    per_page = min(100, CONFIG['MAX_CONTRIBUTORS_PER_REPO'])
+    listing = {}
+    contributors = fetch_all_pages(contributors_url, f"{org_name}/{repo_name} 贡献者", per_page=per_page,
+                                   max_items=CONFIG['MAX_CONTRIBUTORS_PER_REPO'],
+                                   key=lambda contributor: contributor.login, project=Contributor.from_dict,
+                                   listing=listing)
+    pages = max(1, math.ceil(len(contributors or ()) / per_page))
+    api_calls['contributors'] += pages
+    api_calls['total'] += pages
+
+    qualified = None
+    if contributors is not None:
+        qualified = []
+        print(f"    ✓ 找到 {len(contributors)} 个贡献者")
+        for contributor in contributors:
+            # 检查是否为机器人账户
+            if is_bot_account(contributor.login):
+                print(f"    🤖 跳过机器人账户: {contributor.login}")
+                continue
+            qualified.append(contributor)
 
-        print(f"💾 commit数据已保存到: {CONFIG['COMMITS_FILE']}")
-        return True
+    # 2. 获取commit数据（如果需要）
+    parsed_commits = None
+    if include_commits:
+        print(f"  📊 获取commit数据...")
+        if CONFIG['COMMIT_SOURCE'] == 'git':
+            commits = GIT_MIRRORS.commits(org_name, repo_name, since_iso, api_calls)
+        else:
+            commits_url = f"{CONFIG['API_BASE']}/repos/{org_name}/{repo_name}/commits"
+            commits_full_url = f"{commits_url}?since={since_iso}&per_page={CONFIG['MAX_COMMITS_PER_REPO']}"
+            commits, headers = fetch_api_response(commits_full_url)
+            if has_next_page(headers):
+                LISTING_STATS.truncate(f"{org_name}/{repo_name} commit", f"超出上限 {CONFIG['MAX_COMMITS_PER_REPO']} 个")
+            api_calls['commits'] += 1
+            api_calls['total'] += 1
 
-    except Exception as e:
-        print(f"❌ 保存commit数据失败: {e}")
-        return False
+        if commits is not None:
+            parsed_commits = []
+            print(f"    ✓ 找到 {len(commits)} 个commit")
+            for commit in commits:
+                try:
+                    commit_data = parse_commit(commit, org_name, repo_name)
+                    if commit_data:
+                        parsed_commits.append(commit_data)
+                except Exception as e:
+                    print(f"      ⚠️  处理commit数据时出错: {e}")
+                    continue
+
+    return qualified, parsed_commits, listing.get('complete', False)
+
+def add_repo_contributors(contributors_data, repo_name, contributors):
+    """把一个仓库的贡献者累加到 contributors_data"""
+    for contributor in contributors:
+        username = contributor.login
+        if username not in contributors_data:
+            contributors_data[username] = {
+                'user_info': contributor,
+                'repos': [],
+                'total_contributions': 0
+            }
 
-def collect_unified_data(org_name, include_commits=False):
+        contributors_data[username]['repos'].append(repo_name)
+        contributors_data[username]['total_contributions'] += contributor.contributions
+
+class RepoCrawlCache:
+    """
+    各仓库上次成功抓取的结果（过滤机器人后、按阈值筛选前的贡献者，和统计窗口内的 commit），跨运行持久化到 CACHE_DIR
+    用于排列抓取顺序（最需要更新的仓库在前）；截止时间模式下未抓取到的仓库沿用这里的结果
+    """
+
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.entries = {}  # {org/repo: {'fetched_at', 'pushed_at', 'contributors': [...], 'commits': [...]}}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        """读取抓取结果缓存（格式不兼容或损坏时忽略）"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                self.entries = data.get('repos', {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        """原子写入抓取结果缓存（没有变化时跳过）"""
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {'version': self.VERSION, 'repos': self.entries}
+            with OutputGeneration() as generation:
+                json.dump(data, generation.open(self.path), ensure_ascii=False, separators=(',', ':'))
+            self.dirty = False
+
+    def plan(self, org_name, repos):
+        """
+        排列抓取顺序：从未抓取过的仓库最先，其次是上次抓取后有新推送的（最近推送的在前），其余按上次抓取时间从早到晚
+        同时清除已不在仓库列表中的仓库
+        """
+        def priority(repo):
+            entry = self.entries.get(f"{org_name}/{repo.name}")
+            if not entry:
+                return (0, 0.0)
+            if repo.pushed_at and repo.pushed_at != entry.get('pushed_at'):
+                pushed = datetime.fromisoformat(repo.pushed_at.replace('Z', '+00:00')).timestamp()
+                return (1, -pushed)
+            return (2, entry.get('fetched_at', 0))
+
+        with self.lock:
+            listed = {f"{org_name}/{repo.name}" for repo in repos}
+            for key in [key for key in self.entries if key.startswith(f"{org_name}/") and key not in listed]:
+                del self.entries[key]
+                self.dirty = True
+            return sorted(repos, key=priority)
+
+    def get(self, org_name, repo_name):
+        """上次的抓取结果，返回 (Contributor 列表, 统计窗口内的 Commit 列表, 抓取时间)，没有时返回 None"""
+        with self.lock:
+            entry = self.entries.get(f"{org_name}/{repo_name}")
+        if not entry:
+            return None
+        cutoff = datetime.fromisoformat(commit_since_iso().replace('Z', '+00:00'))
+        commits = [commit for commit in map(Commit.from_dict, entry['commits']) if commit.date_parsed >= cutoff]
+        fetched_at = search_timestamp(datetime.fromtimestamp(entry['fetched_at'], timezone.utc))
+        return [Contributor.from_dict(contributor) for contributor in entry['contributors']], commits, fetched_at
+
+    def put(self, org_name, repo, contributors, commits):
+        """记录成功获取贡献者的仓库（commit 获取失败时保留上次的 commit）"""
+        if contributors is None:
+            return
+        key = f"{org_name}/{repo.name}"
+        with self.lock:
+            previous = self.entries.get(key) or {}
+            self.entries[key] = {
+                'fetched_at': time.time(),
+                'pushed_at': repo.pushed_at,
+                'contributors': [contributor.to_dict() for contributor in contributors],
+                'commits': [commit.to_dict() for commit in commits] if commits is not None else previous.get('commits', [])
+            }
+            self.dirty = True
+
+REPO_CRAWL_CACHE = RepoCrawlCache(CONFIG['CACHE_DIR'] / 'repo_crawl.json')
+
+def collect_unified_data(org_name, include_commits=False, repo_state=None):
     """
     优化的统一数据收集函数
     在单次遍历中同时收集成员信息和commit数据
+    传入 repo_state 时按仓库记录抓取结果，供监听模式增量更新
+    截止时间模式下按 REPO_CRAWL_CACHE 排出的顺序抓取，到时未抓取的仓库沿用上次的结果
     """
     print(f"🚀 开始统一数据收集 (包含commit: {include_commits})...")
 
@@ -908,119 +4537,26 @@ def collect_unified_data(org_name, include_commits=False):
     processed_repos = 0
 
     # 计算时间范围（用于commit过滤）
+    since_iso = commit_since_iso() if include_commits else None
     if include_commits:
-        since_date = datetime.now() - timedelta(days=CONFIG['COMMIT_DAYS_RANGE'])
-        since_iso = since_date.isoformat() + 'Z'
-
-    # 单次遍历所有仓库，同时收集贡献者和commit数据
-    for repo in repos:
-        repo_name = repo['name']
+        prefetch_commits(org_name, [repo.name for repo in repos], since_iso)
+    # 行数统计在服务端计算，与下面的抓取同时进行
+    CONTRIBUTOR_STATS.warm(org_name, repos)
+
+    # 单次遍历所有仓库，同时收集贡献者和commit数据（最需要更新的仓库先抓取，结果仍按仓库列表顺序汇总）
+    crawled = {}  # {仓库名: (贡献者, commit, 新鲜度, 沿用结果的抓取时间, 贡献者列表是否完整)}
+    deferred = []
+    for repo in REPO_CRAWL_CACHE.plan(org_name, repos):
+        repo_name = repo.name
+        if not DEADLINE.allows(CONFIG['DEADLINE_CRAWL_SHARE']):
+            deferred.append(repo)
+            continue
         print(f"\n📦 处理仓库: {repo_name} ({processed_repos + 1}/{len(repos)})")
 
         try:
-            # 1. 获取仓库贡献者信息
-            print(f"  👥 获取贡献者...")
-            contributors_url = f"{CONFIG['API_BASE']}/repos/{org_name}/{repo_name}/contributors"
-            contributors_params = {'per_page': CONFIG['MAX_CONTRIBUTORS_PER_REPO']}
-
-            contributors_full_url = f"{contributors_url}?per_page={contributors_params['per_page']}"
-            contributors = fetch_api(contributors_full_url)
-            api_calls['contributors'] += 1
-            api_calls['total'] += 1
-
-            if contributors:
-                print(f"    ✓ 找到 {len(contributors)} 个贡献者")
-
-                # 处理贡献者数据
-                for contributor in contributors:
-                    if contributor['contributions'] >= CONFIG['MIN_CONTRIBUTIONS']:
-                        username = contributor['login']
-
-                        # 检查是否为机器人账户
-                        if is_bot_account(username):
-                            print(f"    🤖 跳过机器人账户: {username}")
-                            continue
-
-                        if username not in contributors_data:
-                            contributors_data[username] = {
-                                'user_info': contributor,
-                                'repos': [],
-                                'total_contributions': 0
-                            }
-
-                        contributors_data[username]['repos'].append(repo_name)
-                        contributors_data[username]['total_contributions'] += contributor['contributions']
-
-            # 2. 获取commit数据（如果需要）
-            if include_commits:
-                print(f"  📊 获取commit数据...")
-                commits_url = f"{CONFIG['API_BASE']}/repos/{org_name}/{repo_name}/commits"
-                commits_params = {
-                    'since': since_iso,
-                    'per_page': CONFIG['MAX_COMMITS_PER_REPO']
-                }
-
-                commits_full_url = f"{commits_url}?since={commits_params['since']}&per_page={commits_params['per_page']}"
-                commits = fetch_api(commits_full_url)
-                api_calls['commits'] += 1
-                api_calls['total'] += 1
-
-                if commits:
-                    print(f"    ✓ 找到 {len(commits)} 个commit")
-
-                    # 处理commit数据
-                    for commit in commits:
-                        try:
-                            commit_data = {
-                                'sha': commit['sha'][:8],
-                                'message': commit['commit']['message'].split('\n')[0][:100],
-                                'author': {
-                                    'name': commit['commit']['author']['name'],
-                                    'email': commit['commit']['author']['email'],
-                                    'date': commit['commit']['author']['date']
-                                },
-                                'repo': repo_name,
-                                'url': commit['html_url']
-                            }
-
-                            # 尝试获取GitHub用户名
-                            if commit.get('author') and commit['author']:
-                                commit_data['github_username'] = commit['author']['login']
-                                # 获取头像URL用于后续下载
-                                commit_data['author_avatar_url'] = commit['author'].get('avatar_url')
-                            else:
-                                commit_data['github_username'] = None
-                                commit_data['author_avatar_url'] = None
-
-                            # 检查是否为机器人账户的提交
-                            if commit_data['github_username'] and is_bot_account(commit_data['github_username']):
-                                print(f"      🤖 跳过机器人提交: {commit_data['github_username']}")
-                                continue
-
-                            # 检查并下载新发现贡献者的头像
-                            if commit_data['github_username'] and commit_data['author_avatar_url']:
-                                ensure_avatar_exists(commit_data['github_username'], commit_data['author_avatar_url'])
-
-                            # 解析日期
-                            commit_date = datetime.fromisoformat(commit_data['author']['date'].replace('Z', '+00:00'))
-                            commit_data['date_parsed'] = commit_date
-                            commit_data['date_str'] = commit_date.strftime('%Y-%m-%d')
-                            commit_data['hour'] = commit_date.hour
-
-                            # 转换为北京时间（UTC+8）
-                            beijing_time = commit_date + timedelta(hours=8)
-                            commit_data['beijing_hour'] = beijing_time.hour
-                            commit_data['beijing_time'] = beijing_time.isoformat()
-
-                            # 判断是否为深夜时段（北京时间22:00-06:00）
-                            is_night_owl = beijing_time.hour >= 22 or beijing_time.hour < 6
-                            commit_data['is_night_owl'] = is_night_owl
-
-                            all_commits.append(commit_data)
-
-                        except Exception as e:
-                            print(f"      ⚠️  处理commit数据时出错: {e}")
-                            continue
+            contributors, commits, complete = crawl_repo(org_name, repo_name, since_iso, api_calls, include_commits)
+            crawled[repo_name] = (contributors, commits or [], 'fresh', None, complete)
+            REPO_CRAWL_CACHE.put(org_name, repo, contributors, commits)
 
             processed_repos += 1
 
@@ -1031,8 +4567,38 @@ def collect_unified_data(org_name, include_commits=False):
 
         except Exception as e:
             print(f"  ❌ 处理仓库 {repo_name} 时出错: {e}")
+            crawled[repo_name] = (None, [], 'fresh', None, False)
             continue
 
+    if deferred:
+        print(f"\n⏰ 临近截止时间，{len(deferred)} 个仓库未抓取，沿用上次的抓取结果")
+        for repo in deferred:
+            previous = REPO_CRAWL_CACHE.get(org_name, repo.name)
+            if previous:
+                contributors, commits, fetched_at = previous
+                crawled[repo.name] = (contributors, commits, 'stale', fetched_at, False)
+                DEADLINE.record('stale_repos')
+            else:
+                crawled[repo.name] = (None, [], 'missing', None, False)
+                DEADLINE.record('missing_repos')
+
+    # 所有仓库抓取完后再按贡献阈值筛选（此时行数统计大多已就绪）
+    CONTRIBUTOR_STATS.wait(DEADLINE.remaining(CONFIG['DEADLINE_CRAWL_SHARE']))
+    for repo in repos:
+        contributors, commits, freshness, as_of, complete = crawled[repo.name]
+        qualified = qualify_contributors(org_name, repo.name, contributors or [])
+        add_repo_contributors(contributors_data, repo.name, qualified)
+        all_commits.extend(commits)
+        if repo_state is not None:
+            repo_state[repo.name] = {'contributors': qualified, 'commits': commits, 'meta': repo,
+                                     'roster': contributor_roster(contributors or []), 'roster_complete': complete}
+            if contributors is None or freshness != 'fresh':
+                # 贡献者列表获取失败或沿用上次的结果，不参与成员加入、离开的判断
+                repo_state[repo.name]['contributors_fetched'] = False
+            if freshness != 'fresh':
+                repo_state[repo.name]['freshness'] = freshness
+                repo_state[repo.name]['as_of'] = as_of
+
     # 统计结果
     elapsed_time = time.time() - start_time
     print(f"\n📊 数据收集完成:")
@@ -1045,6 +4611,23 @@ def collect_unified_data(org_name, include_commits=False):
 
     return contributors_data, all_commits if include_commits else None, api_calls
 
+def commit_username(commit):
+    """commit 对应的用户名（没有 GitHub 用户名时从 email 推断），无法识别或为机器人账户时返回 None"""
+    # 尝试获取GitHub用户名
+    username = commit.github_username
+    if not username:
+        # 如果没有GitHub用户名，尝试从email推断
+        email = commit.author_email
+        if email and '@' in email:
+            username = email.split('@')[0]
+        else:
+            return None
+
+    # 双重检查：确保不是机器人账户
+    if is_bot_account(username):
+        return None
+    return username
+
 def aggregate_commits_by_user(all_commits):
     """聚合commit数据按用户分组"""
 
@@ -1057,67 +4640,66 @@ def aggregate_commits_by_user(all_commits):
         'night_owl_commits': 0,
         'commit_messages': [],
         'first_commit_date': None,
-        'last_commit_date': None
+        'last_commit_date': None,
+        'lines_added': None,
+        'lines_deleted': None
     })
 
     for commit in all_commits:
-        # 尝试获取GitHub用户名
-        username = commit.get('github_username')
+        username = commit_username(commit)
         if not username:
-            # 如果没有GitHub用户名，尝试从email推断
-            email = commit['author']['email']
-            if email and '@' in email:
-                username = email.split('@')[0]
-            else:
-                continue  # 跳过无法识别用户的commit
-
-        # 双重检查：确保不是机器人账户
-        if is_bot_account(username):
-            continue  # 跳过机器人账户的commit
+            continue  # 跳过无法识别用户或机器人账户的commit
 
         stats = user_stats[username]
 
         # 更新统计
+        beijing_hour = commit.beijing_hour
+        is_night_owl = commit.is_night_owl
         stats['total_commits'] += 1
-        stats['repos'].add(commit['repo'])
-        stats['daily_commits'][commit['date_str']] += 1
-        stats['hourly_distribution'][commit['hour']] += 1
-        stats['beijing_hourly_distribution'][commit['beijing_hour']] += 1
+        stats['repos'].add(commit.repo)
+        stats['daily_commits'][commit.date_str] += 1
+        stats['hourly_distribution'][commit.hour] += 1
+        stats['beijing_hourly_distribution'][beijing_hour] += 1
 
         # 统计深夜提交
-        if commit.get('is_night_owl', False):
+        if is_night_owl:
             stats['night_owl_commits'] += 1
 
+        # 增删行数（只有 git 镜像来源的 commit 带有）
+        if commit.lines_added is not None:
+            stats['lines_added'] = (stats['lines_added'] or 0) + commit.lines_added
+            stats['lines_deleted'] = (stats['lines_deleted'] or 0) + commit.lines_deleted
+
         # 保存commit消息（最多10个）
         if len(stats['commit_messages']) < 10:
             stats['commit_messages'].append({
-                'message': commit['message'],
-                'repo': commit['repo'],
-                'date': commit['date_str'],
-                'time': commit.get('beijing_time', ''),
-                'beijing_hour': commit.get('beijing_hour', 0),
-                'is_night_owl': commit.get('is_night_owl', False),
-                'url': commit['url']
+                'message': commit.message,
+                'repo': commit.repo,
+                'date': commit.date_str,
+                'time': commit.beijing_time,
+                'beijing_hour': beijing_hour,
+                'is_night_owl': is_night_owl,
+                'url': commit.url
             })
 
         # 更新时间范围
-        commit_date = commit['date_parsed']
+        commit_date = commit.date_parsed
         if not stats['first_commit_date'] or commit_date < stats['first_commit_date']:
             stats['first_commit_date'] = commit_date
         if not stats['last_commit_date'] or commit_date > stats['last_commit_date']:
             stats['last_commit_date'] = commit_date
 
-    # 转换为可序列化格式
+    # 转换为可序列化格式（键和列表按固定顺序输出，保证相同数据生成相同文件）
     result = {}
-    for username, stats in user_stats.items():
+    for username, stats in sorted(user_stats.items()):
         if stats['total_commits'] >= 1:  # 至少1个commit
             result[username] = {
                 'total_commits': stats['total_commits'],
-                'repos': list(stats['repos']),
+                'repos': sorted(stats['repos']),
                 'repo_count': len(stats['repos']),
-                'daily_commits': dict(stats['daily_commits']),
-                'hourly_distribution': dict(stats['hourly_distribution']),
-                'beijing_hourly_distribution': dict(stats['beijing_hourly_distribution']),
+                'daily_commits': dict(sorted(stats['daily_commits'].items())),
+                'hourly_distribution': dict(sorted(stats['hourly_distribution'].items())),
+                'beijing_hourly_distribution': dict(sorted(stats['beijing_hourly_distribution'].items())),
                 'night_owl_commits': stats['night_owl_commits'],
                 'night_owl_percentage': round((stats['night_owl_commits'] / stats['total_commits']) * 100, 1) if stats['total_commits'] > 0 else 0,
                 'commit_messages': stats['commit_messages'],
@@ -1126,21 +4708,24 @@ def aggregate_commits_by_user(all_commits):
                 'active_days': len(stats['daily_commits']),
                 'avg_commits_per_day': stats['total_commits'] / max(len(stats['daily_commits']), 1)
             }
+            if stats['lines_added'] is not None:
+                result[username]['lines_added'] = stats['lines_added']
+                result[username]['lines_deleted'] = stats['lines_deleted']
 
     return result
 
-def save_commits_data(commits_data):
-    """保存commit数据到文件"""
+def save_commits_data(commits_data, output_file=None, generation=None):
+    """保存commit数据到文件（传入 generation 时随同一代数据一起原子发布）"""
+    output_file = output_file or CONFIG['COMMITS_FILE']
     try:
-        # 确保目录存在
-        CONFIG['COMMITS_FILE'].parent.mkdir(parents=True, exist_ok=True)
-
-        # 直接保存到前端目录
-        with open(CONFIG['COMMITS_FILE'], 'w', encoding='utf-8') as f:
-            json.dump(commits_data, f, ensure_ascii=False, indent=2)
+        if generation is None:
+            with OutputGeneration() as own_generation:
+                json.dump(commits_data, own_generation.open(output_file), ensure_ascii=False, indent=2)
+        else:
+            json.dump(commits_data, generation.open(output_file), ensure_ascii=False, indent=2)
 
         print(f"💾 Commit数据已保存:")
-        print(f"  - 文件路径: {CONFIG['COMMITS_FILE']}")
+        print(f"  - 文件路径: {output_file}")
         print(f"  - 活跃用户: {commits_data.get('user_commits', {}) and len(commits_data['user_commits'])} 人")
         print(f"  - 总commit数: {commits_data.get('total_commits', 0)}")
 
@@ -1148,6 +4733,9 @@ def save_commits_data(commits_data):
 
     except Exception as e:
         print(f"❌ 保存commit数据失败: {e}")
+        if generation is not None:
+            # 交给外层放弃整代输出，避免发布不完整的 JSON
+            raise
         return False
 
 
@@ -1232,8 +4820,31 @@ if __name__ == '__main__':
     if len(sys.argv) > 1:
         if sys.argv[1] == '--test':
             test()
+        elif sys.argv[1] == '--watch':
+            watch()
+        elif sys.argv[1] == '--deadline':
+            try:
+                DEADLINE.set(parse_duration(sys.argv[2] if len(sys.argv) > 2 else ''))
+            except ValueError as e:
+                print(f"❌ {e}")
+                sys.exit(1)
+            main()
+        elif sys.argv[1] in PIPELINE_STAGES or sys.argv[1] == 'merge-shards':
+            args = sys.argv[2:]
+            shard = None
+            if '--shard' in args:
+                if sys.argv[1] != 'crawl':
+                    print("❌ --shard 只能用于 crawl 阶段")
+                    sys.exit(1)
+                try:
+                    shard = parse_shard(args[args.index('--shard') + 1] if args.index('--shard') + 1 < len(args) else '')
+                except ValueError as e:
+                    print(f"❌ {e}")
+                    sys.exit(1)
+            run_pipeline(sys.argv[1], force='--force' in args, shard=shard)
         else:
-            print("❌ 未知参数。支持的参数：--test")
+            print(f"❌ 未知参数。支持的参数：--test, --watch, --deadline <时长>, {', '.join(PIPELINE_STAGES)} [--force], "
+                  f"crawl --shard i/N, merge-shards")
             print("💡 提示：脚本现在默认收集commit数据，无需 --with-commits 参数")
             sys.exit(1)
     else:
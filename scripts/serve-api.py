@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+成员数据查询服务
+基于 fetch-members.py 的输出（members.csv、commits_weekly.json）提供只读 HTTP 查询接口，
+支持按方向、仓库、地区和活跃时间筛选，按任意指标排序，游标分页和字段投影
+"""
+
+import os
+import csv
+import json
+import base64
+import bisect
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs, unquote
+
+# 加载环境变量
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    # python-dotenv 不是必需的，如果没有安装就忽略
+    pass
+
+DATA_DIR = Path(os.getenv('API_DATA_DIR') or Path(__file__).parent.parent / 'docs' / 'public' / 'data')
+
+# 配置
+CONFIG = {
+    'HOST': os.getenv('API_HOST', '127.0.0.1'),
+    'PORT': int(os.getenv('API_PORT', '8787')),
+    'MEMBERS_FILE': DATA_DIR / 'members.csv',
+    'COMMITS_FILE': DATA_DIR / 'commits_weekly.json',
+    'MANIFEST_FILE': DATA_DIR / 'manifest.json',
+    'CACHE_SIZE': int(os.getenv('API_CACHE_SIZE', '256')),  # 查询结果 LRU 缓存条数
+    'DEFAULT_LIMIT': 50,  # 默认每页条数
+    'MAX_LIMIT': int(os.getenv('API_MAX_LIMIT', '500')),  # 每页最大条数
+}
+
+# 成员记录中的数值指标（CSV 字段和 commit 统计），可用于排序
+NUMERIC_FIELDS = ('public_repos', 'total_stars', 'followers', 'following', 'repo_count',
+                  'total_commits', 'active_days', 'night_owl_commits', 'lines_added', 'lines_deleted')
+# 列表字段：CSV 中以分号分隔
+LIST_FIELDS = ('domain', 'repositories')
+COMMIT_FIELDS = ('total_commits', 'active_days', 'night_owl_commits', 'first_commit_date', 'last_commit_date',
+                 'lines_added', 'lines_deleted')
+LOCATION_SEPARATORS = str.maketrans({',': ' ', '，': ' ', '/': ' ', '·': ' ', '-': ' '})
+
+class QueryError(ValueError):
+    """查询参数错误（返回 400）"""
+
+def location_tokens(location):
+    """地区文本拆分为小写词（"Beijing, China" -> beijing, china）"""
+    return set((location or '').lower().translate(LOCATION_SEPARATORS).split())
+
+def encode_cursor(version, sort, rank):
+    """游标：数据版本、排序方式和下一条记录在排序结果中的位置（不透明的 base64 字符串）"""
+    raw = json.dumps([version, sort, rank], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """解析游标，位置为负数时视为无效（超出结果范围由调用方按排序结果长度检查）"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        version, sort, rank = json.loads(raw)
+        rank = int(rank)
+    except (ValueError, TypeError):
+        raise QueryError('无效的 cursor')
+    if rank < 0:
+        raise QueryError('无效的 cursor')
+    return version, sort, rank
+
+class Snapshot:
+    """
+    某一版数据文件对应的成员数据和索引，建立后不再修改（排序结果首次使用时计算并缓存）
+    每个请求开始时取一次 DATASET.snapshot，整个请求都使用同一份快照，不受并发重新加载的影响
+    """
+
+    def __init__(self, records=(), active_dates=(), indexes=None, version=None, generated_at=None):
+        self.records = list(records)
+        self.active_dates = list(active_dates)  # 与 records 对应：有 commit 的日期（升序）
+        self.by_id = {record['id'].lower(): position for position, record in enumerate(self.records)}
+        self.indexes = indexes or {'domain': {}, 'repo': {}, 'location': {}}  # {'domain'|'repo'|'location': {值: 位置集合}}
+        self.version = version
+        self.generated_at = generated_at
+        self.orders = {}  # {(字段, 是否降序): [位置]}
+        self.orders_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, signature):
+        """读取数据文件并建立索引，返回新的快照"""
+        with open(CONFIG['MEMBERS_FILE'], 'r', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        try:
+            with open(CONFIG['COMMITS_FILE'], 'r', encoding='utf-8') as f:
+                user_commits = json.load(f).get('user_commits', {})
+        except (OSError, ValueError):
+            user_commits = {}
+        try:
+            with open(CONFIG['MANIFEST_FILE'], 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+
+        records, active_dates = [], []
+        indexes = {'domain': {}, 'repo': {}, 'location': {}}
+        for position, row in enumerate(rows):
+            record = dict(row)
+            for field in LIST_FIELDS:
+                record[field] = [value for value in (row.get(field) or '').split(';') if value]
+            for field in ('public_repos', 'total_stars', 'followers', 'following'):
+                try:
+                    record[field] = int(row.get(field) or 0)
+                except ValueError:
+                    record[field] = 0
+            record['repo_count'] = len(record['repositories'])
+
+            commits = user_commits.get(row['id'], {})
+            for field in COMMIT_FIELDS:
+                record[field] = commits.get(field, 0 if field in NUMERIC_FIELDS else None)
+            records.append(record)
+            active_dates.append(sorted(commits.get('daily_commits', {})))
+
+            for domain in record['domain']:
+                indexes['domain'].setdefault(domain.lower(), set()).add(position)
+            for repo in record['repositories']:
+                # 多组织模式下仓库名为 org/repo，同时按短名称索引
+                for name in {repo.lower(), repo.rsplit('/', 1)[-1].lower()}:
+                    indexes['repo'].setdefault(name, set()).add(position)
+            for token in location_tokens(record.get('location')):
+                indexes['location'].setdefault(token, set()).add(position)
+
+        version = manifest.get('content_hash') or hashlib.sha256(repr(signature).encode()).hexdigest()
+        snapshot = cls(records, active_dates, indexes, version, manifest.get('generated_at'))
+        print(f"📦 已加载 {len(records)} 个成员（数据版本 {version[:12]}）")
+        return snapshot
+
+    def order(self, field, descending):
+        """按字段排序后的位置列表（空值排在最后，同值按 id 排序），首次使用时计算并缓存"""
+        key = (field, descending)
+        with self.orders_lock:
+            if key not in self.orders:
+                present = [p for p, record in enumerate(self.records) if record.get(field) not in (None, '')]
+                missing = [p for p, record in enumerate(self.records) if record.get(field) in (None, '')]
+                present.sort(key=lambda p: self.records[p]['id'].lower())
+                present.sort(key=lambda p: self.records[p][field], reverse=descending)
+                missing.sort(key=lambda p: self.records[p]['id'].lower())
+                self.orders[key] = present + missing
+            return self.orders[key]
+
+    def candidates(self, filters):
+        """按筛选条件求出匹配的位置集合（同一字段多个值取并集，不同字段取交集），无筛选时返回 None"""
+        result = None
+        for name, values in filters.items():
+            if name == 'location':
+                # 地区按词匹配："beijing china" 需要两个词都出现
+                matched = set()
+                for value in values:
+                    tokens = location_tokens(value)
+                    sets = [self.indexes['location'].get(token, set()) for token in tokens]
+                    matched |= set.intersection(*sets) if sets else set()
+            else:
+                matched = set()
+                for value in values:
+                    matched |= self.indexes[name].get(value.lower(), set())
+            result = matched if result is None else result & matched
+        return result
+
+    def active_in(self, position, since, until):
+        """成员在 [since, until] 内是否有 commit（日期为 YYYY-MM-DD 字符串）"""
+        dates = self.active_dates[position]
+        index = bisect.bisect_left(dates, since or '')
+        return index < len(dates) and (until is None or dates[index] <= until)
+
+class Dataset:
+    """
+    当前使用的数据快照
+    数据文件变化时（按文件修改时间判断）建立新快照后整体替换 snapshot 引用（请求读取时不加锁），数据版本取 manifest.json 的内容哈希
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()  # 只用于避免多个请求同时重新加载
+        self.signature = None
+        self.snapshot = Snapshot()
+
+    def file_signature(self):
+        signature = []
+        for path in (CONFIG['MEMBERS_FILE'], CONFIG['COMMITS_FILE'], CONFIG['MANIFEST_FILE']):
+            try:
+                stat = path.stat()
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def refresh(self):
+        """数据文件变化时重新加载，返回是否重新加载"""
+        signature = self.file_signature()
+        if signature == self.signature:
+            return False
+        with self.lock:
+            if signature != self.signature:
+                self.snapshot = Snapshot.load(signature)
+                self.signature = signature
+                return True
+        return False
+
+class LRUCache:
+    """查询结果的 LRU 缓存（键包含数据版本，数据更新后旧结果自然失效）"""
+
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return self.entries[key]
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+DATASET = Dataset()
+RESULT_CACHE = LRUCache(CONFIG['CACHE_SIZE'])
+
+def parse_list(params, name):
+    """逗号分隔或重复出现的参数值"""
+    return [value.strip() for raw in params.get(name, []) for value in raw.split(',') if value.strip()]
+
+def parse_date(params, name):
+    value = (params.get(name) or [None])[-1]
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise QueryError(f'{name} 应为 YYYY-MM-DD 格式')
+
+def project(record, fields):
+    """字段投影"""
+    if not fields:
+        return record
+    return {field: record.get(field) for field in fields}
+
+def query_members(snapshot, params):
+    """
+    成员列表查询
+    筛选：domain、repo、location（逗号分隔多个值）、active_since / active_until（有 commit 的日期范围）
+    排序：sort=字段（前缀 - 表示降序），分页：limit、cursor，投影：fields
+    """
+    records = snapshot.records
+    filters = {name: parse_list(params, name) for name in ('domain', 'repo', 'location') if parse_list(params, name)}
+    since, until = parse_date(params, 'active_since'), parse_date(params, 'active_until')
+
+    sort = (params.get('sort') or ['id'])[-1]
+    field, descending = sort.lstrip('-'), sort.startswith('-')
+    if records and field not in records[0]:
+        raise QueryError(f'不支持按 {field} 排序')
+
+    fields = parse_list(params, 'fields')
+    unknown = [name for name in fields if records and name not in records[0]]
+    if unknown:
+        raise QueryError(f"未知字段: {', '.join(unknown)}")
+
+    try:
+        limit = int((params.get('limit') or [CONFIG['DEFAULT_LIMIT']])[-1])
+    except ValueError:
+        raise QueryError('limit 应为整数')
+    limit = max(1, min(limit, CONFIG['MAX_LIMIT']))
+
+    start = 0
+    if params.get('cursor'):
+        version, cursor_sort, start = decode_cursor(params['cursor'][-1])
+        if version != snapshot.version or cursor_sort != sort:
+            raise QueryError('cursor 已失效（数据已更新或排序方式不同），请从第一页重新查询')
+
+    candidates = snapshot.candidates(filters)
+    if since or until:
+        pool = candidates if candidates is not None else range(len(records))
+        candidates = {position for position in pool if snapshot.active_in(position, since, until)}
+
+    order = snapshot.order(field, descending)
+    if start and start >= len(order):
+        raise QueryError('无效的 cursor')
+    items, next_rank = [], None
+    for rank in range(start, len(order)):
+        position = order[rank]
+        if candidates is not None and position not in candidates:
+            continue
+        if len(items) == limit:
+            next_rank = rank
+            break
+        items.append(project(records[position], fields))
+
+    return {
+        'version': snapshot.version,
+        'total': len(candidates) if candidates is not None else len(records),
+        'count': len(items),
+        'next_cursor': encode_cursor(snapshot.version, sort, next_rank) if next_rank is not None else None,
+        'items': items
+    }
+
+def get_member(snapshot, member_id, params):
+    """单个成员"""
+    position = snapshot.by_id.get(member_id.lower())
+    if position is None:
+        return None
+    fields = parse_list(params, 'fields')
+    return project(snapshot.records[position], fields)
+
+def dataset_meta(snapshot):
+    """数据集信息：版本、成员数、可用字段和各筛选维度的取值数量"""
+    records = snapshot.records
+    return {
+        'version': snapshot.version,
+        'generated_at': snapshot.generated_at,
+        'members': len(records),
+        'fields': list(records[0]) if records else [],
+        'metrics': list(NUMERIC_FIELDS),
+        'filters': {name: len(values) for name, values in snapshot.indexes.items()},
+        'domains': {name: len(positions) for name, positions in sorted(snapshot.indexes['domain'].items())},
+        'cache': dict(RESULT_CACHE.stats, size=len(RESULT_CACHE.entries))
+    }
+
+class APIHandler(BaseHTTPRequestHandler):
+    """GET /members、/members/{id}、/meta"""
+
+    server_version = 'MembersAPI/1.0'
+
+    def log_message(self, format, *args):
+        print(f"🌐 {self.address_string()} {format % args}")
+
+    def send_json(self, status, payload, etag=None, body=None):
+        body = body if body is not None else json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Cache-Control', 'no-cache')
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        try:
+            if DATASET.refresh():
+                RESULT_CACHE.clear()
+        except (OSError, ValueError, KeyError) as e:
+            if DATASET.snapshot.version is None:
+                return self.send_json(503, {'error': f'数据加载失败: {e}'})
+            print(f"⚠️  重新加载数据失败，继续使用旧数据: {e}")
+
+        url = urlparse(self.path)
+        path = url.path.rstrip('/') or '/'
+        params = parse_qs(url.query)
+
+        # 整个请求使用同一份快照；结果按数据版本和规范化的查询参数缓存
+        snapshot = DATASET.snapshot
+        cache_key = (snapshot.version, path, tuple(sorted((name, tuple(values)) for name, values in params.items())))
+        cached = RESULT_CACHE.get(cache_key)
+        if cached is None:
+            try:
+                if path == '/members':
+                    payload = query_members(snapshot, params)
+                elif path.startswith('/members/'):
+                    payload = get_member(snapshot, unquote(path[len('/members/'):]), params)
+                    if payload is None:
+                        return self.send_json(404, {'error': '成员不存在'})
+                elif path == '/meta':
+                    payload = dataset_meta(snapshot)
+                else:
+                    return self.send_json(404, {'error': '未知接口，支持 /members、/members/{id}、/meta'})
+            except QueryError as e:
+                return self.send_json(400, {'error': str(e)})
+
+            body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            cached = (body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+            if path != '/meta':  # /meta 含缓存统计，不缓存
+                RESULT_CACHE.put(cache_key, cached)
+
+        body, etag = cached
+        if etag in [tag.strip() for tag in (self.headers.get('If-None-Match') or '').split(',')]:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            return
+        self.send_json(200, None, etag=etag, body=body)
+
+def main():
+    print(f"🚀 成员数据查询服务")
+    print(f"📁 数据目录: {DATA_DIR}")
+    try:
+        DATASET.refresh()
+    except (OSError, ValueError, KeyError) as e:
+        print(f"💥 数据加载失败: {e}（请先运行 python scripts/fetch-members.py）")
+        raise SystemExit(1)
+
+    server = ThreadingHTTPServer((CONFIG['HOST'], CONFIG['PORT']), APIHandler)
+    print(f"🌐 监听 http://{CONFIG['HOST']}:{CONFIG['PORT']}  (接口: /members, /members/{{id}}, /meta)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 已停止")
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
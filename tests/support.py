@@ -0,0 +1,26 @@
+"""
+测试辅助：按文件路径加载 scripts/fetch-members.py（文件名含连字符，不能直接 import）
+缓存目录指向临时目录，不读写仓库中的 .cache/
+"""
+
+import importlib.util
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+CACHE_DIR = tempfile.mkdtemp(prefix='fetch-members-test-')
+
+
+def load_fetch_members():
+    """加载 fetch-members.py，只加载一次"""
+    if 'fetch_members' in sys.modules:
+        return sys.modules['fetch_members']
+    os.environ['FETCH_CACHE_DIR'] = CACHE_DIR
+    os.environ.setdefault('GITHUB_ORGS', 'testorg')
+    spec = importlib.util.spec_from_file_location('fetch_members', ROOT / 'scripts' / 'fetch-members.py')
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['fetch_members'] = module
+    spec.loader.exec_module(module)
+    return module
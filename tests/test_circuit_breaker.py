@@ -0,0 +1,126 @@
+"""熔断器的状态转换，以及试探请求遇到速率限制后交还试探机会"""
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+from support import load_fetch_members
+
+fm = load_fetch_members()
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None, payload=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.payload = payload or {}
+        self.content = b'{}'
+
+    def json(self):
+        return self.payload
+
+
+def open_breaker(breaker):
+    """连续失败直到熔断，并让冷却时间立即结束"""
+    for _ in range(breaker.threshold):
+        breaker.record_failure()
+    breaker.opened_at = time.time() - breaker.cooldown - 1
+
+
+def in_other_thread(func):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(func()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.breaker = fm.CircuitBreaker(threshold=2, cooldown=60)
+
+    def test_opens_after_threshold_and_rejects_during_cooldown(self):
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertIsNotNone(self.breaker.opened_at)
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.stats, {'opened': 1, 'rejected': 1})
+
+    def test_half_open_admits_a_single_probe(self):
+        open_breaker(self.breaker)
+        self.assertTrue(self.breaker.allow())
+        # 同一线程的重试继续试探，其他线程被拒绝
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(in_other_thread(self.breaker.allow))
+
+    def test_probe_success_closes(self):
+        open_breaker(self.breaker)
+        self.breaker.allow()
+        self.breaker.record_success()
+        self.assertIsNone(self.breaker.opened_at)
+        self.assertTrue(in_other_thread(self.breaker.allow))
+
+    def test_probe_failure_reopens(self):
+        open_breaker(self.breaker)
+        self.breaker.allow()
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.probing)
+        self.assertFalse(self.breaker.allow())  # 重新计时
+        self.assertEqual(self.breaker.stats['opened'], 1)
+
+    def test_release_returns_to_half_open(self):
+        open_breaker(self.breaker)
+        self.breaker.allow()
+        self.breaker.release()
+        self.assertIsNotNone(self.breaker.opened_at)
+        self.assertTrue(in_other_thread(self.breaker.allow))
+
+    def test_release_from_other_thread_keeps_probe(self):
+        open_breaker(self.breaker)
+        self.breaker.allow()
+        in_other_thread(self.breaker.release)
+        self.assertTrue(self.breaker.probing)
+
+
+class ProbeRateLimitTest(unittest.TestCase):
+    """试探请求遇到速率限制（既不算成功也不算失败）后，熔断器不能一直停在半开状态"""
+
+    def setUp(self):
+        self.breaker = fm.CircuitBreaker(threshold=1, cooldown=60)
+        open_breaker(self.breaker)
+        patches = [
+            mock.patch.object(fm, 'CIRCUIT_BREAKER', self.breaker),
+            mock.patch.object(fm, 'TOKEN_POOL', fm.TokenPool(['token'])),
+            mock.patch.dict(fm.CONFIG, {'RATE_LIMIT_MAX_WAIT': 30}),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def fetch(self, response):
+        with mock.patch.object(fm.requests, 'get', return_value=response):
+            return fm.fetch_api_response('https://api.github.com/repos/org/repo')
+
+    def test_primary_rate_limit_releases_probe(self):
+        response = FakeResponse(403, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(int(time.time()) + 3600)})
+        self.assertEqual(self.fetch(response), (None, None))
+        self.assertFalse(self.breaker.probing)
+        self.assertTrue(in_other_thread(self.breaker.allow))
+
+    def test_secondary_rate_limit_releases_probe(self):
+        response = FakeResponse(429, {'Retry-After': '3600'}, {'message': 'secondary rate limit'})
+        self.assertEqual(self.fetch(response), (None, None))
+        self.assertFalse(self.breaker.probing)
+        self.assertTrue(in_other_thread(self.breaker.allow))
+
+    def test_conditional_request_with_exhausted_tokens_releases_probe(self):
+        with mock.patch.object(fm.TOKEN_POOL, 'acquire', return_value=(None, time.time() + 3600)):
+            status, _, _, _ = fm.fetch_api_conditional('https://api.github.com/orgs/org/events')
+        self.assertIsNone(status)
+        self.assertTrue(in_other_thread(self.breaker.allow))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+"""成员变更报告：逐行读取上次的 CSV，与本次写入的行哈希比较"""
+
+import csv
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+from support import load_fetch_members
+
+fm = load_fetch_members()
+
+
+def member(login, followers=1, **extra):
+    fields = dict(id=login, name=login, github=f'https://github.com/{login}', domains=['web'], repositories=['org/a'],
+                  public_repos=1, total_stars=0, followers=followers, following=0, avatar='', bio='', location='',
+                  company='', freshness='fresh', as_of='')
+    fields.update(extra)
+    return fm.Member(**fields)
+
+
+def write(members, keep_rows=True):
+    writer = fm.MemberCsvWriter(io.StringIO(newline=''), keep_rows=keep_rows)
+    for item in members:
+        writer.write(item)
+    return writer
+
+
+class MemberChangesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / 'members.csv'
+
+    def publish(self, members):
+        with open(self.path, 'w', newline='', encoding='utf-8') as f:
+            writer = fm.MemberCsvWriter(f)
+            for item in members:
+                writer.write(item)
+        return writer
+
+    def test_added_removed_changed_and_metrics(self):
+        self.publish([member('alice', followers=3), member('bob'), member('carol')])
+        current = write([member('alice', followers=5, bio='hi'), member('bob'), member('dave')])
+
+        changes = fm.summarize_member_changes(self.path, current)
+        self.assertEqual(changes['total'], 3)
+        self.assertEqual(changes['previous_total'], 3)
+        self.assertEqual(changes['added'], ['dave'])
+        self.assertEqual(changes['removed'], ['carol'])
+        self.assertEqual(changes['changed'], {'alice': {
+            'followers': {'old': 3, 'new': 5, 'delta': 2},
+            'bio': {'old': '', 'new': 'hi'}
+        }})
+        self.assertEqual(changes['metrics']['followers'], {'old': 5, 'new': 7, 'delta': 2})
+
+    def test_missing_previous_file_reports_everyone_added(self):
+        changes = fm.summarize_member_changes(self.path, write([member('alice')]))
+        self.assertEqual(changes['added'], ['alice'])
+        self.assertEqual(changes['previous_total'], 0)
+        self.assertEqual(changes['metrics']['followers']['old'], 0)
+
+    def test_streamed_hash_matches_writer_hash(self):
+        writer = self.publish([member('bob'), member('alice', bio='多行\n简介')])
+        self.assertEqual(fm.read_content_hash(self.path), writer.content_hash())
+
+        self.publish([])
+        self.assertEqual(fm.read_content_hash(self.path), write([]).content_hash())
+        self.assertIsNone(fm.read_content_hash(Path(self.tmp.name) / 'absent.csv'))
+
+    def test_rows_kept_only_when_requested(self):
+        self.assertIsNone(write([member('alice')], keep_rows=False).rows)
+        self.assertEqual(write([member('alice')]).rows['alice']['followers'], '1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+"""成员加入、离开记录：名单比较、不完整名单和获取失败的仓库"""
+
+import unittest
+from unittest import mock
+
+from support import load_fetch_members
+
+fm = load_fetch_members()
+
+T1, T2, T3, T4 = '2026-01-01T00:00:00Z', '2026-01-11T00:00:00Z', '2026-01-21T00:00:00Z', '2026-01-31T00:00:00Z'
+
+
+def state(roster, qualified=None, **extra):
+    """仓库抓取结果：roster 为按阈值筛选前的名单，qualified 为筛选后的贡献者（默认与名单相同）"""
+    qualified = roster if qualified is None else qualified
+    return dict({'contributors': [fm.Contributor(login=login, contributions=10) for login in qualified],
+                 'roster': list(roster)}, **extra)
+
+
+def run(previous, repos, now):
+    with mock.patch('builtins.print'):
+        return fm.build_membership(previous, {'org': repos}, now=now)
+
+
+class BuildMembershipTest(unittest.TestCase):
+    def test_first_run_records_everyone_as_joined(self):
+        result = run(None, {'a': state(['alice', 'bob'])}, T1)
+        self.assertEqual(result['baseline'], T1)
+        self.assertEqual(result['members']['alice']['joined'], T1)
+        self.assertEqual(result['members']['alice']['stints'], 1)
+        self.assertEqual(result['members']['bob']['repos'], {'org/a': {'first_seen': T1, 'left': None}})
+
+    def test_absent_from_complete_listing_leaves_and_rejoins(self):
+        first = run(None, {'a': state(['alice', 'bob'])}, T1)
+        second = run(first, {'a': state(['alice'])}, T2)
+        self.assertEqual(second['members']['bob']['left'], T2)
+        self.assertEqual(second['members']['bob']['past_days'], 10.0)
+
+        third = run(second, {'a': state(['alice', 'bob'])}, T3)
+        bob = third['members']['bob']
+        self.assertIsNone(bob['left'])
+        self.assertEqual((bob['joined'], bob['stints'], bob['first_seen']), (T3, 2, T1))
+        self.assertEqual(bob['repos']['org/a'], {'first_seen': T1, 'left': None})
+
+    def test_truncated_listing_does_not_record_departures(self):
+        first = run(None, {'a': state(['alice', 'bob'])}, T1)
+        second = run(first, {'a': state(['alice', 'carol'], roster_complete=False)}, T2)
+        self.assertIsNone(second['members']['bob']['left'])
+        self.assertIsNone(second['members']['bob']['repos']['org/a']['left'])
+        # 不完整名单中新出现的成员仍然记录
+        self.assertEqual(second['members']['carol']['joined'], T2)
+
+    def test_threshold_changes_do_not_cause_departures(self):
+        # 名单不变，只是本次按行数筛选后 bob 不再达到阈值
+        first = run(None, {'a': state(['alice', 'bob'])}, T1)
+        second = run(first, {'a': state(['alice', 'bob'], qualified=['alice'])}, T2)
+        self.assertIsNone(second['members']['bob']['left'])
+        self.assertEqual(second['members']['bob']['stints'], 1)
+
+    def test_failed_listing_is_ignored(self):
+        first = run(None, {'a': state(['alice']), 'b': state(['bob'])}, T1)
+        second = run(first, {'a': state(['alice']), 'b': state([], contributors_fetched=False)}, T2)
+        self.assertIsNone(second['members']['bob']['left'])
+
+    def test_removed_repo_counts_as_left(self):
+        first = run(None, {'a': state(['alice']), 'b': state(['bob'])}, T1)
+        second = run(first, {'a': state(['alice'])}, T2)
+        self.assertEqual(second['members']['bob']['left'], T2)
+        self.assertEqual(second['members']['bob']['repos']['org/b']['left'], T2)
+
+    def test_member_stays_while_in_any_repo(self):
+        first = run(None, {'a': state(['alice']), 'b': state(['alice'])}, T1)
+        second = run(first, {'a': state([]), 'b': state(['alice'])}, T4)
+        alice = second['members']['alice']
+        self.assertIsNone(alice['left'])
+        self.assertEqual(alice['repos']['org/a']['left'], T4)
+        self.assertIsNone(alice['repos']['org/b']['left'])
+
+    def test_falls_back_to_contributors_without_roster(self):
+        first = run(None, {'a': state(['alice', 'bob'])}, T1)
+        repos = {'a': {'contributors': [fm.Contributor(login='alice', contributions=10)]}}
+        second = run(first, repos, T2)
+        self.assertEqual(second['members']['bob']['left'], T2)
+
+    def test_does_not_modify_previous_record(self):
+        first = run(None, {'a': state(['alice'])}, T1)
+        run(first, {'a': state([])}, T2)
+        self.assertIsNone(first['members']['alice']['left'])
+
+
+class ListingCompletenessTest(unittest.TestCase):
+    """fetch_all_pages 报告列表是否完整（超出上限或分页失败时为 False）"""
+
+    def fetch(self, total, max_items, fail_pages=()):
+        items = [{'login': f'user{index}'} for index in range(total)]
+
+        def response(url):
+            page = int(url.rsplit('page=', 1)[1])
+            per_page = int(url.split('per_page=')[1].split('&')[0])
+            if page in fail_pages:
+                return None, None
+            last = max(1, -(-total // per_page))
+            headers = {'Link': f'<{url.rsplit("page=", 1)[0]}page={last}>; rel="last"'} if last > 1 else {}
+            return items[(page - 1) * per_page:page * per_page], headers
+
+        listing = {}
+        with mock.patch.object(fm, 'fetch_api_response', side_effect=lambda url: response(url)), \
+                mock.patch.object(fm, 'fetch_api', side_effect=lambda url: response(url)[0]), \
+                mock.patch('builtins.print'):
+            result = fm.fetch_all_pages('https://api.github.com/repos/o/r/contributors', 'o/r 贡献者',
+                                        per_page=min(100, max_items), max_items=max_items, listing=listing)
+        return result, listing['complete']
+
+    def test_complete_listing(self):
+        result, complete = self.fetch(150, 500)
+        self.assertEqual((len(result), complete), (150, True))
+
+    def test_listing_over_limit_is_incomplete(self):
+        result, complete = self.fetch(250, 100)
+        self.assertEqual((len(result), complete), (100, False))
+
+    def test_listing_with_failed_page_is_incomplete(self):
+        result, complete = self.fetch(250, 500, fail_pages=(2,))
+        self.assertEqual((len(result), complete), (150, False))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""原子输出：全部提交或全部放弃，以及被强制结束的输出留下的临时文件"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from support import load_fetch_members
+
+fm = load_fetch_members()
+
+
+def exited_pid():
+    """一个已经结束的进程号"""
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+class OutputGenerationTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.members = self.dir / 'members.csv'
+        self.graph = self.dir / 'graph.json'
+        self.members.write_text('old members', encoding='utf-8')
+        self.graph.write_text('old graph', encoding='utf-8')
+        patcher = mock.patch('builtins.print')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def files(self):
+        return sorted(path.name for path in self.dir.iterdir())
+
+    def test_commit_replaces_every_target(self):
+        with fm.OutputGeneration() as generation:
+            generation.open(self.members).write('new members')
+            generation.open(self.graph).write('new graph')
+            generation.open(self.dir / 'orgs' / 'org.csv').write('org')
+            self.assertEqual(self.members.read_text(encoding='utf-8'), 'old members')
+        self.assertEqual(self.members.read_text(encoding='utf-8'), 'new members')
+        self.assertEqual(self.graph.read_text(encoding='utf-8'), 'new graph')
+        self.assertEqual((self.dir / 'orgs' / 'org.csv').read_text(encoding='utf-8'), 'org')
+        self.assertEqual(self.files(), ['graph.json', 'members.csv', 'orgs'])
+
+    def test_exception_aborts_and_keeps_previous_files(self):
+        with self.assertRaises(RuntimeError):
+            with fm.OutputGeneration() as generation:
+                generation.open(self.members).write('new members')
+                generation.open(self.graph, binary=True).write(b'new graph')
+                raise RuntimeError('boom')
+        self.assertEqual(self.members.read_text(encoding='utf-8'), 'old members')
+        self.assertEqual(self.graph.read_text(encoding='utf-8'), 'old graph')
+        self.assertEqual(self.files(), ['graph.json', 'members.csv'])
+
+    def test_abandoned_temp_files_of_target_are_removed(self):
+        dead = self.dir / f'.members.csv.20260101T000000-{exited_pid()}.tmp'
+        dead.write_text('partial', encoding='utf-8')
+        other_target = self.dir / f'.graph.json.20260101T000000-{exited_pid()}.tmp'
+        other_target.write_text('partial', encoding='utf-8')
+
+        with fm.OutputGeneration() as generation:
+            generation.open(self.members).write('new members')
+        self.assertFalse(dead.exists())
+        # 只清理本次写入的目标的临时文件
+        self.assertTrue(other_target.exists())
+
+    def test_temp_files_of_running_writers_are_kept(self):
+        running = self.dir / f'.members.csv.20260101T000000-{os.getppid()}.tmp'
+        running.write_text('in progress', encoding='utf-8')
+        own = self.dir / f'.members.csv.20260101T000000-{os.getpid()}.tmp'
+        own.write_text('in progress', encoding='utf-8')
+
+        with fm.OutputGeneration() as generation:
+            generation.open(self.members).write('new members')
+        self.assertTrue(running.exists())
+        self.assertTrue(own.exists())
+
+    def test_unrecognized_temp_files_are_removed_by_age(self):
+        recent = self.dir / '.members.csv.unknown.tmp'
+        recent.write_text('partial', encoding='utf-8')
+        self.assertFalse(fm.OutputGeneration.abandoned(recent))
+
+        old = time.time() - fm.OutputGeneration.ABANDONED_AFTER - 60
+        os.utime(recent, (old, old))
+        self.assertTrue(fm.OutputGeneration.abandoned(recent))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+"""review 搜索切片：已结束的切片使用缓存，尚未结束的切片每次重新查询"""
+
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest import mock
+
+from support import load_fetch_members
+
+fm = load_fetch_members()
+
+SINCE = '2026-01-01T00:00:00Z'
+
+
+def search_result(reviews):
+    """一个 PR 的搜索结果页：reviews 为 [(id, 用户, 提交时间)]"""
+    nodes = [{'id': review_id, 'author': {'login': login}, 'submittedAt': submitted_at}
+             for review_id, login, submitted_at in reviews]
+    return {'data': {'search': {
+        'issueCount': 1,
+        'pageInfo': {'hasNextPage': False, 'endCursor': None},
+        'nodes': [{'id': 'pr', 'author': {'login': 'author'},
+                   'reviews': {'pageInfo': {'hasNextPage': False, 'endCursor': None}, 'nodes': nodes}}]
+    }}}
+
+
+class ReviewSliceTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cache = fm.SearchSliceCache(Path(tmp.name) / 'search_slices.json')
+        self.response = search_result([('r1', 'alice', '2026-01-02T00:00:00Z')])
+        fetch = mock.patch.object(fm, 'fetch_api_response', side_effect=lambda *args, **kwargs: (self.response, None))
+        for patcher in (mock.patch.object(fm, 'SEARCH_SLICE_CACHE', cache), mock.patch.object(fm, 'DEADLINE', fm.Deadline()),
+                        mock.patch('builtins.print')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.fetch = fetch.start()
+        self.addCleanup(fetch.stop)
+
+    def query(self, start, since=SINCE):
+        return fm.query_review_slice('org', start, start + timedelta(days=1), since)
+
+    def test_finished_slice_is_served_from_cache(self):
+        start = datetime(2026, 1, 2, tzinfo=timezone.utc)
+        self.assertEqual(self.query(start), {'r1': ['alice', '2026-01-02T00:00:00Z']})
+        self.response = search_result([])
+        self.assertEqual(self.query(start), {'r1': ['alice', '2026-01-02T00:00:00Z']})
+        self.assertEqual(self.fetch.call_count, 1)
+
+    def test_open_slice_is_queried_again(self):
+        start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.query(start)
+        self.response = search_result([('r2', 'bob', '2026-01-03T00:00:00Z')])
+        self.assertEqual(self.query(start), {'r2': ['bob', '2026-01-03T00:00:00Z']})
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_cached_reviews_are_filtered_by_current_window(self):
+        start = datetime(2026, 1, 2, tzinfo=timezone.utc)
+        self.query(start)
+        self.assertEqual(self.query(start, since='2026-01-05T00:00:00Z'), {})
+
+    def test_deadline_falls_back_to_previous_open_result(self):
+        start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.query(start)
+        with mock.patch.object(fm.DEADLINE, 'allows', return_value=False):
+            self.assertEqual(self.query(start), {'r1': ['alice', '2026-01-02T00:00:00Z']})
+            self.assertIsNone(self.query(start - timedelta(days=3)))
+        self.assertEqual(self.fetch.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()